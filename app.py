@@ -3,11 +3,15 @@
 GPT-4o Realtime API Web Application for Railway Deployment
 """
 import os
-import asyncio
+import re
 import json
 import uuid
-from datetime import datetime
-from typing import Dict, Any
+import time
+import base64
+import secrets
+from collections import deque
+from datetime import datetime, date, timedelta
+from typing import Dict, Any, Optional
 from flask import Flask, render_template, request, jsonify, session
 from flask_socketio import SocketIO, emit, disconnect
 import logging
@@ -21,6 +25,9 @@ import sys
 sys.path.append('..')
 from integrations.eva_realtime_manager import EvaRealtimeManager, EvaRealtimeConfig
 from integrations.realtime_cost_tracker import get_realtime_tracker
+from integrations.cost_history import get_cost_history
+from integrations.realtime_event_loop import get_realtime_event_loop
+from integrations.gpt4o_realtime_client import AudioConfig
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -37,6 +44,51 @@ socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
 realtime_manager = None
 active_sessions = {}
 
+# Set by asgi.py in multi-worker mode: records which worker owns each session
+session_registry = None
+
+# Socket.IO client options rendered into index.html
+socket_options = {}
+
+# Seconds a Socket.IO handler waits for work submitted to the realtime loop
+HANDLER_TIMEOUT = float(os.getenv('REALTIME_HANDLER_TIMEOUT', '30'))
+
+# Longest range /api/history answers in one request
+MAX_HISTORY_DAYS = 3 * 366
+
+# Seconds a session request may wait in line for budget or a concurrency slot
+ADMISSION_TIMEOUT = float(os.getenv('ADMISSION_TIMEOUT', '20'))
+
+# Web audio output: stream Eva's PCM16 audio to the browser as binary frames
+WEB_AUDIO_OUTPUT = os.getenv('WEB_AUDIO_OUTPUT', '0') == '1'
+web_audio_options = {
+    'enabled': WEB_AUDIO_OUTPUT,
+    'sample_rate': AudioConfig().sample_rate,
+    'jitter_ms': int(os.getenv('WEB_AUDIO_JITTER_MS', '60')),
+    'input': os.getenv('WEB_AUDIO_INPUT', '0') == '1',   # stream the browser mic instead of speech recognition
+    'mic_chunk_ms': 40
+}
+
+# User ids end up in session ids, log lines and quota keys
+USER_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+# Socket id -> user id from the signed Flask session cookie of its handshake
+client_identities = {}
+
+# Largest browser microphone chunk accepted (1 second of 48 kHz stereo float32)
+MAX_AUDIO_CHUNK_BYTES = 48000 * 4 * 2
+
+# Recent time-to-first-audio measurements (milliseconds)
+audio_latency = {
+    'server': deque(maxlen=200),    # send_message -> first audio frame emitted
+    'playback': deque(maxlen=200),  # browser send -> first sample played
+    'barge_in': deque(maxlen=200)   # user speech detected -> browser playback silenced
+}
+
+def run_async(coro, timeout=None):
+    """Run a coroutine on the shared realtime event loop and wait for the result"""
+    return get_realtime_event_loop().run(coro, timeout=timeout or HANDLER_TIMEOUT)
+
 def init_realtime_manager():
     """Initialize the realtime manager"""
     global realtime_manager
@@ -48,7 +100,19 @@ def init_realtime_manager():
         max_daily_sessions=50,          # 50 sessions per day
         require_user_confirmation=False, # Auto-approve for web
         enable_audio_input=False,       # Text only for web demo
-        enable_audio_output=False
+        enable_audio_output=False,
+        connection_pool_size=int(os.getenv('REALTIME_POOL_SIZE', '0')),
+        client_vad_enabled=os.getenv('CLIENT_VAD', '0') == '1',
+        client_vad_threshold_dbfs=float(os.getenv('CLIENT_VAD_THRESHOLD_DBFS', '-45')),
+        recording_dir=os.getenv('REALTIME_RECORDING_DIR') or None,
+        audio_codec=os.getenv('REALTIME_AUDIO_CODEC', 'pcm16'),
+        barge_in_enabled=os.getenv('BARGE_IN', '1') == '1',
+        max_concurrent_sessions=int(os.getenv('MAX_CONCURRENT_SESSIONS', '0')),
+        admission_queue_size=int(os.getenv('ADMISSION_QUEUE_SIZE', '20')),
+        admission_timeout=ADMISSION_TIMEOUT,
+        user_sessions_per_minute=float(os.getenv('USER_SESSIONS_PER_MINUTE', '0')),
+        user_max_concurrent_sessions=int(os.getenv('USER_MAX_CONCURRENT_SESSIONS', '0')),
+        user_max_cost_per_day=float(os.getenv('USER_MAX_COST_PER_DAY', '0'))
     )
     
     realtime_manager = EvaRealtimeManager(config)
@@ -57,88 +121,161 @@ def init_realtime_manager():
     realtime_manager.on_eva_event("realtime_session_started", on_session_started)
     realtime_manager.on_eva_event("user_speech", on_user_speech)
     realtime_manager.on_eva_event("eva_response_text", on_eva_response_text)
+    if WEB_AUDIO_OUTPUT:
+        realtime_manager.on_eva_event("eva_response_audio", on_eva_response_audio)
     realtime_manager.on_eva_event("cost_warning", on_cost_warning)
     realtime_manager.on_eva_event("cost_limit_reached", on_cost_limit_reached)
     realtime_manager.on_eva_event("realtime_session_ended", on_session_ended)
     realtime_manager.on_eva_event("realtime_error", on_realtime_error)
+    realtime_manager.on_eva_event("audio_input_backpressure", on_audio_input_backpressure)
+    realtime_manager.on_eva_event("eva_interrupted", on_eva_interrupted)
+
+def emit_to_client(event, payload, room):
+    """Send an event to a browser socket (replaced by the ASGI server in asgi.py)"""
+    socketio.emit(event, payload, room=room)
+
+def forget_session(session_id):
+    """Drop a session from this worker's active sessions"""
+    active_sessions.pop(session_id, None)
+    if session_registry:
+        session_registry.release(session_id)
+
+def emit_to_session(session_id, event, payload):
+    """Send an event to the browser socket that owns a session"""
+    session_info = active_sessions.get(session_id)
+    if session_info:
+        emit_to_client(event, payload, session_info['socket_id'])
+        return True
+    return False
 
 def on_session_started(data):
     """Handle session started event"""
     session_id = data.get('session_id')
-    if session_id in active_sessions:
-        socketio.emit('session_started', {
-            'session_id': session_id,
-            'message': 'Session started successfully!',
-            'warnings': data.get('warnings', [])
-        }, room=active_sessions[session_id]['socket_id'])
+    emit_to_session(session_id, 'session_started', {
+        'session_id': session_id,
+        'message': 'Session started successfully!',
+        'warnings': data.get('warnings', [])
+    })
 
 def on_user_speech(data):
     """Handle user speech transcription"""
-    session_id = data.get('session_id')
-    if session_id in active_sessions:
-        socketio.emit('user_speech', {
-            'text': data.get('text', ''),
-            'timestamp': datetime.now().isoformat()
-        }, room=active_sessions[session_id]['socket_id'])
+    emit_to_session(data.get('session_id'), 'user_speech', {
+        'text': data.get('text', ''),
+        'timestamp': datetime.now().isoformat()
+    })
 
 def on_eva_response_text(data):
     """Handle Eva's text response"""
+    emit_to_session(data.get('session_id'), 'eva_response', {
+        'text': data.get('text', ''),
+        'type': data.get('type', 'delta'),
+        'timestamp': datetime.now().isoformat()
+    })
+
+def on_eva_response_audio(data):
+    """Forward Eva's audio to the browser as a binary PCM16 frame"""
     session_id = data.get('session_id')
-    if session_id in active_sessions:
-        socketio.emit('eva_response', {
-            'text': data.get('text', ''),
-            'type': data.get('type', 'delta'),
-            'timestamp': datetime.now().isoformat()
-        }, room=active_sessions[session_id]['socket_id'])
+    session_info = active_sessions.get(session_id)
+    audio_data = data.get('audio_data')
+    if not session_info or not audio_data:
+        return
+    
+    # Reuse PCM the client already decoded; bytes go out as a binary attachment, not base64 text
+    pcm = data.get('pcm')
+    frame = {
+        'session_id': session_id,
+        'seq': session_info.get('audio_seq', 0),
+        'sample_rate': web_audio_options['sample_rate'],
+        'pcm': bytes(pcm) if pcm is not None else base64.b64decode(audio_data)
+    }
+    session_info['audio_seq'] = frame['seq'] + 1
+    
+    # Server-side time to first audio for the latest user message
+    awaiting_since = session_info.pop('awaiting_audio_since', None)
+    if awaiting_since is not None:
+        frame['server_ttfa_ms'] = round((time.time() - awaiting_since) * 1000, 1)
+        audio_latency['server'].append(frame['server_ttfa_ms'])
+        logger.info(f"Time to first audio for {session_id}: {frame['server_ttfa_ms']}ms (server)")
+    
+    emit_to_client('eva_audio', frame, session_info['socket_id'])
+
+def audio_latency_summary():
+    """Percentiles of recent time-to-first-audio measurements"""
+    summary = {}
+    for source, samples in audio_latency.items():
+        ordered = sorted(samples)
+        summary[source] = {
+            'samples': len(ordered),
+            'p50_ms': ordered[len(ordered) // 2] if ordered else None,
+            'p95_ms': ordered[int(len(ordered) * 0.95)] if ordered else None
+        }
+    return summary
+
+def on_audio_input_backpressure(data):
+    """Ask the browser to pause or resume its microphone stream"""
+    emit_to_session(data.get('session_id'), 'mic_backpressure', {
+        'paused': data.get('paused', False)
+    })
+
+def on_eva_interrupted(data):
+    """Tell the browser to stop playing Eva's reply: the user started speaking"""
+    session_id = data.get('session_id')
+    session_info = active_sessions.get(session_id)
+    if not session_info:
+        return
+    session_info['interrupted_at'] = time.time()
+    session_info.pop('awaiting_audio_since', None)
+    emit_to_client('eva_interrupted', {
+        'session_id': session_id,
+        'audio_end_ms': data.get('audio_end_ms', 0)
+    }, session_info['socket_id'])
 
 def on_cost_warning(data):
     """Handle cost warnings"""
-    session_id = data.get('session_id')
-    if session_id in active_sessions:
-        socketio.emit('cost_warning', {
-            'message': data.get('message', ''),
-            'level': 'warning',
-            'timestamp': datetime.now().isoformat()
-        }, room=active_sessions[session_id]['socket_id'])
+    emit_to_session(data.get('session_id'), 'cost_warning', {
+        'message': data.get('message', ''),
+        'level': 'warning',
+        'timestamp': datetime.now().isoformat()
+    })
 
 def on_cost_limit_reached(data):
     """Handle cost limit reached"""
     session_id = data.get('session_id')
-    if session_id in active_sessions:
-        socketio.emit('cost_limit_reached', {
-            'reason': data.get('reason', ''),
-            'level': 'critical',
-            'timestamp': datetime.now().isoformat()
-        }, room=active_sessions[session_id]['socket_id'])
-        
-        # Remove from active sessions
-        del active_sessions[session_id]
+    emit_to_session(session_id, 'cost_limit_reached', {
+        'reason': data.get('reason', ''),
+        'level': 'critical',
+        'timestamp': datetime.now().isoformat()
+    })
+    
+    # Remove from active sessions
+    forget_session(session_id)
 
 def on_session_ended(data):
     """Handle session ended"""
     session_id = data.get('session_id')
-    if session_id in active_sessions:
-        socketio.emit('session_ended', {
-            'summary': data.get('summary', {}),
-            'timestamp': datetime.now().isoformat()
-        }, room=active_sessions[session_id]['socket_id'])
-        
-        # Remove from active sessions
-        del active_sessions[session_id]
+    emit_to_session(session_id, 'session_ended', {
+        'summary': data.get('summary', {}),
+        'timestamp': datetime.now().isoformat()
+    })
+    
+    # Remove from active sessions
+    forget_session(session_id)
 
 def on_realtime_error(data):
     """Handle realtime errors"""
-    session_id = data.get('session_id')
-    if session_id in active_sessions:
-        socketio.emit('realtime_error', {
-            'error': data.get('error', {}),
-            'timestamp': datetime.now().isoformat()
-        }, room=active_sessions[session_id]['socket_id'])
+    emit_to_session(data.get('session_id'), 'realtime_error', {
+        'error': data.get('error', {}),
+        'timestamp': datetime.now().isoformat()
+    })
 
 @app.route('/')
 def index():
     """Main page"""
-    return render_template('index.html')
+    # A server-issued id in the signed session cookie keys per-user quotas
+    if 'user_id' not in session:
+        session['user_id'] = f'web_{secrets.token_hex(8)}'
+        session.permanent = True
+    return render_template('index.html', socket_options=socket_options, web_audio=web_audio_options)
 
 @app.route('/dashboard')
 def dashboard():
@@ -159,6 +296,10 @@ def get_status():
             'status': 'ready',
             'cost_summary': cost_summary,
             'active_sessions': active_sessions_info,
+            'connection_pool': realtime_manager.get_pool_stats(),
+            'admission': realtime_manager.get_admission_stats(),
+            'user_quotas': realtime_manager.get_user_quota_usage(request.args.get('user_id')),
+            'audio_latency': audio_latency_summary(),
             'timestamp': datetime.now().isoformat()
         })
     except Exception as e:
@@ -177,24 +318,21 @@ def get_dashboard_data():
         
         # Get session history from cost tracker
         cost_tracker = get_realtime_tracker()
-        session_history = cost_tracker.daily_data.get('sessions', [])
+        session_history = cost_tracker.recent_sessions(20)
         
-        # Generate usage trends (mock data for now - you can implement real trend tracking)
-        usage_trends = []
-        current_hour = datetime.now().hour
-        for i in range(24):
-            hour = (current_hour - i) % 24
-            # Mock trend data - replace with real data from your cost tracker
-            usage_trends.append({
-                'hour': f"{hour:02d}:00",
-                'cost': cost_summary['totals']['cost'] * (0.1 if i < 6 else 0.05)  # Mock distribution
-            })
-        usage_trends.reverse()
+        # Usage over the last 24 hours (or 60 minutes with ?trend=minute) from precomputed buckets
+        granularity = request.args.get('trend', 'hour')
+        if granularity not in ('hour', 'minute'):
+            return jsonify({'error': "trend must be 'hour' or 'minute'"}), 400
+        usage_trends = [
+            dict(point, hour=point['label'])
+            for point in cost_tracker.usage_trends(granularity, 60 if granularity == 'minute' else 24)
+        ]
         
         return jsonify({
             'cost_summary': cost_summary,
             'active_sessions': active_sessions_info,
-            'session_history': session_history[-20:],  # Last 20 sessions
+            'session_history': session_history,  # Last 20 sessions
             'usage_trends': usage_trends,
             'timestamp': datetime.now().isoformat()
         })
@@ -203,6 +341,79 @@ def get_dashboard_data():
         logger.error(f"Error getting dashboard data: {e}")
         return jsonify({'error': str(e)}), 500
 
+def usage_store_or_error():
+    """The SQLite usage store, or an error response when it is not enabled"""
+    usage_store = get_realtime_tracker().usage_store
+    if not usage_store:
+        return None, (jsonify({'error': 'Usage history not enabled (set USAGE_DB_PATH)'}), 404)
+    return usage_store, None
+
+@app.route('/api/usage/sessions')
+def get_usage_sessions():
+    """Sessions that ended in [from, to), optionally for one user, with per-day totals"""
+    usage_store, error = usage_store_or_error()
+    if error:
+        return error
+    
+    try:
+        start = datetime.fromisoformat(request.args.get('from', datetime.now().strftime('%Y-%m-%d')))
+        end = datetime.fromisoformat(request.args['to']) if 'to' in request.args else datetime.now()
+        limit = min(int(request.args.get('limit', 100)), 1000)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid query: {e}'}), 400
+    
+    user_id = request.args.get('user_id')
+    return jsonify({
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'user_id': user_id,
+        'sessions': usage_store.sessions_between(start.timestamp(), end.timestamp(), user_id, limit),
+        'daily_totals': usage_store.daily_totals(start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d'), user_id)
+    })
+
+@app.route('/api/usage/top-users')
+def get_top_users():
+    """Heaviest users over a range of days (inclusive)"""
+    usage_store, error = usage_store_or_error()
+    if error:
+        return error
+    
+    try:
+        day_from = datetime.strptime(request.args.get('from', datetime.now().strftime('%Y-%m-%d')), '%Y-%m-%d')
+        day_to = datetime.strptime(request.args['to'], '%Y-%m-%d') if 'to' in request.args else day_from
+        users = usage_store.top_users(day_from.strftime('%Y-%m-%d'), day_to.strftime('%Y-%m-%d'),
+                                      limit=min(int(request.args.get('limit', 10)), 100),
+                                      by=request.args.get('by', 'cost'))
+    except ValueError as e:
+        return jsonify({'error': f'Invalid query: {e}'}), 400
+    
+    return jsonify({
+        'from': day_from.strftime('%Y-%m-%d'),
+        'to': day_to.strftime('%Y-%m-%d'),
+        'users': users
+    })
+
+@app.route('/api/history')
+def get_cost_history_range():
+    """Daily, weekly and monthly cost totals over an inclusive range of days (default: the last 30)"""
+    try:
+        end = date.fromisoformat(request.args['to']) if 'to' in request.args else date.today()
+        start = date.fromisoformat(request.args['from']) if 'from' in request.args else end - timedelta(days=29)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid query: {e}'}), 400
+    
+    if start > end:
+        return jsonify({'error': "'from' must not be after 'to'"}), 400
+    if (end - start).days >= MAX_HISTORY_DAYS:
+        return jsonify({'error': f'Range is limited to {MAX_HISTORY_DAYS} days'}), 400
+    
+    try:
+        history = get_cost_history()
+        return jsonify(dict(history.history(start, end), cache=history.get_stats()))
+    except Exception as e:
+        logger.error(f"Error getting cost history: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/setup-email-reports', methods=['POST'])
 def setup_email_reports():
     """Setup email reports for cost monitoring"""
@@ -274,7 +485,7 @@ def send_cost_report_email(email, report_type="daily"):
             """
         else:
             subject = f"Eva Realtime - {report_type.title()} Cost Report"
-            sessions = cost_tracker.daily_data.get('sessions', [])
+            sessions = cost_tracker.recent_sessions(5)
             
             message = f"""
             📊 Daily Cost Report - {datetime.now().strftime('%Y-%m-%d')}
@@ -293,7 +504,7 @@ def send_cost_report_email(email, report_type="daily"):
             📈 Recent Sessions:
             """
             
-            for session in sessions[-5:]:  # Last 5 sessions
+            for session in sessions:  # Last 5 sessions
                 start_time = datetime.fromisoformat(session['start_time']).strftime('%H:%M')
                 message += f"• {start_time}: ${session['cost']:.4f} ({session['duration_seconds']}s)\n"
             
@@ -322,192 +533,255 @@ def send_cost_report_email(email, report_type="daily"):
         logger.error(f"Failed to send email: {e}")
         return False
 
+# Session operations shared by the threading handlers below and the ASGI
+# server in asgi.py. Each returns the (event, payload) pairs to send back
+# to the requesting client.
+
+def register_client(sid, environ):
+    """Remember the user id in a connecting socket's session cookie, if it has a valid one"""
+    try:
+        with app.request_context(environ):
+            user_id = session.get('user_id')
+    except Exception as e:
+        logger.warning(f"Could not read the session cookie of {sid}: {e}")
+        return
+    if isinstance(user_id, str) and USER_ID_PATTERN.match(user_id):
+        client_identities[sid] = user_id
+
+def client_user_id(sid, requested) -> Optional[str]:
+    """Quota key for a session request, or None if the requested user_id is malformed.
+    
+    Browsers are keyed by the id the server signed into their session cookie.
+    Clients without one may name themselves, within USER_ID_PATTERN, in a
+    client_ namespace that cannot collide with browser ids. Otherwise the
+    request gets a fresh anonymous id.
+    """
+    if requested is not None and not (isinstance(requested, str) and USER_ID_PATTERN.match(requested)):
+        return None
+    if sid in client_identities:
+        return client_identities[sid]
+    if requested:
+        return f'client_{requested}'
+    return f'anon_{uuid.uuid4().hex[:8]}'
+
+async def process_request_session(sid, data):
+    """Request a realtime session for a client"""
+    user_id = client_user_id(sid, data.get('user_id'))
+    if user_id is None:
+        return [('session_denied', {
+            'reason': 'Invalid user_id (1-64 letters, digits, _ or -)',
+            'retry_after': None,
+            'daily_summary': {}
+        })]
+    
+    request_result = await realtime_manager.request_realtime_session(user_id)
+    
+    if request_result.get('approved'):
+        session_id = request_result['session_id']
+        active_sessions[session_id] = {
+            'socket_id': sid,
+            'user_id': user_id,
+            'start_time': datetime.now().isoformat()
+        }
+        if session_registry:
+            session_registry.claim(session_id)
+        
+        return [('session_approved', {
+            'session_id': session_id,
+            'limits': request_result.get('limits', {}),
+            'warnings': request_result.get('warnings', []),
+            'queued_seconds': request_result.get('queued_seconds', 0),
+            'daily_summary': request_result.get('daily_summary', {})
+        })]
+    
+    return [('session_denied', {
+        'reason': request_result.get('reason', 'Unknown error'),
+        'retry_after': request_result.get('retry_after'),
+        'daily_summary': request_result.get('daily_summary', {})
+    })]
+
+async def process_start_session(sid, data):
+    """Start an approved realtime session"""
+    session_id = data.get('session_id')
+    
+    if session_id not in active_sessions:
+        return [('error', {'message': 'Session not found'})]
+    
+    start_result = await realtime_manager.start_realtime_session(session_id, user_confirmed=True)
+    
+    if start_result.get('started'):
+        return [('session_starting', {
+            'session_id': session_id,
+            'message': 'Session starting...'
+        })]
+    
+    # Remove from active sessions
+    forget_session(session_id)
+    
+    return [('session_start_failed', {
+        'error': start_result.get('error', 'Unknown error')
+    })]
+
+async def process_send_message(sid, data):
+    """Send a text message to a running session"""
+    session_id = data.get('session_id')
+    message = data.get('message', '').strip()
+    
+    if not message:
+        return [('error', {'message': 'Message cannot be empty'})]
+    
+    if session_id not in active_sessions:
+        return [('error', {'message': 'Session not found'})]
+    
+    # Start the time-to-first-audio clock for this message
+    active_sessions[session_id]['awaiting_audio_since'] = time.time()
+    
+    send_result = await realtime_manager.send_text_to_session(session_id, message)
+    
+    if send_result.get('text_sent'):
+        return [('message_sent', {
+            'message': message,
+            'timestamp': datetime.now().isoformat()
+        })]
+    
+    return [('message_send_failed', {
+        'error': send_result.get('error', 'Unknown error')
+    })]
+
+async def process_end_session(sid, data):
+    """End a running session"""
+    session_id = data.get('session_id')
+    
+    if session_id not in active_sessions:
+        return [('error', {'message': 'Session not found'})]
+    
+    end_result = await realtime_manager.end_session(session_id)
+    
+    # Remove from active sessions
+    forget_session(session_id)
+    
+    return [('session_ending', {
+        'session_id': session_id,
+        'summary': end_result.get('summary', {})
+    })]
+
+async def process_audio_chunk(sid, data):
+    """Queue a binary PCM16 microphone chunk for the session's upstream socket"""
+    session_id = data.get('session_id')
+    pcm = data.get('pcm')
+    
+    # Streamed mic audio is billed upstream, so only accept it when enabled
+    if not web_audio_options['input']:
+        return [('error', {'message': 'Microphone streaming is disabled'})]
+    
+    # Only the socket that requested the session may send it audio
+    session_info = active_sessions.get(session_id)
+    if not session_info or session_info.get('socket_id') != sid:
+        return [('error', {'message': 'Session not found'})]
+    
+    if not isinstance(pcm, (bytes, bytearray)) or not pcm or len(pcm) > MAX_AUDIO_CHUNK_BYTES:
+        return [('error', {'message': 'Invalid audio chunk'})]
+    
+    result = realtime_manager.push_audio_to_session(
+        session_id, bytes(pcm), data.get('seq'),
+        sample_rate=data.get('sample_rate'),
+        sample_format=data.get('format', 'pcm16'),
+        channels=data.get('channels', 1)
+    )
+    if result.get('error'):
+        return [('error', {'message': result['error']})]
+    return []
+
+async def process_audio_metrics(sid, data):
+    """Record playback latency reported by the browser"""
+    session_id = data.get('session_id')
+    ttfa_ms = data.get('time_to_first_audio_ms')
+    if isinstance(ttfa_ms, (int, float)) and 0 <= ttfa_ms < 60000:
+        audio_latency['playback'].append(round(ttfa_ms, 1))
+        logger.info(f"Time to first audio for {session_id}: {ttfa_ms:.0f}ms (playback)")
+    
+    # Barge-in: the browser confirms its playback went quiet
+    session_info = active_sessions.get(session_id)
+    if data.get('silenced') and session_info and session_info.get('socket_id') == sid:
+        interrupted_at = session_info.pop('interrupted_at', None)
+        if interrupted_at is not None:
+            silence_ms = round((time.time() - interrupted_at) * 1000, 1)
+            audio_latency['barge_in'].append(silence_ms)
+            logger.info(f"Barge-in for {session_id}: playback silenced after {silence_ms}ms")
+    return []
+
+async def end_client_sessions(sid):
+    """End every active session owned by a disconnected client"""
+    sessions_to_remove = [
+        session_id for session_id, session_info in list(active_sessions.items())
+        if session_info['socket_id'] == sid
+    ]
+    
+    for session_id in sessions_to_remove:
+        await realtime_manager.end_session(session_id)
+        forget_session(session_id)
+
+def dispatch_client_event(name, processor, data, timeout=None):
+    """Run a session operation on the realtime loop and emit its results"""
+    if not realtime_manager:
+        emit('error', {'message': 'Realtime manager not initialized'})
+        return
+    
+    try:
+        for event, payload in run_async(processor(request.sid, data or {}), timeout=timeout):
+            emit(event, payload)
+    except Exception as e:
+        logger.error(f"Error handling {name}: {e}")
+        emit('error', {'message': str(e)})
+
 @socketio.on('connect')
 def handle_connect():
     """Handle client connection"""
     logger.info(f"Client connected: {request.sid}")
+    register_client(request.sid, request.environ)
     emit('connected', {'message': 'Connected to GPT-4o Realtime API server'})
 
 @socketio.on('disconnect')
 def handle_disconnect():
     """Handle client disconnection"""
     logger.info(f"Client disconnected: {request.sid}")
+    client_identities.pop(request.sid, None)
     
     # End any active sessions for this client
-    sessions_to_remove = []
-    for session_id, session_info in active_sessions.items():
-        if session_info['socket_id'] == request.sid:
-            sessions_to_remove.append(session_id)
-    
-    for session_id in sessions_to_remove:
-        asyncio.run(realtime_manager.end_session(session_id))
-        del active_sessions[session_id]
+    if realtime_manager:
+        run_async(end_client_sessions(request.sid))
 
 @socketio.on('request_session')
 def handle_request_session(data):
     """Handle session request"""
-    if not realtime_manager:
-        emit('error', {'message': 'Realtime manager not initialized'})
-        return
-    
-    try:
-        user_id = data.get('user_id', f'web_user_{uuid.uuid4().hex[:8]}')
-        
-        # Run async function in thread
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
-        request_result = loop.run_until_complete(
-            realtime_manager.request_realtime_session(user_id)
-        )
-        
-        loop.close()
-        
-        if request_result.get('approved'):
-            session_id = request_result['session_id']
-            active_sessions[session_id] = {
-                'socket_id': request.sid,
-                'user_id': user_id,
-                'start_time': datetime.now().isoformat()
-            }
-            
-            emit('session_approved', {
-                'session_id': session_id,
-                'limits': request_result.get('limits', {}),
-                'warnings': request_result.get('warnings', []),
-                'daily_summary': request_result.get('daily_summary', {})
-            })
-        else:
-            emit('session_denied', {
-                'reason': request_result.get('reason', 'Unknown error'),
-                'daily_summary': request_result.get('daily_summary', {})
-            })
-    
-    except Exception as e:
-        logger.error(f"Error requesting session: {e}")
-        emit('error', {'message': str(e)})
+    # May wait in the admission queue before the usual handler work
+    dispatch_client_event('request_session', process_request_session, data,
+                          timeout=HANDLER_TIMEOUT + ADMISSION_TIMEOUT)
 
 @socketio.on('start_session')
 def handle_start_session(data):
     """Handle session start"""
-    if not realtime_manager:
-        emit('error', {'message': 'Realtime manager not initialized'})
-        return
-    
-    try:
-        session_id = data.get('session_id')
-        
-        if session_id not in active_sessions:
-            emit('error', {'message': 'Session not found'})
-            return
-        
-        # Run async function in thread
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
-        start_result = loop.run_until_complete(
-            realtime_manager.start_realtime_session(session_id, user_confirmed=True)
-        )
-        
-        loop.close()
-        
-        if start_result.get('started'):
-            emit('session_starting', {
-                'session_id': session_id,
-                'message': 'Session starting...'
-            })
-        else:
-            emit('session_start_failed', {
-                'error': start_result.get('error', 'Unknown error')
-            })
-            
-            # Remove from active sessions
-            if session_id in active_sessions:
-                del active_sessions[session_id]
-    
-    except Exception as e:
-        logger.error(f"Error starting session: {e}")
-        emit('error', {'message': str(e)})
+    dispatch_client_event('start_session', process_start_session, data)
 
 @socketio.on('send_message')
 def handle_send_message(data):
     """Handle sending a message"""
-    if not realtime_manager:
-        emit('error', {'message': 'Realtime manager not initialized'})
-        return
-    
-    try:
-        session_id = data.get('session_id')
-        message = data.get('message', '').strip()
-        
-        if not message:
-            emit('error', {'message': 'Message cannot be empty'})
-            return
-        
-        if session_id not in active_sessions:
-            emit('error', {'message': 'Session not found'})
-            return
-        
-        # Run async function in thread
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
-        send_result = loop.run_until_complete(
-            realtime_manager.send_text_to_session(session_id, message)
-        )
-        
-        loop.close()
-        
-        if send_result.get('text_sent'):
-            emit('message_sent', {
-                'message': message,
-                'timestamp': datetime.now().isoformat()
-            })
-        else:
-            emit('message_send_failed', {
-                'error': send_result.get('error', 'Unknown error')
-            })
-    
-    except Exception as e:
-        logger.error(f"Error sending message: {e}")
-        emit('error', {'message': str(e)})
+    dispatch_client_event('send_message', process_send_message, data)
 
 @socketio.on('end_session')
 def handle_end_session(data):
     """Handle ending a session"""
-    if not realtime_manager:
-        emit('error', {'message': 'Realtime manager not initialized'})
-        return
-    
-    try:
-        session_id = data.get('session_id')
-        
-        if session_id not in active_sessions:
-            emit('error', {'message': 'Session not found'})
-            return
-        
-        # Run async function in thread
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
-        end_result = loop.run_until_complete(
-            realtime_manager.end_session(session_id)
-        )
-        
-        loop.close()
-        
-        emit('session_ending', {
-            'session_id': session_id,
-            'summary': end_result.get('summary', {})
-        })
-        
-        # Remove from active sessions
-        if session_id in active_sessions:
-            del active_sessions[session_id]
-    
-    except Exception as e:
-        logger.error(f"Error ending session: {e}")
-        emit('error', {'message': str(e)})
+    dispatch_client_event('end_session', process_end_session, data)
+
+@socketio.on('audio_chunk')
+def handle_audio_chunk(data):
+    """Handle binary microphone audio from the browser"""
+    dispatch_client_event('audio_chunk', process_audio_chunk, data)
+
+@socketio.on('audio_metrics')
+def handle_audio_metrics(data):
+    """Handle playback latency report"""
+    dispatch_client_event('audio_metrics', process_audio_metrics, data)
 
 if __name__ == '__main__':
     # Check for required environment variables
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+GPT-4o Realtime API ASGI Application - native async Socket.IO server
+
+Alternative to the threaded server in app.py. Browser sockets and the upstream
+Realtime API websockets share one event loop, so idle sessions cost a
+coroutine instead of an OS thread. The Flask routes and templates from app.py
+are mounted unchanged.
+
+Run with:  python asgi.py   (or: uvicorn asgi:asgi_app --port $PORT)
+
+Set REALTIME_WORKERS=N to run N worker processes. Each session stays pinned to
+the worker holding its upstream socket; Socket.IO emits and session commands
+travel between workers over a local Unix-socket message queue in
+REALTIME_BUS_DIR, and daily budget totals are shared through the cost data
+directory.
+"""
+import os
+import asyncio
+import logging
+import socketio
+from asgiref.wsgi import WsgiToAsgi
+
+import app as web_app
+from integrations.realtime_cost_tracker import get_realtime_tracker
+from integrations.worker_cluster import LocalBusManager, SessionRegistry, DEFAULT_BUS_DIR
+
+logger = logging.getLogger(__name__)
+
+WORKERS = int(os.getenv('REALTIME_WORKERS', '1'))
+BUS_DIR = os.getenv('REALTIME_BUS_DIR', DEFAULT_BUS_DIR)
+
+# Multi-worker mode: share Socket.IO rooms, session ownership and the daily budget
+bus_manager = None
+if WORKERS > 1:
+    bus_manager = LocalBusManager(BUS_DIR)
+    web_app.session_registry = SessionRegistry(BUS_DIR, bus_manager.worker_id)
+    # Polling requests could land on any worker, so browsers must use a single websocket
+    web_app.socket_options = {'transports': ['websocket']}
+    get_realtime_tracker().enable_shared_budget()
+
+# Native async Socket.IO server; Flask handles every non-Socket.IO path
+sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins="*", client_manager=bus_manager)
+asgi_app = socketio.ASGIApp(sio, other_asgi_app=WsgiToAsgi(web_app.app))
+
+# Pending emits scheduled from synchronous manager callbacks
+_emit_tasks = set()
+
+def emit_to_client(event, payload, room):
+    """Schedule an emit on the running loop (manager callbacks are synchronous)"""
+    task = asyncio.get_running_loop().create_task(sio.emit(event, payload, to=room))
+    _emit_tasks.add(task)
+    task.add_done_callback(_emit_tasks.discard)
+
+# Route realtime manager events through the async server
+web_app.emit_to_client = emit_to_client
+
+async def dispatch_client_event(sid, name, processor, data):
+    """Run a session operation on this loop and emit its results"""
+    if forward_to_owner(sid, name, data):
+        return
+    
+    if not web_app.realtime_manager:
+        await sio.emit('error', {'message': 'Realtime manager not initialized'}, to=sid)
+        return
+
+    try:
+        for event, payload in await processor(sid, data or {}):
+            await sio.emit(event, payload, to=sid)
+    except Exception as e:
+        logger.error(f"Error handling {name}: {e}")
+        await sio.emit('error', {'message': str(e)}, to=sid)
+
+SESSION_PROCESSORS = {
+    'request_session': web_app.process_request_session,
+    'start_session': web_app.process_start_session,
+    'send_message': web_app.process_send_message,
+    'end_session': web_app.process_end_session,
+    'audio_chunk': web_app.process_audio_chunk,
+    'audio_metrics': web_app.process_audio_metrics,
+}
+
+def forward_to_owner(sid, name, data):
+    """Hand a command for a session owned by another worker to that worker"""
+    if not bus_manager or not data:
+        return False
+
+    session_id = data.get('session_id')
+    if not session_id or session_id in web_app.active_sessions:
+        return False
+
+    owner = web_app.session_registry.owner(session_id)
+    if not owner or owner == bus_manager.worker_id:
+        return False
+
+    return bus_manager.send_command(owner, {'event': name, 'sid': sid, 'data': data})
+
+async def handle_session_command(command):
+    """Run a command forwarded by another worker for a session we own"""
+    event, sid, data = command.get('event'), command.get('sid'), command.get('data') or {}
+
+    if event == 'disconnect':
+        if web_app.realtime_manager:
+            await web_app.end_client_sessions(sid)
+        return
+
+    processor = SESSION_PROCESSORS.get(event)
+    if not processor:
+        logger.warning(f"Ignoring unknown session command: {event}")
+        return
+
+    # Replies go to the client's current socket, wherever it is connected
+    session_info = web_app.active_sessions.get(data.get('session_id'))
+    if session_info:
+        session_info['socket_id'] = sid
+
+    await dispatch_client_event(sid, event, processor, data)
+
+if bus_manager:
+    bus_manager.command_handler = handle_session_command
+
+@sio.on('connect')
+async def handle_connect(sid, environ):
+    """Handle client connection"""
+    logger.info(f"Client connected: {sid}")
+    web_app.register_client(sid, environ)
+    await sio.emit('connected', {'message': 'Connected to GPT-4o Realtime API server'}, to=sid)
+
+@sio.on('disconnect')
+async def handle_disconnect(sid):
+    """Handle client disconnection"""
+    logger.info(f"Client disconnected: {sid}")
+    web_app.client_identities.pop(sid, None)
+
+    # End any active sessions for this client, including ones owned by other workers
+    if bus_manager:
+        bus_manager.broadcast_command({'event': 'disconnect', 'sid': sid})
+    if web_app.realtime_manager:
+        await web_app.end_client_sessions(sid)
+
+@sio.on('request_session')
+async def handle_request_session(sid, data):
+    """Handle session request"""
+    await dispatch_client_event(sid, 'request_session', web_app.process_request_session, data)
+
+@sio.on('start_session')
+async def handle_start_session(sid, data):
+    """Handle session start"""
+    await dispatch_client_event(sid, 'start_session', web_app.process_start_session, data)
+
+@sio.on('send_message')
+async def handle_send_message(sid, data):
+    """Handle sending a message"""
+    await dispatch_client_event(sid, 'send_message', web_app.process_send_message, data)
+
+@sio.on('end_session')
+async def handle_end_session(sid, data):
+    """Handle ending a session"""
+    await dispatch_client_event(sid, 'end_session', web_app.process_end_session, data)
+
+@sio.on('audio_chunk')
+async def handle_audio_chunk(sid, data):
+    """Handle binary microphone audio from the browser"""
+    await dispatch_client_event(sid, 'audio_chunk', web_app.process_audio_chunk, data)
+
+@sio.on('audio_metrics')
+async def handle_audio_metrics(sid, data):
+    """Handle playback latency report"""
+    await dispatch_client_event(sid, 'audio_metrics', web_app.process_audio_metrics, data)
+
+# ASGI servers import this module directly, so initialize here rather than in __main__
+if os.getenv('OPENAI_API_KEY'):
+    web_app.init_realtime_manager()
+else:
+    logger.error("OPENAI_API_KEY environment variable not set")
+
+if __name__ == '__main__':
+    import uvicorn
+
+    if not web_app.realtime_manager:
+        exit(1)
+
+    # Get port from environment (Railway provides this)
+    port = int(os.getenv('PORT', 5000))
+
+    logger.info(f"Starting GPT-4o Realtime API async server on port {port}")
+    logger.info("Dashboard available at /dashboard")
+
+    if WORKERS > 1:
+        # Workers re-import this module, so pass the app by import string
+        logger.info(f"Running {WORKERS} workers sharing message bus {BUS_DIR}")
+        uvicorn.run('asgi:asgi_app', host='0.0.0.0', port=port, workers=WORKERS, log_level='info')
+    else:
+        uvicorn.run(asgi_app, host='0.0.0.0', port=port, log_level='info')
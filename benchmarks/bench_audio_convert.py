@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark: real-time factor of input audio conversion to 24 kHz PCM16 (one core)
+
+Streams two minutes of synthetic speech-band audio through AudioConverter in
+fixed-size chunks, as a browser or telephony source would deliver it. RTF is
+processing time divided by audio duration; 1 / RTF is roughly how many
+concurrent streams a single core can convert.
+
+    python benchmarks/bench_audio_convert.py [--chunk-ms 20] [--seconds 120]
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+
+from integrations.audio_convert import AudioConverter
+
+CASES = [
+    ("browser 48 kHz float32 mono", 48000, "float32", 1),
+    ("browser 44.1 kHz float32 stereo", 44100, "float32", 2),
+    ("wideband 16 kHz pcm16", 16000, "pcm16", 1),
+    ("telephony 8 kHz pcm16", 8000, "pcm16", 1),
+    ("24 kHz float32 (format only)", 24000, "float32", 1),
+]
+
+def synthetic_audio(rate: int, fmt: str, channels: int, seconds: float) -> bytes:
+    """Noise-modulated tones roughly shaped like voiced speech"""
+    rng = np.random.default_rng(0)
+    t = np.arange(int(rate * seconds)) / rate
+    signal = 0.3 * np.sin(2 * np.pi * 180 * t) * (0.6 + 0.4 * np.sin(2 * np.pi * 3 * t))
+    signal += 0.05 * rng.standard_normal(t.size)
+    if channels > 1:
+        signal = np.repeat(signal, channels)
+    if fmt == "pcm16":
+        return (np.clip(signal, -1, 1) * 32767).astype(np.int16).tobytes()
+    return signal.astype(np.float32).tobytes()
+
+def run_case(rate: int, fmt: str, channels: int, seconds: float, chunk_ms: int) -> dict:
+    data = synthetic_audio(rate, fmt, channels, seconds)
+    converter = AudioConverter(rate, fmt, channels)
+    chunk_bytes = rate * chunk_ms // 1000 * converter.input_frame_bytes
+    chunks = [data[i:i + chunk_bytes] for i in range(0, len(data), chunk_bytes)]
+
+    converter.convert(chunks[0])  # size the work buffers
+    start = time.process_time()
+    for chunk in chunks:
+        converter.convert(chunk)
+    elapsed = time.process_time() - start
+
+    rtf = elapsed / seconds
+    return {
+        "rtf": rtf,
+        "streams_per_core": 1 / rtf if rtf else float("inf"),
+        "us_per_chunk": elapsed / len(chunks) * 1e6
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=120.0, help="Audio per case")
+    parser.add_argument("--chunk-ms", type=int, default=20, help="Chunk size as delivered by the source")
+    args = parser.parse_args()
+
+    print(f"{args.seconds:g}s of audio per case, {args.chunk_ms} ms chunks")
+    for label, rate, fmt, channels in CASES:
+        result = run_case(rate, fmt, channels, args.seconds, args.chunk_ms)
+        print(f"{label:<34} RTF {result['rtf']:.5f}  ~{result['streams_per_core']:>8,.0f} streams/core  "
+              f"{result['us_per_chunk']:6.1f} us/chunk")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark: /api/history range queries over a year of daily cost ledgers
+
+Writes a year of realtime_costs_<date> ledgers: each day is a compacted
+snapshot, and some days also have a journal tail. It then times a full-year
+CostHistory query three ways. The cold query parses every day. The warm
+query serves every day from the cache. The last query runs after one more
+session is appended to a single day, so only that day is parsed again.
+
+    python benchmarks/bench_cost_history.py [--days 365] [--sessions-per-day 200]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from integrations.cost_journal import CostJournal
+from integrations.cost_history import CostHistory
+
+def make_record(day: str, i: int) -> dict:
+    cost = 0.0123 + (i % 97) * 1e-4
+    return {
+        "session": {
+            "session_id": f"eva_realtime_web_user_{i:08d}_{i:08x}",
+            "user_id": f"web_user_{i % 50:08d}",
+            "start_time": f"{day}T12:00:00.000000",
+            "end_time": f"{day}T12:01:30.000000",
+            "duration_seconds": 90.0,
+            "cost": round(cost, 4),
+            "audio_input_seconds": 20.5,
+            "audio_output_seconds": 31.25
+        },
+        "cost": cost,
+        "audio_seconds": 51.75
+    }
+
+def write_year(data_dir: str, first: date, days: int, sessions: int):
+    for offset in range(days):
+        day = (first + timedelta(days=offset)).isoformat()
+        journal = CostJournal(data_dir, day, fsync="never")
+        ledger = journal.load()
+        for i in range(sessions):
+            journal.append(ledger, make_record(day, i))
+        if offset % 7:
+            journal.compact(ledger)  # Weekly days keep a journal tail to replay
+        journal.close()
+
+def timed(history: CostHistory, first: date, last: date):
+    start = time.perf_counter()
+    result = history.history(first, last)
+    return (time.perf_counter() - start) * 1000, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--sessions-per-day", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=20, help="Warm queries to average")
+    args = parser.parse_args()
+
+    first = date(2000, 1, 3)
+    last = first + timedelta(days=args.days - 1)
+    with tempfile.TemporaryDirectory() as data_dir:
+        started = time.perf_counter()
+        write_year(data_dir, first, args.days, args.sessions_per_day)
+        print(f"{args.days} days x {args.sessions_per_day} sessions written in {time.perf_counter() - started:.1f}s")
+
+        history = CostHistory(data_dir)
+        cold_ms, result = timed(history, first, last)
+        expected = args.days * args.sessions_per_day
+        assert result["totals"]["sessions"] == expected, result["totals"]
+
+        warm = [timed(history, first, last)[0] for _ in range(args.repeat)]
+
+        day = (first + timedelta(days=args.days // 2)).isoformat()
+        journal = CostJournal(data_dir, day, fsync="never")
+        journal.append(journal.load(), make_record(day, args.sessions_per_day))
+        journal.close()
+        misses = history.stats["misses"]
+        changed_ms, result = timed(history, first, last)
+        assert result["totals"]["sessions"] == expected + 1
+
+        print(f"  cold (parse every day)   {cold_ms:8.1f} ms")
+        print(f"  warm (all cached)        {sum(warm) / len(warm):8.1f} ms avg, {min(warm):.1f} ms best")
+        print(f"  one day changed          {changed_ms:8.1f} ms ({history.stats['misses'] - misses} day re-parsed)")
+        print(f"  {len(result['weekly'])} weeks, {len(result['monthly'])} months, "
+              f"total ${result['totals']['cost']:.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Benchmark: recording ended sessions, full daily-file rewrite vs append-only journal
+
+The old tracker rewrote realtime_costs_<date>.json (indent=2) on every
+end_session, so each save costs O(sessions so far). For each day size this
+times that rewrite at a few points and integrates to estimate the whole day.
+It then runs every session through CostJournal under each fsync policy and
+reports the per-append latency (compactions included), the total time, and
+how long recovery (snapshot + journal replay) takes at the end of the day.
+
+    python benchmarks/bench_cost_journal.py [--sessions 10000 100000] [--always-sessions 2000]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from integrations.cost_journal import CostJournal, empty_day, apply_record
+
+DATE = "2000-01-01"
+
+def make_record(i: int) -> dict:
+    cost = 0.0123 + (i % 97) * 1e-4
+    return {
+        "session": {
+            "session_id": f"eva_realtime_web_user_{i:08d}_{1700000000 + i}",
+            "start_time": "2000-01-01T12:00:00.000000",
+            "end_time": "2000-01-01T12:01:30.000000",
+            "duration_seconds": 90.0,
+            "cost": round(cost, 4),
+            "audio_input_seconds": 20.5,
+            "audio_output_seconds": 31.25
+        },
+        "cost": cost,
+        "audio_seconds": 51.75
+    }
+
+def rewrite_estimate(sessions: int, data_dir: Path, points: int = 5) -> float:
+    """Seconds a day of full rewrites would take, from rewrites timed at a few sizes"""
+    day = empty_day(DATE)
+    data_file = data_dir / "rewrite.json"
+    samples = []
+    done = 0
+    for target in [sessions * (k + 1) // points for k in range(points)]:
+        while done < target:
+            apply_record(day, make_record(done))
+            done += 1
+        start = time.perf_counter()
+        tmp_file = data_file.with_suffix(".tmp")
+        with open(tmp_file, 'w') as f:
+            json.dump(day, f, indent=2)
+        os.replace(tmp_file, data_file)
+        samples.append((target, time.perf_counter() - start))
+
+    # Rewrite time grows linearly with the day; integrate the per-save cost
+    total, previous_n, previous_t = 0.0, 0, 0.0
+    for n, t in samples:
+        total += (n - previous_n) * (previous_t + t) / 2
+        previous_n, previous_t = n, t
+    return total, samples[-1][1]
+
+def journal_run(sessions: int, fsync: str, data_dir: Path) -> dict:
+    records = [make_record(i) for i in range(sessions)]
+    journal = CostJournal(data_dir, DATE, fsync=fsync)
+    day = journal.load()
+
+    latencies = []
+    start = time.perf_counter()
+    for record in records:
+        t0 = time.perf_counter()
+        journal.append(day, record)
+        latencies.append(time.perf_counter() - t0)
+    total = time.perf_counter() - start
+    journal.close()
+
+    recovered = CostJournal(data_dir, DATE).load()
+    assert recovered["total_sessions"] == sessions
+    assert abs(recovered["total_cost"] - day["total_cost"]) < 1e-6
+
+    latencies.sort()
+    return {
+        "total_s": total,
+        "p50_us": statistics.median(latencies) * 1e6,
+        "p99_us": latencies[int(len(latencies) * 0.99)] * 1e6,
+        "max_ms": latencies[-1] * 1000,
+        "compactions": journal.stats["compactions"],
+        "recovery_ms": journal_load_ms(data_dir)
+    }
+
+def journal_load_ms(data_dir: Path) -> float:
+    journal = CostJournal(data_dir, DATE)
+    journal.load()
+    return journal.stats["last_load_ms"]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[10000, 100000], help="Sessions per day")
+    parser.add_argument("--always-sessions", type=int, default=2000,
+                        help="Cap for the fsync=always run (one disk flush per session)")
+    args = parser.parse_args()
+
+    for sessions in args.sessions:
+        print(f"\n{sessions:,} sessions/day")
+        with tempfile.TemporaryDirectory() as tmp:
+            total, last = rewrite_estimate(sessions, Path(tmp))
+            print(f"  full rewrite        ~{total:8.1f} s/day (est.)  last save {last * 1000:8.1f} ms")
+
+        for fsync in ("never", "interval", "always"):
+            count = min(sessions, args.always_sessions) if fsync == "always" else sessions
+            with tempfile.TemporaryDirectory() as tmp:
+                result = journal_run(count, fsync, Path(tmp))
+            scaled = f" ({count:,} run)" if count != sessions else ""
+            print(f"  journal fsync={fsync:<8} {result['total_s'] * sessions / count:8.2f} s/day{scaled}  "
+                  f"p50 {result['p50_us']:6.1f} us  p99 {result['p99_us']:7.1f} us  "
+                  f"max {result['max_ms']:7.1f} ms  {result['compactions']} compactions  "
+                  f"recovery {result['recovery_ms']:7.1f} ms")
+
+if __name__ == "__main__":
+    main()
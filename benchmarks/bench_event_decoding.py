@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark: upstream event decoding throughput (events/sec on one core)
+
+Compares a plain json.loads of every frame with RealtimeEventDecoder on each
+available JSON backend. Frames come from a recording (one raw server event per
+line) or from a synthetic audio-heavy stream shaped like a real response.
+
+    python benchmarks/bench_event_decoding.py
+    python benchmarks/bench_event_decoding.py --recording frames.jsonl
+"""
+import os
+import sys
+import json
+import time
+import base64
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from integrations.realtime_event_decoder import RealtimeEventDecoder, JSON_BACKENDS
+from integrations.gpt4o_realtime_client import HANDLED_EVENT_TYPES
+
+def synthetic_stream(responses: int = 50, chunk_ms: int = 100, sample_rate: int = 24000):
+    """Frames for `responses` spoken replies of ~3s each, in server order"""
+    chunk = base64.b64encode(os.urandom(sample_rate * 2 * chunk_ms // 1000)).decode()
+    frames = []
+    for r in range(responses):
+        response_id = f"resp_{r:06d}"
+        item_id = f"item_{r:06d}"
+        frames.append({"type": "response.created", "event_id": f"evt_{r}_c", "response": {"id": response_id}})
+        for i in range(3000 // chunk_ms):
+            frames.append({"type": "response.audio_transcript.delta", "event_id": f"evt_{r}_t{i}",
+                           "response_id": response_id, "item_id": item_id, "output_index": 0,
+                           "content_index": 0, "delta": "word "})
+            frames.append({"type": "response.audio.delta", "event_id": f"evt_{r}_a{i}",
+                           "response_id": response_id, "item_id": item_id, "output_index": 0,
+                           "content_index": 0, "delta": chunk})
+        frames.append({"type": "response.audio.done", "event_id": f"evt_{r}_ad", "response_id": response_id})
+        frames.append({"type": "response.done", "event_id": f"evt_{r}_d",
+                       "response": {"id": response_id, "status": "completed", "output": []}})
+    return [json.dumps(frame, separators=(",", ":")) for frame in frames]
+
+def load_recording(path: str):
+    with open(path, "r") as f:
+        return [line.rstrip("\n") for line in f if line.strip()]
+
+def measure(decode, frames, min_seconds: float = 1.0) -> float:
+    """Events per second for decode() over frames, repeated for at least min_seconds"""
+    events = 0
+    start = time.perf_counter()
+    while True:
+        for frame in frames:
+            decode(frame)
+        events += len(frames)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return events / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recording", help="JSONL file of raw server events")
+    parser.add_argument("--seconds", type=float, default=2.0, help="Minimum run time per case")
+    args = parser.parse_args()
+
+    frames = load_recording(args.recording) if args.recording else synthetic_stream()
+    audio_frames = sum(1 for frame in frames if '"response.audio.delta"' in frame[:64])
+    total_mb = sum(len(frame) for frame in frames) / 1e6
+    print(f"{len(frames)} frames, {audio_frames} audio deltas, {total_mb:.1f} MB")
+
+    baseline = measure(json.loads, frames, args.seconds)
+    print(f"{'json.loads (baseline)':<28} {baseline:>12,.0f} events/s")
+
+    for backend in JSON_BACKENDS:
+        decoder = RealtimeEventDecoder(handled_types=HANDLED_EVENT_TYPES, backend=backend)
+        rate = measure(decoder.decode, frames, args.seconds)
+        print(f"{'decoder[' + backend + ']':<28} {rate:>12,.0f} events/s  ({rate / baseline:.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark: API audio formats - wire bytes per second and CPU per frame
+
+For each format, measures how large the input_audio_buffer.append messages
+are for one second of local 24 kHz PCM16 audio. It also measures the CPU time
+to build one append message (resample + encode + base64 + JSON) and to turn
+one response.audio.delta payload back into local PCM16 (base64 + decode +
+resample). The API's G.711 formats are 8 kHz.
+
+    python benchmarks/bench_g711.py [--frame-ms 100]
+"""
+import os
+import sys
+import json
+import time
+import base64
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from integrations import g711
+
+SAMPLE_RATE = 24000
+
+def per_call_us(fn, arg, min_seconds: float = 0.5) -> float:
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        for _ in range(100):
+            fn(arg)
+        calls += 100
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return elapsed / calls * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frame-ms", type=int, default=100, help="Audio per append/delta message")
+    args = parser.parse_args()
+
+    frame = os.urandom(SAMPLE_RATE * 2 * args.frame_ms // 1000)
+    frames_per_second = 1000 / args.frame_ms
+    backend = "numpy" if g711.NUMPY_AVAILABLE else "pure Python"
+    print(f"{args.frame_ms} ms frames of 24 kHz mono audio, G.711 tables via {backend}")
+
+    for codec in g711.AUDIO_CODECS:
+        if codec == "pcm16":
+            to_wire = from_wire = lambda data: data
+        else:
+            transcoder = g711.G711Transcoder(codec, SAMPLE_RATE)
+            to_wire, from_wire = transcoder.encode, transcoder.decode
+
+        def build_append(pcm, to_wire=to_wire):
+            return json.dumps({
+                "type": "input_audio_buffer.append",
+                "audio": base64.b64encode(to_wire(pcm)).decode("ascii")
+            })
+
+        def read_delta(encoded, from_wire=from_wire):
+            return from_wire(base64.b64decode(encoded))
+
+        payload = base64.b64encode(to_wire(frame)).decode("ascii")  # also builds lookup tables
+        wire_bytes = len(build_append(frame)) * frames_per_second
+        print(f"{codec:<10} {wire_bytes / 1024:7.1f} KiB/s on the wire  "
+              f"append {per_call_us(build_append, frame):7.1f} us/frame  "
+              f"delta {per_call_us(read_delta, payload):7.1f} us/frame")
+
+if __name__ == "__main__":
+    main()
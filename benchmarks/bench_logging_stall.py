@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark: event-loop stall caused by OpenAILogger, synchronous vs queue-backed
+
+A coroutine logs like a busy realtime session (audio usage records plus
+request traces with large payloads) and times every logger call it makes on
+the event loop. A ticker coroutine measures how late its 1 ms sleeps wake up.
+--disk-latency-ms adds a delay to each file write to model slow or contended
+storage, which is where synchronous handlers hurt most.
+
+The queue-backed mode keeps disk writes off the loop, not the whole cost of a
+log call. Each call still builds its message and LogRecord on the loop (about
+25-30 us per audio record), and can wait for the GIL while the writer thread
+formats. --profile prints where the loop thread's time goes in that mode.
+
+    python benchmarks/bench_logging_stall.py [--seconds 3] [--rate 2000] [--disk-latency-ms 1] [--profile]
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import logging
+import tempfile
+import statistics
+import cProfile
+import pstats
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from integrations.openai_logger import OpenAILogger
+
+TICK = 0.001
+
+async def ticker(lags, stop):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - start - TICK)
+
+async def producer(logger, rate, seconds, stop, call_times):
+    payload = {
+        "model": "gpt-4o",
+        "messages": [{"role": "user", "content": "x" * 2000} for _ in range(20)]
+    }
+    deadline = time.perf_counter() + seconds
+    batch = max(1, rate // 100)
+    while time.perf_counter() < deadline:
+        for i in range(batch):
+            start = time.perf_counter()
+            logger.log_realtime_audio("bench_session", "output", 0.1)
+            if i % 50 == 0:
+                request_id = logger.log_request_start("POST", "https://api.openai.com/v1/chat/completions", payload)
+                logger.log_request_end(request_id, {"model": "gpt-4o", "usage": {"input_tokens": 10}}, 0.1, 200)
+            call_times.append(time.perf_counter() - start)
+        await asyncio.sleep(0.01)
+    stop.set()
+
+async def run_case(async_logging, rate, seconds):
+    with tempfile.TemporaryDirectory() as log_dir:
+        logger = OpenAILogger(log_dir=log_dir, async_logging=async_logging)
+        logger.log_realtime_session_start("bench_session")
+        # Keep the benchmark's output off the console
+        for name in ("openai_api", "openai_errors", "openai_trace"):
+            logging.getLogger(name).propagate = False
+
+        lags, call_times, stop = [], [], asyncio.Event()
+        await asyncio.gather(ticker(lags, stop), producer(logger, rate, seconds, stop, call_times))
+        logger.close()
+
+        lags.sort()
+        call_times.sort()
+        return {
+            "blocked_ms_per_s": sum(call_times) * 1000 / seconds,
+            "call_p99_us": call_times[int(len(call_times) * 0.99)] * 1e6,
+            "lag_p99_ms": lags[int(len(lags) * 0.99)] * 1000,
+            "lag_max_ms": lags[-1] * 1000,
+            "dropped": logger.dropped_log_records
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--rate", type=int, default=2000, help="Audio log records per second")
+    parser.add_argument("--disk-latency-ms", type=float, default=0.0, help="Simulated latency per file write")
+    parser.add_argument("--profile", action="store_true", help="Profile the loop thread in queue-backed mode")
+    args = parser.parse_args()
+
+    if args.disk_latency_ms:
+        emit = logging.FileHandler.emit
+        delay = args.disk_latency_ms / 1000
+
+        def slow_emit(handler, record):
+            emit(handler, record)
+            time.sleep(delay)
+
+        logging.FileHandler.emit = slow_emit
+
+    for label, async_logging in (("synchronous FileHandler", False), ("queue-backed", True)):
+        result = asyncio.run(run_case(async_logging, args.rate, args.seconds))
+        print(f"{label:<24} blocked {result['blocked_ms_per_s']:7.1f} ms/s  "
+              f"call p99 {result['call_p99_us']:8.1f} us  loop lag p99 {result['lag_p99_ms']:6.2f} ms  "
+              f"max {result['lag_max_ms']:6.2f} ms  dropped {result['dropped']}")
+
+    if args.profile:
+        # cProfile only sees the thread it runs in: the event loop, not the writer threads
+        profiler = cProfile.Profile()
+        profiler.runcall(asyncio.run, run_case(True, args.rate, args.seconds))
+        pstats.Stats(profiler).sort_stats("tottime").print_stats(12)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Stress check: concurrent session accounting in RealtimeCostTracker
+
+Starts hundreds of simulated sessions at once, each on its own thread,
+recording audio deltas the way client event loops do. Other threads poll
+the daily summary and usage trends at the same time, and a few sessions
+are ended twice concurrently, as a disconnect racing a limit handler would.
+Afterwards it checks that the daily ledger, the replayed journal and the
+logger totals all match the audio actually recorded. It reports deltas
+per second across all threads.
+
+    python benchmarks/stress_cost_tracker.py [--sessions 400] [--deltas 500] [--flush-interval 0.01]
+"""
+import os
+import sys
+import math
+import time
+import random
+import logging
+import argparse
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from integrations.openai_logger import OpenAILogger
+from integrations.cost_journal import CostJournal
+from integrations.realtime_cost_tracker import RealtimeCostTracker
+
+def run_session(tracker, session_id, deltas, seed, start_gate, recorded, errors):
+    rng = random.Random(seed)
+    durations = [rng.choice((0.02, 0.04, 0.1, 0.25)) for _ in range(deltas)]
+    start_gate.wait()
+    try:
+        for i, duration in enumerate(durations):
+            tracker.record_audio_usage(session_id, "output" if i % 3 else "input", duration)
+        recorded[session_id] = math.fsum(durations)
+
+        if seed % 50 == 0:
+            # Racing double end: exactly one may succeed
+            results = []
+            racer = threading.Thread(target=lambda: results.append(tracker.end_session(session_id)))
+            racer.start()
+            results.append(tracker.end_session(session_id))
+            racer.join()
+            if sum(1 for r in results if r.get("session_ended")) != 1:
+                errors.append(f"{session_id} ended {len(results)} times")
+        else:
+            tracker.end_session(session_id)
+    except Exception as e:
+        errors.append(f"{session_id}: {e!r}")
+
+def poll(tracker, stop, counts, interval):
+    while not stop.is_set():
+        tracker.get_daily_summary()
+        tracker.usage_trends("minute", 5)
+        counts[0] += 1
+        stop.wait(interval)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=400, help="Concurrent sessions (one thread each)")
+    parser.add_argument("--deltas", type=int, default=500, help="Audio deltas per session")
+    parser.add_argument("--flush-interval", type=float, default=0.01, help="Tracker usage flush interval (s)")
+    parser.add_argument("--pollers", type=int, default=4, help="Threads reading summaries meanwhile")
+    parser.add_argument("--poll-ms", type=float, default=10.0, help="Pause between each poller's reads")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        logger = OpenAILogger(log_dir=os.path.join(tmp, "logs"), log_level="WARNING", trace_level="WARNING")
+        for name in ("openai_api", "openai_errors", "openai_trace"):
+            logging.getLogger(name).propagate = False
+
+        # Injected, so the tracker never builds the global logger writing INFO to ./logs
+        tracker = RealtimeCostTracker(data_dir=os.path.join(tmp, "costs"), usage_flush_interval=args.flush_interval,
+                                      logger=logger)
+        tracker.update_limits({
+            "max_daily_sessions": args.sessions * 2,
+            "max_cost_per_day": 1e9,
+            "max_cost_per_session": 1e9,
+            "max_session_duration": 3600
+        })
+
+        session_ids = [f"eva_realtime_stress{i % 37}_{i:08x}" for i in range(args.sessions)]
+        for session_id in session_ids:
+            tracker.start_session(session_id)
+
+        start_gate = threading.Barrier(args.sessions + 1)
+        recorded, errors = {}, []
+        threads = [
+            threading.Thread(target=run_session,
+                             args=(tracker, session_id, args.deltas, i, start_gate, recorded, errors))
+            for i, session_id in enumerate(session_ids)
+        ]
+        for thread in threads:
+            thread.start()
+
+        stop, poll_counts = threading.Event(), [0]
+        pollers = [
+            threading.Thread(target=poll, args=(tracker, stop, poll_counts, args.poll_ms / 1000))
+            for _ in range(args.pollers)
+        ]
+        for poller in pollers:
+            poller.start()
+
+        start_gate.wait()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        stop.set()
+        for poller in pollers:
+            poller.join()
+        tracker.close()
+
+        expected_seconds = math.fsum(recorded.values())
+        expected_cost = expected_seconds * tracker._audio_cost_per_second
+        daily = tracker.daily_data
+        replayed = CostJournal(tracker.data_dir, daily["date"]).load()
+
+        total_deltas = args.sessions * args.deltas
+        print(f"{args.sessions} sessions x {args.deltas} deltas on {args.sessions} threads, "
+              f"flush every {args.flush_interval * 1000:g} ms, {args.pollers} threads polling every {args.poll_ms:g} ms")
+        print(f"  {total_deltas:,} deltas in {elapsed:.2f}s = {total_deltas / elapsed:,.0f} deltas/s "
+              f"({poll_counts[0]:,} summary polls meanwhile)")
+
+        checks = {
+            "sessions": (daily["total_sessions"], args.sessions),
+            "active after end": (len(tracker.session_data), 0),
+            "audio seconds": (daily["total_audio_seconds"], expected_seconds),
+            "cost": (daily["total_cost"], expected_cost),
+            "replayed cost": (replayed["total_cost"], expected_cost),
+            "logger audio seconds": (logger.total_audio_seconds, expected_seconds),
+            "logger cost": (logger.total_cost, expected_cost),
+        }
+        failed = list(errors)
+        for name, (actual, expected) in checks.items():
+            ok = math.isclose(actual, expected, rel_tol=1e-9, abs_tol=1e-9)
+            print(f"  {'ok  ' if ok else 'FAIL'} {name:<22} {actual:.6f} (expected {expected:.6f})")
+            if not ok:
+                failed.append(name)
+
+        for error in errors[:10]:
+            print(f"  FAIL {error}")
+        sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Stress check: daily limits across worker processes sharing one cost data directory
+
+Starts several worker processes, each with its own RealtimeCostTracker on the
+same data_dir, the way REALTIME_WORKERS or gunicorn workers run. Every worker
+reserves sessions as fast as it can, spends part of each reservation on audio
+and ends the session, until the day's budget or session limit is used up. The
+parent samples the shared ledger while they run. Afterwards it checks the
+totals: cost spent, sessions ended (also as replayed from the journal) and
+peak concurrency must all stay within the limits. With --no-share each worker
+only knows its own reservations, which shows the overrun the shared ledger
+prevents.
+
+    python benchmarks/stress_shared_ledger.py [--workers 8] [--max-cost-per-day 2.0] [--no-share]
+"""
+import os
+import sys
+import time
+import uuid
+import random
+import sqlite3
+import logging
+import argparse
+import tempfile
+import multiprocessing
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from integrations.openai_logger import OpenAILogger
+from integrations.cost_journal import CostJournal
+from integrations.realtime_cost_tracker import RealtimeCostTracker
+
+def worker(index, args, data_dir, start_gate, results):
+    logger = OpenAILogger(log_dir=os.path.join(data_dir, f"logs{index}"), log_level="WARNING", trace_level="WARNING")
+    for name in ("openai_api", "openai_errors", "openai_trace"):
+        logging.getLogger(name).propagate = False
+
+    tracker = RealtimeCostTracker(data_dir=data_dir, usage_flush_interval=0.005, logger=logger)
+    tracker.update_limits({
+        "max_cost_per_session": args.max_cost_per_session,
+        "max_cost_per_day": args.max_cost_per_day,
+        "max_daily_sessions": args.max_daily_sessions,
+        "max_session_duration": 3600
+    })
+    if not args.no_share:
+        tracker.enable_shared_budget()
+
+    rng = random.Random(index)
+    audio_seconds_per_session = args.max_cost_per_session / tracker._audio_cost_per_second
+    counts = {"sessions": 0, "refused": 0, "cost": 0.0}
+
+    start_gate.wait()
+    deadline = time.monotonic() + args.duration
+    while time.monotonic() < deadline:
+        session_id = f"eva_realtime_worker{index}_{uuid.uuid4().hex[:8]}"
+        reservation = tracker.reserve_session(session_id, max_concurrent=args.max_concurrent)
+        if not reservation["reserved"]:
+            counts["refused"] += 1
+            if not reservation.get("retry"):
+                break
+            time.sleep(0.002)
+            continue
+
+        tracker.start_session(session_id)
+        # Spend 30-100% of the reservation in ten deltas while the session stays open
+        seconds = audio_seconds_per_session * rng.uniform(0.3, 1.0) / 10
+        for _ in range(10):
+            tracker.record_audio_usage(session_id, "output", seconds)
+            time.sleep(0.001)
+        result = tracker.end_session(session_id)
+        counts["sessions"] += 1
+        counts["cost"] += result["session_summary"]["cost"]
+
+    tracker.close()
+    results.put(counts)
+
+def sample_ledger(path, stop_at, processes):
+    """Peak open sessions and open cost seen in the shared ledger"""
+    peak_sessions, peak_cost = 0, 0.0
+    conn = None
+    while time.monotonic() < stop_at and any(p.is_alive() for p in processes):
+        try:
+            if conn is None:
+                conn = sqlite3.connect(path, timeout=5.0)
+            sessions, cost = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(MAX(reserved, spent)), 0) FROM open_sessions").fetchone()
+            peak_sessions, peak_cost = max(peak_sessions, sessions), max(peak_cost, cost)
+        except sqlite3.Error:
+            conn = None  # Not created yet
+        time.sleep(0.0005)
+    return peak_sessions, peak_cost
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=8, help="Worker processes")
+    parser.add_argument("--max-cost-per-day", type=float, default=2.0)
+    parser.add_argument("--max-cost-per-session", type=float, default=0.05)
+    parser.add_argument("--max-daily-sessions", type=int, default=100)
+    parser.add_argument("--max-concurrent", type=int, default=6, help="Open sessions allowed across all workers")
+    parser.add_argument("--duration", type=float, default=20.0, help="Give up after this many seconds")
+    parser.add_argument("--no-share", action="store_true", help="Per-process reservations only (shows the overrun)")
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as data_dir:
+        start_gate = ctx.Barrier(args.workers + 1)
+        results = ctx.Queue()
+        processes = [ctx.Process(target=worker, args=(i, args, data_dir, start_gate, results))
+                     for i in range(args.workers)]
+        for process in processes:
+            process.start()
+
+        start_gate.wait()
+        started = time.perf_counter()
+        peak_sessions, peak_cost = sample_ledger(os.path.join(data_dir, "realtime_ledger.db"),
+                                                 time.monotonic() + args.duration + 10, processes)
+        counts = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - started
+
+        ended = sum(c["sessions"] for c in counts)
+        spent = sum(c["cost"] for c in counts)
+        refused = sum(c["refused"] for c in counts)
+
+        mode = "per-process reservations" if args.no_share else "shared ledger"
+        print(f"{args.workers} workers, {mode}: {ended} sessions in {elapsed:.2f}s "
+              f"({refused} refused reservations)")
+        if not args.no_share:
+            print(f"  peak open in ledger: {peak_sessions} sessions holding ${peak_cost:.4f}")
+
+        checks = {
+            "cost spent": (spent, args.max_cost_per_day),
+            "sessions ended": (ended, args.max_daily_sessions),
+        }
+        if not args.no_share:
+            # Unshared workers also race on the journal, so only the shared run can be replayed
+            day = CostJournal(data_dir, time.strftime("%Y-%m-%d")).load()
+            checks["journal cost"] = (day["total_cost"], args.max_cost_per_day)
+            checks["journal vs workers"] = (abs(day["total_sessions"] - ended), 0)
+            if args.max_concurrent > 0:
+                checks["peak concurrency"] = (peak_sessions, args.max_concurrent)
+
+        failed = []
+        for name, (actual, limit) in checks.items():
+            ok = actual <= limit + 1e-9
+            print(f"  {'ok  ' if ok else 'FAIL'} {name:<24} {actual:.4f} (limit {limit:g})")
+            if not ok:
+                failed.append(name)
+        sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Admission Controller - Budget reservations and a fair waiting queue for new realtime sessions
+"""
+import asyncio
+import time
+import logging
+from collections import deque
+from typing import Dict, Any, Optional
+
+class AdmissionController:
+    """Admits realtime sessions against reserved budget and a concurrency cap.
+
+    Every admitted session holds a reservation of max_cost_per_session in the
+    cost tracker until it ends. Sessions started together can therefore never
+    spend more than the daily budget. When no budget or slot is free, a request
+    waits in a FIFO queue (at most max_queue long) for up to timeout seconds.
+    Releases wake the queue, and only its head may be admitted, so later
+    requests never overtake earlier ones. Requests that no release could make
+    room for are refused at once, because ended sessions have used the budget.
+    """
+
+    def __init__(self, cost_tracker, max_concurrent: int = 0, max_queue: int = 20,
+                 timeout: float = 20.0, recheck_interval: float = 1.0):
+        self.cost_tracker = cost_tracker
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.recheck_interval = recheck_interval  # Also catches midnight rollover and other workers
+        self.logger = logging.getLogger(__name__)
+
+        self._waiters = deque()  # [session_id, future] in arrival order
+        self._loop = None
+        self._wake = None
+        self._task = None
+
+        self.stats = {
+            "admitted": 0,
+            "admitted_after_wait": 0,
+            "rejected": 0,
+            "queue_full": 0,
+            "timed_out": 0,
+            "max_wait_ms": 0.0
+        }
+
+        cost_tracker.add_release_listener(self.notify)
+
+    def _start(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._task is None or self._task.done():
+            self._loop = loop
+            self._wake = asyncio.Event()
+            self._task = loop.create_task(self._pump())
+
+    def notify(self, session_id: Optional[str] = None, cost: Optional[float] = None) -> None:
+        """Reserved budget may have been freed (any thread; a cost tracker release listener)"""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            loop.call_soon_threadsafe(self._wake.set)
+        except RuntimeError:
+            pass  # Loop shut down meanwhile
+
+    def _try_admit(self, session_id: str) -> Dict[str, Any]:
+        return self.cost_tracker.reserve_session(session_id, max_concurrent=self.max_concurrent)
+
+    async def admit(self, session_id: str) -> Dict[str, Any]:
+        """Reserve budget for a session, waiting in line when none is free.
+
+        Returns the reservation result with "queued_seconds" added. The caller
+        owns a granted reservation and must end the session or release it.
+        """
+        self._start()
+
+        if not self._waiters:
+            result = self._try_admit(session_id)
+            if result["reserved"] or not result.get("retry"):
+                return self._finish(result, 0.0)
+
+        if len(self._waiters) >= self.max_queue:
+            self.stats["queue_full"] += 1
+            return self._finish({
+                "reserved": False,
+                "retry": True,
+                "reason": "Too many sessions are waiting to start, please try again shortly"
+            }, 0.0)
+
+        future = self._loop.create_future()
+        waiter = [session_id, future]
+        self._waiters.append(waiter)
+        self._wake.set()
+        enqueued = time.monotonic()
+
+        try:
+            result = await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            if future.done():
+                # Admitted in the same loop iteration the timeout fired
+                result = future.result()
+            else:
+                self._abandon(waiter)
+                self.stats["timed_out"] += 1
+                self.logger.info(f"Session {session_id} gave up waiting for admission after {self.timeout:g}s")
+                result = {
+                    "reserved": False,
+                    "retry": True,
+                    "reason": f"No session capacity became free within {self.timeout:g}s"
+                }
+        except asyncio.CancelledError:
+            # The requester went away; do not leave its reservation behind
+            if future.done() and not future.cancelled() and future.result()["reserved"]:
+                self.cost_tracker.release_reservation(session_id)
+            else:
+                self._abandon(waiter)
+            raise
+
+        waited = time.monotonic() - enqueued
+        if result["reserved"]:
+            self.stats["admitted_after_wait"] += 1
+            self.stats["max_wait_ms"] = max(self.stats["max_wait_ms"], round(waited * 1000, 1))
+        return self._finish(result, waited)
+
+    def _finish(self, result: Dict[str, Any], waited: float) -> Dict[str, Any]:
+        self.stats["admitted" if result["reserved"] else "rejected"] += 1
+        return dict(result, queued_seconds=round(waited, 3))
+
+    def _abandon(self, waiter):
+        waiter[1].cancel()
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+        self._wake.set()
+
+    async def _pump(self):
+        """Admit waiting requests in order whenever budget or slots may have been freed"""
+        while True:
+            self._wake.clear()
+            self._admit_waiting()
+
+            # A timer rather than wait_for(), which can swallow cancellation when both race
+            recheck = self._loop.call_later(self.recheck_interval, self._wake.set) if self._waiters else None
+            try:
+                await self._wake.wait()
+            finally:
+                if recheck:
+                    recheck.cancel()
+
+    def _admit_waiting(self):
+        while self._waiters:
+            session_id, future = self._waiters[0]
+            if future.done():
+                self._waiters.popleft()
+                continue
+
+            result = self._try_admit(session_id)
+            if result["reserved"] or not result.get("retry"):
+                self._waiters.popleft()
+                future.set_result(result)
+                continue
+
+            # The head still does not fit; nobody behind it may go first
+            break
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Admission statistics"""
+        return {
+            **self.stats,
+            "waiting": len(self._waiters),
+            "max_queue": self.max_queue,
+            "max_concurrent": self.max_concurrent,
+            "timeout": self.timeout
+        }
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Audio Capture - Ring buffer and adaptive framing for callback-mode microphone capture
+"""
+from typing import Dict, Any
+
+class AudioRingBuffer:
+    """Fixed-size byte ring shared by one producer thread and one consumer.
+
+    The PortAudio callback only ever advances the write counter and the
+    event loop only ever advances the read counter, so neither side takes a
+    lock. When the ring is full, incoming audio is dropped and counted as an
+    overrun; the reader is never blocked or rewound.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._buffer = bytearray(capacity)
+        self._written = 0   # total bytes ever written (producer only)
+        self._read = 0      # total bytes ever read (consumer only)
+        self.overrun_bytes = 0
+
+    @property
+    def available(self) -> int:
+        """Bytes waiting to be read"""
+        return self._written - self._read
+
+    def write(self, data: bytes) -> int:
+        """Copy in as much of data as fits (producer thread); returns bytes written"""
+        free = self.capacity - (self._written - self._read)
+        count = min(len(data), free)
+        if count < len(data):
+            self.overrun_bytes += len(data) - count
+        if count <= 0:
+            return 0
+
+        start = self._written % self.capacity
+        first = min(count, self.capacity - start)
+        self._buffer[start:start + first] = data[:first]
+        if count > first:
+            self._buffer[:count - first] = data[first:count]
+        self._written += count
+        return count
+
+    def read(self, max_bytes: int) -> bytes:
+        """Take up to max_bytes from the ring (consumer)"""
+        count = min(max_bytes, self._written - self._read)
+        if count <= 0:
+            return b""
+
+        start = self._read % self.capacity
+        first = min(count, self.capacity - start)
+        data = bytes(self._buffer[start:start + first])
+        if count > first:
+            data += self._buffer[:count - first]
+        self._read += count
+        return data
+
+class AdaptiveFrameSizer:
+    """Chooses the upstream frame size from measured send latency.
+
+    Frames start at the capture chunk size. When sending a frame takes more
+    than half its own duration, frames double so per-message overhead stops
+    dominating; when sends are quick again they shrink back toward the base
+    size to keep latency low.
+    """
+
+    def __init__(self, base_bytes: int, bytes_per_second: int, max_multiple: int = 8,
+                 smoothing: float = 0.2):
+        self.base_bytes = base_bytes
+        self.max_bytes = base_bytes * max_multiple
+        self.bytes_per_second = bytes_per_second
+        self.smoothing = smoothing
+        self.frame_bytes = base_bytes
+        self.send_latency = 0.0
+
+    def observe(self, send_seconds: float) -> None:
+        """Record how long the last frame took to send and adjust"""
+        self.send_latency += self.smoothing * (send_seconds - self.send_latency)
+        frame_seconds = self.frame_bytes / self.bytes_per_second
+
+        if self.send_latency > 0.5 * frame_seconds and self.frame_bytes < self.max_bytes:
+            self.frame_bytes = min(self.max_bytes, self.frame_bytes * 2)
+        elif self.send_latency < 0.1 * frame_seconds and self.frame_bytes > self.base_bytes:
+            self.frame_bytes = max(self.base_bytes, self.frame_bytes // 2)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Current framing"""
+        return {
+            "frame_bytes": self.frame_bytes,
+            "frame_ms": round(self.frame_bytes * 1000 / self.bytes_per_second, 1),
+            "send_latency_ms": round(self.send_latency * 1000, 2)
+        }
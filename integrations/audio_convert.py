@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Audio Convert - Streaming sample format conversion and resampling to the API's PCM16 format
+"""
+import math
+from typing import Dict, Any
+
+# NumPy is required for anything but passthrough
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# Sample formats accepted on input, with their byte width
+SAMPLE_FORMATS = {
+    "pcm16": 2,
+    "float32": 4
+}
+
+class AudioConverter:
+    """Converts a stream of audio chunks to mono PCM16 at output_rate.
+
+    Chunks are decoded to float32, downmixed, low-passed when downsampling
+    (a boxcar the width of the rate ratio) and resampled by linear
+    interpolation. Filter history and the fractional read position carry
+    over between chunks, so chunk boundaries are seamless. Every stage
+    writes into buffers owned by the converter, which only grow, so a
+    steady stream does no per-chunk array allocation beyond the returned
+    bytes.
+    """
+
+    def __init__(self, input_rate: int, input_format: str = "pcm16", input_channels: int = 1,
+                 output_rate: int = 24000):
+        if input_format not in SAMPLE_FORMATS:
+            raise ValueError(f"Unsupported sample format: {input_format}")
+
+        self.input_rate = input_rate
+        self.input_format = input_format
+        self.input_channels = input_channels
+        self.output_rate = output_rate
+        self.input_frame_bytes = SAMPLE_FORMATS[input_format] * input_channels
+
+        self.passthrough = (input_rate == output_rate and input_format == "pcm16" and input_channels == 1)
+        if not self.passthrough and not NUMPY_AVAILABLE:
+            raise RuntimeError("numpy is required to convert audio to 24 kHz PCM16")
+
+        self.step = input_rate / output_rate
+        self.taps = max(1, round(self.step)) if self.step >= 1.5 else 1
+
+        # Stream state: filter history and the next output sample's position
+        # relative to the start of the history buffer
+        self._history = self.taps  # samples kept from the previous chunk
+        self._position = float(self._history)
+        self._capacity = 0
+
+        self.stats = {
+            "chunks": 0,
+            "input_bytes": 0,
+            "output_bytes": 0
+        }
+
+        if not self.passthrough:
+            self._signal = np.zeros(self._history, dtype=np.float32)
+            self._ensure(1024)
+
+    def _ensure(self, samples: int):
+        """Grow the work buffers to hold a chunk of `samples` input samples"""
+        if samples <= self._capacity:
+            return
+        capacity = 1 << math.ceil(math.log2(samples))
+        max_out = int(capacity / self.step) + 2
+
+        signal = np.zeros(capacity + self._history, dtype=np.float32)
+        signal[:self._history] = self._signal[:self._history]
+        self._signal = signal
+        self._filtered = np.empty(capacity + self._history, dtype=np.float32)
+        self._positions = np.empty(max_out, dtype=np.float64)
+        self._index = np.empty(max_out, dtype=np.intp)
+        self._frac = np.empty(max_out, dtype=np.float32)
+        self._lower = np.empty(max_out, dtype=np.float32)
+        self._upper = np.empty(max_out, dtype=np.float32)
+        self._pcm = np.empty(max_out, dtype=np.int16)
+        self._ramp = np.arange(max_out, dtype=np.float64) * self.step
+        self._capacity = capacity
+
+    def convert(self, data: bytes) -> bytes:
+        """Convert one chunk; returns PCM16 mono at output_rate"""
+        self.stats["chunks"] += 1
+        self.stats["input_bytes"] += len(data)
+        if self.passthrough:
+            self.stats["output_bytes"] += len(data)
+            return data
+
+        frames = len(data) // self.input_frame_bytes
+        if frames == 0:
+            return b""
+        self._ensure(frames)
+        history = self._history
+        total = history + frames
+        signal = self._signal
+
+        # Decode and downmix into the signal buffer after the carried history
+        dtype = np.int16 if self.input_format == "pcm16" else np.float32
+        raw = np.frombuffer(data, dtype=dtype, count=frames * self.input_channels)
+        target = signal[history:total]
+        if self.input_channels == 1:
+            np.copyto(target, raw, casting="unsafe")
+        else:
+            channels = raw.reshape(frames, self.input_channels)
+            np.copyto(target, channels[:, 0], casting="unsafe")
+            for c in range(1, self.input_channels):
+                np.add(target, channels[:, c], out=target, casting="unsafe")
+            np.multiply(target, 1.0 / self.input_channels, out=target)
+        if self.input_format == "pcm16":
+            np.multiply(target, 1.0 / 32768, out=target)
+
+        # Anti-alias before decimating: running mean over `taps` samples
+        source = signal
+        if self.taps > 1:
+            filtered = self._filtered
+            view = filtered[self.taps - 1:total]
+            np.copyto(view, signal[self.taps - 1:total])
+            for k in range(1, self.taps):
+                np.add(view, signal[self.taps - 1 - k:total - k], out=view)
+            np.multiply(view, 1.0 / self.taps, out=view)
+            source = filtered
+
+        # Linear interpolation at fractional positions; needs idx + 1 < total
+        last = total - 1
+        count = max(0, math.ceil((last - self._position) / self.step))
+        pcm = self._pcm[:count]
+        if count:
+            positions = self._positions[:count]
+            np.add(self._ramp[:count], self._position, out=positions)
+            index = self._index[:count]
+            np.floor(positions, out=positions)
+            np.copyto(index, positions, casting="unsafe")
+            frac = self._frac[:count]
+            np.add(self._ramp[:count], self._position, out=positions)
+            np.subtract(positions, index, out=frac, casting="unsafe")
+
+            lower = self._lower[:count]
+            upper = self._upper[:count]
+            np.take(source, index, out=lower)
+            np.add(index, 1, out=index)
+            np.take(source, index, out=upper)
+            np.subtract(upper, lower, out=upper)
+            np.multiply(upper, frac, out=upper)
+            np.add(lower, upper, out=lower)
+
+            np.multiply(lower, 32767, out=lower)
+            np.clip(lower, -32768, 32767, out=lower)
+            np.copyto(pcm, lower, casting="unsafe")
+
+        # Carry filter history and the read position into the next chunk
+        self._position += count * self.step - frames
+        signal[:history] = signal[frames:total]
+
+        out = pcm.tobytes()
+        self.stats["output_bytes"] += len(out)
+        return out
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Conversion counters"""
+        return {
+            **self.stats,
+            "input_rate": self.input_rate,
+            "input_format": self.input_format,
+            "input_channels": self.input_channels,
+            "passthrough": self.passthrough
+        }
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Audio Ingest - Coalescing, bounded upstream queue for microphone audio sent by browsers
+"""
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Dict, Any, Optional, Callable, Awaitable
+
+# Out-of-order chunks held back while waiting for a missing one
+MAX_REORDER_CHUNKS = 8
+
+class AudioIngestBuffer:
+    """Turns small PCM16 mic chunks into well-sized input_audio_buffer.append frames.
+
+    Chunks are pushed from the event loop thread and appended to a pending
+    buffer, which is cut into frames of frame_bytes. A single sender task
+    forwards frames upstream one at a time; when it falls behind, queued
+    frames are merged (up to max_frame_bytes) so a slow upstream gets fewer,
+    larger messages. The queue is bounded by max_queued_bytes: beyond that
+    the oldest audio is dropped. Crossing the high/low watermarks toggles
+    backpressure so the browser can pause sending. An optional transform
+    (e.g. AudioConverter.convert) runs on chunks once they are back in order.
+    """
+
+    def __init__(self, send: Callable[[bytes], Awaitable[Any]], frame_bytes: int = 4800,
+                 max_frame_bytes: int = 24000, max_queued_bytes: int = 96000,
+                 on_backpressure: Optional[Callable[[bool], None]] = None,
+                 transform: Optional[Callable[[bytes], bytes]] = None):
+        self.send = send
+        self.transform = transform
+        self.frame_bytes = frame_bytes
+        self.max_frame_bytes = max(frame_bytes, max_frame_bytes)
+        self.max_queued_bytes = max(self.max_frame_bytes, max_queued_bytes)
+        self.high_watermark = self.max_queued_bytes // 2
+        self.low_watermark = self.max_queued_bytes // 4
+        self.on_backpressure = on_backpressure
+
+        self.logger = logging.getLogger(__name__)
+
+        self._pending = bytearray()
+        self._frames = deque()
+        self._queued_bytes = 0
+        self._next_seq = None
+        self._early = {}
+        self._wake = asyncio.Event()
+        self._task = None
+        self.paused = False
+
+        self.stats = {
+            "chunks_received": 0,
+            "bytes_received": 0,
+            "frames_sent": 0,
+            "bytes_sent": 0,
+            "bytes_dropped": 0,
+            "chunks_reordered": 0,
+            "chunks_lost": 0,
+            "backpressure_events": 0,
+            "last_send_ms": 0.0
+        }
+
+    @property
+    def queued_bytes(self) -> int:
+        """Audio waiting to go upstream, including the partial frame"""
+        return self._queued_bytes + len(self._pending)
+
+    def push(self, chunk: bytes, seq: Optional[int] = None) -> None:
+        """Accept a chunk from the browser (loop thread only)"""
+        self.stats["chunks_received"] += 1
+        self.stats["bytes_received"] += len(chunk)
+
+        if seq is None or self._next_seq is None or seq == self._next_seq:
+            self._append(chunk)
+            if seq is not None:
+                self._next_seq = seq + 1
+            self._drain_early()
+        elif seq > self._next_seq:
+            # Arrived ahead of a missing chunk; hold it briefly
+            self.stats["chunks_reordered"] += 1
+            self._early[seq] = chunk
+            if len(self._early) > MAX_REORDER_CHUNKS:
+                first = min(self._early)
+                self.stats["chunks_lost"] += first - self._next_seq
+                self._next_seq = first
+                self._drain_early()
+        # seq below the expected one is a late duplicate; ignore it
+
+        self._ensure_sender()
+
+    def _drain_early(self):
+        while self._next_seq in self._early:
+            self._append(self._early.pop(self._next_seq))
+            self._next_seq += 1
+
+    def _append(self, chunk: bytes):
+        if self.transform:
+            chunk = self.transform(chunk)
+        self._pending += chunk
+        while len(self._pending) >= self.frame_bytes:
+            frame = bytes(self._pending[:self.frame_bytes])
+            del self._pending[:self.frame_bytes]
+            self._frames.append(frame)
+            self._queued_bytes += len(frame)
+
+        # Bounded queue: drop the oldest audio rather than grow without limit
+        while self._queued_bytes + len(self._pending) > self.max_queued_bytes and self._frames:
+            dropped = self._frames.popleft()
+            self._queued_bytes -= len(dropped)
+            self.stats["bytes_dropped"] += len(dropped)
+
+        self._update_backpressure()
+        if self._frames:
+            self._wake.set()
+
+    def _update_backpressure(self):
+        queued = self.queued_bytes
+        if not self.paused and queued >= self.high_watermark:
+            self._set_paused(True)
+        elif self.paused and queued <= self.low_watermark:
+            self._set_paused(False)
+
+    def _set_paused(self, paused: bool):
+        self.paused = paused
+        if paused:
+            self.stats["backpressure_events"] += 1
+        if self.on_backpressure:
+            try:
+                self.on_backpressure(paused)
+            except Exception as e:
+                self.logger.error(f"Error in backpressure handler: {e}")
+
+    def _ensure_sender(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def _next_frame(self) -> bytes:
+        """Pop one frame, merging backlog up to max_frame_bytes"""
+        frame = self._frames.popleft()
+        if not self._frames or len(frame) + len(self._frames[0]) > self.max_frame_bytes:
+            self._queued_bytes -= len(frame)
+            return frame
+
+        parts = [frame]
+        size = len(frame)
+        while self._frames and size + len(self._frames[0]) <= self.max_frame_bytes:
+            part = self._frames.popleft()
+            parts.append(part)
+            size += len(part)
+        self._queued_bytes -= size
+        return b"".join(parts)
+
+    async def _run(self):
+        """Forward frames upstream one at a time"""
+        while True:
+            if not self._frames:
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+
+            frame = self._next_frame()
+            start = time.perf_counter()
+            try:
+                await self.send(frame)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"Failed to forward mic audio: {e}")
+                self.stats["bytes_dropped"] += len(frame)
+                continue
+            finally:
+                self._update_backpressure()
+
+            self.stats["last_send_ms"] = round((time.perf_counter() - start) * 1000, 2)
+            self.stats["frames_sent"] += 1
+            self.stats["bytes_sent"] += len(frame)
+
+    async def flush(self) -> None:
+        """Send everything queued, including a trailing partial frame"""
+        if self._pending:
+            self._frames.append(bytes(self._pending))
+            self._queued_bytes += len(self._pending)
+            self._pending.clear()
+
+        while self._frames:
+            frame = self._next_frame()
+            await self.send(frame)
+            self.stats["frames_sent"] += 1
+            self.stats["bytes_sent"] += len(frame)
+        self._update_backpressure()
+
+    def close(self) -> None:
+        """Stop the sender and discard queued audio"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._frames.clear()
+        self._pending.clear()
+        self._early.clear()
+        self._queued_bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Ingest statistics"""
+        return {
+            **self.stats,
+            "queued_bytes": self.queued_bytes,
+            "paused": self.paused
+        }
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Audio Playback - Local speaker output on a dedicated thread with a jitter buffer
+"""
+import atexit
+import threading
+import logging
+from collections import deque
+from typing import Dict, Any
+try:
+    import pyaudio
+    PYAUDIO_AVAILABLE = True
+except ImportError:
+    PYAUDIO_AVAILABLE = False
+
+class AudioPlayer:
+    """Plays PCM16 audio from a bounded jitter buffer on its own thread.
+
+    The event loop only appends decoded deltas to the buffer. The output
+    thread does the blocking PyAudio writes, so a long delta never delays
+    upstream message handling. Playback starts once jitter_ms is buffered,
+    or at once when the response has ended. If the buffer runs dry
+    mid-response, that is an underrun, and playback re-buffers before it
+    resumes. If more than max_buffer_ms is queued, the oldest audio is
+    dropped as an overrun. flush() discards everything queued, for
+    interruptions.
+    """
+
+    def __init__(self, audio, sample_rate: int = 24000, channels: int = 1, chunk_size: int = 1024,
+                 jitter_ms: int = 80, max_buffer_ms: int = 5000):
+        self.audio = audio
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.chunk_size = chunk_size
+
+        bytes_per_ms = sample_rate * 2 * channels / 1000
+        self.write_bytes = chunk_size * 2 * channels
+        self.jitter_bytes = int(jitter_ms * bytes_per_ms)
+        self.max_buffer_bytes = int(max_buffer_ms * bytes_per_ms)
+
+        self.logger = logging.getLogger(__name__)
+
+        self._buffer = deque()
+        self._buffered = 0
+        self._item_played = 0
+        self._playing = False
+        self._draining = False
+        self._stopped = False
+        self._cond = threading.Condition()
+        self._thread = None
+        self.stream = None
+
+        self.stats = {
+            "bytes_queued": 0,
+            "bytes_played": 0,
+            "bytes_flushed": 0,
+            "overrun_bytes": 0,
+            "overruns": 0,
+            "underruns": 0,
+            "flushes": 0
+        }
+
+    def start(self) -> None:
+        """Open the output stream and start the playback thread"""
+        self.stream = self.audio.open(
+            format=pyaudio.paInt16,
+            channels=self.channels,
+            rate=self.sample_rate,
+            output=True,
+            frames_per_buffer=self.chunk_size
+        )
+        self._thread = threading.Thread(target=self._run, name="audio-playback", daemon=True)
+        self._thread.start()
+
+    def enqueue(self, pcm: bytes) -> None:
+        """Queue decoded audio for playback (any thread)"""
+        with self._cond:
+            self._buffer.append(pcm)
+            self._buffered += len(pcm)
+            self.stats["bytes_queued"] += len(pcm)
+
+            if self._buffered > self.max_buffer_bytes:
+                self.stats["overruns"] += 1
+                while self._buffered > self.max_buffer_bytes and len(self._buffer) > 1:
+                    dropped = self._buffer.popleft()
+                    self._buffered -= len(dropped)
+                    self.stats["overrun_bytes"] += len(dropped)
+
+            self._cond.notify()
+
+    def start_item(self) -> None:
+        """Mark the start of a new output item for played_ms"""
+        with self._cond:
+            # Audio still buffered belongs to the previous item
+            self._item_played = -self._buffered
+
+    @property
+    def item_played_ms(self) -> float:
+        """Milliseconds of the current output item written to the device"""
+        with self._cond:
+            return max(0, self._item_played) * 1000 / (self.sample_rate * 2 * self.channels)
+
+    def end_of_response(self) -> None:
+        """Play out whatever is buffered; running dry afterwards is not an underrun"""
+        with self._cond:
+            self._draining = True
+            self._cond.notify()
+
+    def flush(self) -> int:
+        """Discard queued audio, e.g. when the user interrupts; returns bytes dropped"""
+        with self._cond:
+            flushed = self._buffered
+            self._buffer.clear()
+            self._buffered = 0
+            self._playing = False
+            self._draining = False
+            self.stats["bytes_flushed"] += flushed
+            self.stats["flushes"] += 1
+            return flushed
+
+    def _ready(self) -> bool:
+        return bool(self._buffer) and (self._playing or self._draining or self._buffered >= self.jitter_bytes)
+
+    def _next_write(self) -> bytes:
+        """Take at most one chunk's worth so flush() takes effect quickly"""
+        chunk = self._buffer.popleft()
+        if len(chunk) > self.write_bytes:
+            self._buffer.appendleft(chunk[self.write_bytes:])
+            chunk = chunk[:self.write_bytes]
+        self._buffered -= len(chunk)
+        return chunk
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopped and not self._ready():
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                self._playing = True
+                chunk = self._next_write()
+
+            try:
+                self.stream.write(chunk)
+            except Exception as e:
+                self.logger.error(f"Audio playback write failed: {e}")
+
+            with self._cond:
+                self.stats["bytes_played"] += len(chunk)
+                self._item_played += len(chunk)
+                if not self._buffer and self._playing:
+                    if self._draining:
+                        self._draining = False
+                    else:
+                        self.stats["underruns"] += 1
+                    self._playing = False
+
+    def close(self) -> None:
+        """Stop the playback thread and close the stream"""
+        with self._cond:
+            self._stopped = True
+            self._buffer.clear()
+            self._buffered = 0
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        if self.stream is not None:
+            try:
+                self.stream.stop_stream()
+                self.stream.close()
+            except Exception as e:
+                self.logger.error(f"Error closing audio output: {e}")
+            self.stream = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Playback statistics"""
+        with self._cond:
+            return {
+                **self.stats,
+                "buffered_ms": round(self._buffered * 1000 / (self.sample_rate * 2 * self.channels), 1),
+                "playing": self._playing
+            }
+
+# One PortAudio instance shared by every session in the process
+_pyaudio = None
+_pyaudio_lock = threading.Lock()
+
+def get_pyaudio():
+    """Get the shared pyaudio.PyAudio instance, or None without PyAudio"""
+    global _pyaudio
+    if not PYAUDIO_AVAILABLE:
+        return None
+    with _pyaudio_lock:
+        if _pyaudio is None:
+            _pyaudio = pyaudio.PyAudio()
+            atexit.register(_pyaudio.terminate)
+        return _pyaudio
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Audio Recorder - Per-session WAV archives written through memory-mapped files
+"""
+import os
+import re
+import mmap
+import time
+import struct
+import logging
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+WAV_HEADER_SIZE = 44
+
+def wav_header(data_size: int, sample_rate: int, channels: int = 1, bits: int = 16) -> bytes:
+    """Canonical 44-byte PCM WAV header"""
+    block_align = channels * bits // 8
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + data_size, b"WAVE",
+        b"fmt ", 16, 1, channels, sample_rate, sample_rate * block_align, block_align, bits,
+        b"data", data_size
+    )
+
+class MmapWavWriter:
+    """Appends PCM16 to a WAV file through a memory-mapped, preallocated region.
+
+    The file is extended in grow_bytes steps and appends are plain memory
+    copies, with no write() syscalls on the audio path. The RIFF and data
+    sizes in the header are updated with every append, so the file can be
+    read while it is still being written. Trailing preallocated zeros sit
+    after the data chunk until close() trims them.
+    """
+
+    def __init__(self, path: str, sample_rate: int = 24000, channels: int = 1,
+                 grow_bytes: int = 4 * 1024 * 1024):
+        self.path = Path(path)
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.grow_bytes = grow_bytes
+        self.data_size = 0
+
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600)
+        self._capacity = 0
+        self._map = None
+        self._grow(WAV_HEADER_SIZE)
+        self._map[:WAV_HEADER_SIZE] = wav_header(0, sample_rate, channels)
+
+    def _grow(self, needed: int):
+        """Extend the file and mapping to hold at least `needed` bytes"""
+        capacity = max(needed, self._capacity + self.grow_bytes)
+        os.ftruncate(self._fd, capacity)
+        if self._map is not None:
+            self._map.close()
+        self._map = mmap.mmap(self._fd, capacity)
+        self._capacity = capacity
+
+    def write(self, pcm: bytes) -> None:
+        """Append audio and update the header sizes"""
+        start = WAV_HEADER_SIZE + self.data_size
+        end = start + len(pcm)
+        if end > self._capacity:
+            self._grow(end)
+        self._map[start:end] = pcm
+        self.data_size += len(pcm)
+        struct.pack_into("<I", self._map, 4, 36 + self.data_size)
+        struct.pack_into("<I", self._map, 40, self.data_size)
+
+    @property
+    def duration(self) -> float:
+        """Seconds of audio written"""
+        return self.data_size / (self.sample_rate * 2 * self.channels)
+
+    def close(self) -> None:
+        """Patch the header, drop the unused preallocation and close the file"""
+        if self._map is None:
+            return
+        self._map[:WAV_HEADER_SIZE] = wav_header(self.data_size, self.sample_rate, self.channels)
+        self._map.flush()
+        self._map.close()
+        self._map = None
+        os.ftruncate(self._fd, WAV_HEADER_SIZE + self.data_size)
+        os.close(self._fd)
+
+class SessionRecorder:
+    """Archives a session's microphone input and model output as two WAV files"""
+
+    def __init__(self, directory: str, session_id: str, sample_rate: int = 24000, channels: int = 1):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.session_id = session_id
+        self.logger = logging.getLogger(__name__)
+
+        # Session ids embed client-supplied user ids; keep file names tame
+        stem = f"{time.strftime('%Y%m%d_%H%M%S')}_{re.sub(r'[^A-Za-z0-9_-]', '_', session_id)[:96]}"
+        self.input = MmapWavWriter(self.directory / f"{stem}_input.wav", sample_rate, channels)
+        self.output = MmapWavWriter(self.directory / f"{stem}_output.wav", sample_rate, channels)
+        self.closed = False
+
+    def record_input(self, pcm: bytes) -> None:
+        """Append microphone audio"""
+        if not self.closed:
+            self.input.write(pcm)
+
+    def record_output(self, pcm: bytes) -> None:
+        """Append model audio"""
+        if not self.closed:
+            self.output.write(pcm)
+
+    def close(self) -> Optional[Dict[str, Any]]:
+        """Finalize both files; returns a summary of the archive"""
+        if self.closed:
+            return None
+        self.closed = True
+
+        for writer in (self.input, self.output):
+            try:
+                writer.close()
+            except OSError as e:
+                self.logger.error(f"Error finalizing recording {writer.path}: {e}")
+
+        return {
+            "input_file": str(self.input.path),
+            "output_file": str(self.output.path),
+            "input_seconds": round(self.input.duration, 2),
+            "output_seconds": round(self.output.duration, 2)
+        }
+
+    def discard(self) -> None:
+        """Close and delete both files, for a session that never started"""
+        self.close()
+        for writer in (self.input, self.output):
+            writer.path.unlink(missing_ok=True)
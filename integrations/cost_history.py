@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Cost History - Daily, weekly and monthly totals from past daily cost ledgers
+"""
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+from .cost_journal import CostJournal
+from .realtime_cost_tracker import get_realtime_tracker
+
+# realtime_costs_<date>.json snapshots and realtime_costs_<date>.<generation>.jsonl journals
+LEDGER_FILE = re.compile(r"^realtime_costs_(\d{4}-\d{2}-\d{2})(?:\.\d+\.jsonl|\.json)$")
+
+def _empty_totals() -> Dict[str, Any]:
+    return {"cost": 0.0, "sessions": 0, "audio_seconds": 0.0, "active_days": 0}
+
+def _add(totals: Dict[str, Any], day: Dict[str, Any]) -> None:
+    totals["cost"] += day["cost"]
+    totals["sessions"] += day["sessions"]
+    totals["audio_seconds"] += day["audio_seconds"]
+    if day["sessions"]:
+        totals["active_days"] += 1
+
+def _rounded(totals: Dict[str, Any]) -> Dict[str, Any]:
+    return dict(totals, cost=round(totals["cost"], 4), audio_seconds=round(totals["audio_seconds"], 2))
+
+class CostHistory:
+    """Per-day cost summaries of past days, parsed lazily and cached.
+
+    A day is only parsed (snapshot plus journal replay) the first time a query
+    covers it. Its summary is then cached together with the size and mtime of
+    its ledger files. Each query lists the data directory once. A day is parsed
+    again only when its files changed, which in practice means today and any
+    day still receiving sessions from a worker. The cache holds at most
+    max_days days, least recently used first out.
+    """
+
+    def __init__(self, data_dir: Path, max_days: int = 800):
+        self.data_dir = Path(data_dir)
+        self.max_days = max_days
+        self._cache = OrderedDict()  # date -> (file signature, summary)
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "parse_ms": 0.0}
+
+    def _signatures(self) -> Dict[str, Tuple]:
+        """(name, size, mtime) of each day's ledger files, from one directory listing"""
+        files = {}
+        try:
+            entries = list(os.scandir(self.data_dir))
+        except FileNotFoundError:
+            return {}
+        for entry in entries:
+            match = LEDGER_FILE.match(entry.name)
+            if not match:
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue  # Compacted away while listing
+            files.setdefault(match.group(1), []).append((entry.name, stat.st_size, stat.st_mtime_ns))
+        return {day: tuple(sorted(stats)) for day, stats in files.items()}
+
+    def _parse(self, day: str) -> Dict[str, Any]:
+        started = time.perf_counter()
+        data = CostJournal(self.data_dir, day).read()  # Read-only: never cleans up a live data dir
+        self.stats["parse_ms"] += (time.perf_counter() - started) * 1000
+        return {
+            "date": day,
+            "cost": data["total_cost"],
+            "sessions": data["total_sessions"],
+            "audio_seconds": data["total_audio_seconds"]
+        }
+
+    def day_summary(self, day: str, signature: Optional[Tuple]) -> Dict[str, Any]:
+        """A day's totals; signature is its ledger files' stat, None when it has none"""
+        if signature is None:
+            return {"date": day, "cost": 0.0, "sessions": 0, "audio_seconds": 0.0}
+
+        with self._lock:
+            cached = self._cache.get(day)
+            if cached and cached[0] == signature:
+                self._cache.move_to_end(day)
+                self.stats["hits"] += 1
+                return cached[1]
+
+        summary = self._parse(day)
+        with self._lock:
+            self.stats["misses"] += 1
+            self._cache[day] = (signature, summary)
+            self._cache.move_to_end(day)
+            while len(self._cache) > self.max_days:
+                self._cache.popitem(last=False)
+        return summary
+
+    def history(self, date_from: date, date_to: date) -> Dict[str, Any]:
+        """Daily totals plus ISO-week and calendar-month aggregates over an inclusive range of days"""
+        signatures = self._signatures()
+        days, weekly, monthly = [], OrderedDict(), OrderedDict()
+        totals = _empty_totals()
+
+        current = date_from
+        while current <= date_to:
+            key = current.isoformat()
+            summary = self.day_summary(key, signatures.get(key))
+            days.append(_rounded(dict(summary)))
+
+            year, week, _ = current.isocalendar()
+            week_start = current - timedelta(days=current.weekday())
+            week_totals = weekly.setdefault(f"{year}-W{week:02d}",
+                                            dict(_empty_totals(), week_start=week_start.isoformat()))
+            month_totals = monthly.setdefault(current.strftime("%Y-%m"), _empty_totals())
+            for bucket in (week_totals, month_totals, totals):
+                _add(bucket, summary)
+            current += timedelta(days=1)
+
+        return {
+            "from": date_from.isoformat(),
+            "to": date_to.isoformat(),
+            "totals": _rounded(totals),
+            "days": days,
+            "weekly": [dict(_rounded(t), week=week) for week, t in weekly.items()],
+            "monthly": [dict(_rounded(t), month=month) for month, t in monthly.items()]
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Cache statistics"""
+        return {
+            **self.stats,
+            "parse_ms": round(self.stats["parse_ms"], 2),
+            "cached_days": len(self._cache)
+        }
+
+# Global history instance
+_cost_history = None
+
+def get_cost_history() -> CostHistory:
+    """Get the global cost history over the realtime tracker's data directory"""
+    global _cost_history
+    if _cost_history is None:
+        _cost_history = CostHistory(get_realtime_tracker().data_dir)
+    return _cost_history
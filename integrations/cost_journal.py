@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Cost Journal - Append-only daily cost ledger with snapshot compaction
+"""
+import os
+import json
+import time
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+# When appended records are forced to disk
+FSYNC_POLICIES = ("always", "interval", "never")
+
+def empty_day(date: str) -> Dict[str, Any]:
+    """Daily totals before any session has ended"""
+    return {
+        "date": date,
+        "total_cost": 0.0,
+        "total_sessions": 0,
+        "total_audio_seconds": 0.0,
+        "sessions": [],
+        # [cost, sessions started, audio seconds] keyed by epoch minute / epoch hour
+        "usage_minutes": {},
+        "usage_hours": {}
+    }
+
+def add_usage(day: Dict[str, Any], ts: float, cost: float = 0.0, sessions: int = 0,
+              audio_seconds: float = 0.0) -> None:
+    """Add usage at a point in time to the day's minute and hour buckets"""
+    minute = int(ts // 60)
+    for buckets, key in ((day["usage_minutes"], minute), (day["usage_hours"], minute // 60)):
+        bucket = buckets.get(key)
+        if bucket is None:
+            buckets[key] = [cost, sessions, audio_seconds]
+        else:
+            bucket[0] += cost
+            bucket[1] += sessions
+            bucket[2] += audio_seconds
+
+def apply_record(day: Dict[str, Any], record: Dict[str, Any]) -> None:
+    """Fold one ended session into a day's totals and time buckets"""
+    day["total_cost"] += record["cost"]
+    day["total_sessions"] += 1
+    day["total_audio_seconds"] += record["audio_seconds"]
+    day["sessions"].append(record["session"])
+
+    # Records from before time buckets existed carry no breakdown
+    if "started_at" in record:
+        add_usage(day, record["started_at"], sessions=1)
+    for minute, cost, audio_seconds in record.get("usage", ()):
+        add_usage(day, minute * 60, cost=cost, audio_seconds=audio_seconds)
+
+class CostJournal:
+    """One day's cost ledger: a JSON snapshot plus an append-only JSONL journal.
+
+    Ending a session appends a single line to realtime_costs_<date>.<gen>.jsonl
+    instead of rewriting the whole day. Once the journal holds at least as
+    many records as the snapshot (and at least compact_min_records), the day
+    is compacted into realtime_costs_<date>.json, which names the journal
+    generation that continues it, and the old journal is deleted. Compaction
+    work therefore stays proportional to the number of appends, and replay on
+    startup reads at most about twice the snapshot.
+
+    With the interval policy an append fsyncs when the last fsync is at least
+    fsync_interval old, and otherwise arms a timer that fsyncs once the
+    interval is up, so a quiet period never leaves records unsynced for long.
+
+    A crash can only leave a partial last line. Replay ignores it, and the
+    next append truncates it away. Snapshots from before the journal existed
+    have no generation and load as generation 0.
+    """
+
+    def __init__(self, data_dir: Path, date: str, fsync: str = "interval",
+                 fsync_interval: float = 1.0, compact_min_records: int = 1000):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy {fsync!r}; expected one of {', '.join(FSYNC_POLICIES)}")
+
+        self.data_dir = Path(data_dir)
+        self.date = date
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.compact_min_records = compact_min_records
+        self.snapshot_file = self.data_dir / f"realtime_costs_{date}.json"
+        self.logger = logging.getLogger(__name__)
+
+        self.generation = 0
+        self.offset = 0    # Journal bytes already folded into the day
+        self.records = 0   # Records in the current journal generation
+        self.snapshot_mtime_ns = None
+        self._fd = None
+        self._fd_lock = threading.Lock()  # The fsync timer shares the fd with appends
+        self._fsync_timer = None
+        self._unsynced = False
+        self._last_fsync = time.monotonic()
+
+        self.stats = {
+            "appends": 0,
+            "fsyncs": 0,
+            "compactions": 0,
+            "replayed_records": 0,
+            "torn_bytes": 0,
+            "last_load_ms": 0.0
+        }
+
+    def journal_path(self, generation: int) -> Path:
+        return self.data_dir / f"realtime_costs_{self.date}.{generation}.jsonl"
+
+    def _read_snapshot(self) -> Tuple[Dict[str, Any], int, Optional[int]]:
+        """(day, journal generation it continues with, snapshot mtime)"""
+        day = empty_day(self.date)
+        generation = 0
+        mtime_ns = None
+        try:
+            with open(self.snapshot_file, 'r') as f:
+                mtime_ns = os.fstat(f.fileno()).st_mtime_ns
+                day = json.load(f)
+            generation = day.pop("journal_generation", 0)
+        except FileNotFoundError:
+            pass
+
+        # JSON object keys are strings; older snapshots have no buckets
+        for key in ("usage_minutes", "usage_hours"):
+            day[key] = {int(k): v for k, v in day.get(key, {}).items()}
+        return day, generation, mtime_ns
+
+    def _replay(self, day: Dict[str, Any], generation: int, offset: int = 0) -> Tuple[int, int]:
+        """Apply complete journal records from offset on; returns (records applied, bytes consumed)"""
+        path = self.journal_path(generation)
+        try:
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                data = f.read()
+        except FileNotFoundError:
+            return 0, 0
+
+        # A line without its newline is still being written, or was torn by a crash
+        end = data.rfind(b"\n") + 1
+        applied = 0
+        for line in data[:end].splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                self.logger.warning(f"Skipping corrupt cost journal record in {path}")
+                continue
+            apply_record(day, record)
+            applied += 1
+        return applied, end
+
+    def load(self) -> Dict[str, Any]:
+        """Rebuild the day from the snapshot and the journal that follows it"""
+        started = time.perf_counter()
+        self._close_fd()
+
+        day, self.generation, self.snapshot_mtime_ns = self._read_snapshot()
+        self.offset = 0
+        self.records = 0
+        self.read_tail(day)
+        self._remove_stale_journals()
+
+        self.stats["last_load_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return day
+
+    def read(self) -> Dict[str, Any]:
+        """The day's totals, for readers: like load(), but never writes, deletes or keeps state.
+
+        A writer may compact while we read, deleting the journal the snapshot
+        we read points at. The snapshot is then newer than what we read, so
+        read again.
+        """
+        for _ in range(5):
+            day, generation, mtime_ns = self._read_snapshot()
+            self._replay(day, generation)
+            try:
+                current_ns = self.snapshot_file.stat().st_mtime_ns
+            except FileNotFoundError:
+                current_ns = None
+            if current_ns == mtime_ns:
+                break
+        return day
+
+    def read_tail(self, day: Dict[str, Any]) -> int:
+        """Apply records appended since the last read; returns how many"""
+        applied, consumed = self._replay(day, self.generation, self.offset)
+        self.offset += consumed
+        self.records += applied
+        self.stats["replayed_records"] += applied
+        return applied
+
+    def catch_up(self, day: Dict[str, Any]) -> Dict[str, Any]:
+        """Pick up appends and compactions by other processes sharing data_dir"""
+        try:
+            mtime_ns = self.snapshot_file.stat().st_mtime_ns
+        except FileNotFoundError:
+            mtime_ns = None
+
+        if mtime_ns != self.snapshot_mtime_ns:
+            return self.load()
+        self.read_tail(day)
+        return day
+
+    def append(self, day: Dict[str, Any], record: Dict[str, Any]) -> None:
+        """Durably add an ended session and apply it to the day.
+
+        With several processes, call under their shared lock after catch_up().
+        """
+        if self._fd is None:
+            self._fd = os.open(self.journal_path(self.generation), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+
+        size = os.fstat(self._fd).st_size
+        if size > self.offset:
+            # Leftover partial record from a crashed writer
+            os.ftruncate(self._fd, self.offset)
+            self.stats["torn_bytes"] += size - self.offset
+            self.logger.warning(f"Dropped {size - self.offset} bytes of torn cost journal record")
+
+        line = (json.dumps(record, separators=(",", ":")) + "\n").encode()
+        os.write(self._fd, line)
+        self._unsynced = True
+        self.offset += len(line)
+        self.records += 1
+        self.stats["appends"] += 1
+        apply_record(day, record)
+
+        if self.fsync == "always":
+            self._sync()
+        elif self.fsync == "interval":
+            due = self._last_fsync + self.fsync_interval - time.monotonic()
+            if due <= 0:
+                self._sync()
+            elif self._fsync_timer is None:
+                self._fsync_timer = threading.Timer(due, self._timed_sync)
+                self._fsync_timer.daemon = True
+                self._fsync_timer.start()
+
+        if self.records >= max(self.compact_min_records, len(day["sessions"]) - self.records):
+            self.compact(day)
+
+    def compact(self, day: Dict[str, Any]) -> None:
+        """Write the day as a snapshot and start a new journal generation"""
+        snapshot = dict(day, journal_generation=self.generation + 1)
+        tmp_file = self.snapshot_file.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_file, 'w') as f:
+            f.write(json.dumps(snapshot, separators=(",", ":")))  # dumps uses the C encoder; dump does not
+            f.flush()
+            if self.fsync != "never":
+                os.fsync(f.fileno())
+        os.replace(tmp_file, self.snapshot_file)
+        self.snapshot_mtime_ns = self.snapshot_file.stat().st_mtime_ns
+
+        # The snapshot now covers the old journal; a crash before the unlink leaves it stale, not live
+        self._close_fd()
+        old_journal = self.journal_path(self.generation)
+        self.generation += 1
+        self.offset = 0
+        self.records = 0
+        old_journal.unlink(missing_ok=True)
+        self.stats["compactions"] += 1
+
+    def _remove_stale_journals(self):
+        """Delete journals already folded into the snapshot"""
+        for path in self.data_dir.glob(f"realtime_costs_{self.date}.*.jsonl"):
+            try:
+                generation = int(path.suffixes[-2].lstrip("."))
+            except (IndexError, ValueError):
+                continue
+            if generation < self.generation:
+                path.unlink(missing_ok=True)
+
+    def _sync(self):
+        with self._fd_lock:
+            if self._fd is not None and self._unsynced:
+                getattr(os, "fdatasync", os.fsync)(self._fd)
+                self._unsynced = False
+                self.stats["fsyncs"] += 1
+            self._last_fsync = time.monotonic()
+
+    def _timed_sync(self):
+        self._fsync_timer = None
+        try:
+            self._sync()
+        except OSError as e:
+            self.logger.error(f"Cost journal fsync failed: {e}")
+
+    def _close_fd(self):
+        if self._fsync_timer is not None:
+            self._fsync_timer.cancel()
+            self._fsync_timer = None
+        if self._fd is not None:
+            if self.fsync != "never":
+                self._sync()
+            with self._fd_lock:
+                os.close(self._fd)
+                self._fd = None
+                self._unsynced = False
+
+    def close(self) -> None:
+        """Flush and close the journal"""
+        self._close_fd()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Journal statistics"""
+        return {
+            **self.stats,
+            "date": self.date,
+            "generation": self.generation,
+            "journal_records": self.records,
+            "journal_bytes": self.offset,
+            "fsync": self.fsync
+        }
@@ -11,6 +11,13 @@ from dataclasses import dataclass
 import logging
 from .gpt4o_realtime_client import GPT4oRealtimeClient
 from .realtime_cost_tracker import get_realtime_tracker, CostLimits
+from .realtime_connection_pool import RealtimeConnectionPool
+from .admission import AdmissionController
+from .user_quotas import UserQuotas, UserQuotaLimits
+from .voice_activity import EnergyVADGate
+from .audio_recorder import SessionRecorder
+from .g711 import AUDIO_CODECS
+from .audio_convert import NUMPY_AVAILABLE
 
 @dataclass
 class EvaRealtimeConfig:
@@ -24,16 +31,55 @@ class EvaRealtimeConfig:
     # Audio settings
     enable_audio_input: bool = True
     enable_audio_output: bool = True
+    audio_codec: str = "pcm16"               # API audio format: pcm16, g711_ulaw or g711_alaw
+    browser_audio_frame_ms: int = 100        # Upstream append size for browser mic audio
+    browser_audio_max_queue_ms: int = 2000   # Mic audio held per session before dropping the oldest
+    
+    # Local voice activity gate: skip sending silent mic audio
+    client_vad_enabled: bool = False
+    client_vad_threshold_dbfs: float = -45.0
+    client_vad_hangover_ms: int = 700        # Keep above the server VAD's silence_duration_ms
+    client_vad_prefix_padding_ms: int = 300
+    
+    # Interrupt the assistant when the user starts speaking
+    barge_in_enabled: bool = True
+    remote_playback_latency_ms: float = 100.0  # Browser buffering assumed when estimating what was heard
+    
+    # Per-session WAV archives of input and output audio (None disables recording)
+    recording_dir: Optional[str] = None
     
     # Safety settings
     require_user_confirmation: bool = True  # Require confirmation before starting
     auto_terminate_on_limit: bool = True    # Auto-terminate when limits reached
+    
+    # Pre-warmed upstream connections (0 disables the pool)
+    connection_pool_size: int = 0
+    connection_pool_idle_timeout: float = 240.0  # Close warm sockets unused this long
+    connection_pool_ping_interval: float = 20.0  # Health check idle sockets this often
+    
+    # Admission: approved sessions reserve max_cost_per_session until they end
+    max_concurrent_sessions: int = 0        # 0 = limited only by the daily budget
+    admission_queue_size: int = 20          # Requests allowed to wait for budget or a slot
+    admission_timeout: float = 20.0         # Longest wait before a request is denied
+    reservation_ttl: float = 120.0          # Release reservations of approved sessions never started
+    
+    # Per-user quotas (0 disables a limit); off by default since user_id is client-supplied
+    user_sessions_per_minute: float = 0.0
+    user_session_burst: int = 3
+    user_max_concurrent_sessions: int = 0
+    user_max_cost_per_day: float = 0.0
+    user_quota_max_users: int = 10000       # Users remembered before the least recent are forgotten
 
 class EvaRealtimeManager:
     """Manages GPT-4o Realtime API sessions for Eva with comprehensive cost controls"""
     
     def __init__(self, config: Optional[EvaRealtimeConfig] = None):
         self.config = config or EvaRealtimeConfig()
+        if self.config.audio_codec not in AUDIO_CODECS:
+            raise ValueError(f"Unsupported audio codec: {self.config.audio_codec}")
+        if self.config.audio_codec != "pcm16" and not NUMPY_AVAILABLE:
+            raise ValueError("numpy is required for G.711 audio (8 kHz resampling); install it with "
+                             "pip install -r requirements.txt")
         self.cost_tracker = get_realtime_tracker()
         
         # Update cost tracker limits
@@ -48,6 +94,19 @@ class EvaRealtimeManager:
         # Active clients
         self.active_clients = {}
         
+        # Budget reservations and the queue of requests waiting for one
+        self.admission = AdmissionController(
+            self.cost_tracker,
+            max_concurrent=self.config.max_concurrent_sessions,
+            max_queue=self.config.admission_queue_size,
+            timeout=self.config.admission_timeout
+        )
+        self._reservation_expiry = {}
+        
+        # Per-user quotas; sessions are released when their reservation is
+        self.user_quotas = UserQuotas(self._user_quota_limits())
+        self.cost_tracker.add_release_listener(self.user_quotas.release)
+        
         # Event handlers for Eva integration
         self.eva_handlers = {}
         
@@ -58,6 +117,17 @@ class EvaRealtimeManager:
         self.api_key = os.getenv("OPENAI_API_KEY")
         if not self.api_key:
             raise ValueError("OPENAI_API_KEY environment variable not set")
+        
+        # Pre-warmed upstream connections (started lazily on the event loop)
+        self.connection_pool = None
+        if self.config.connection_pool_size > 0:
+            self.connection_pool = RealtimeConnectionPool(
+                self.api_key,
+                size=self.config.connection_pool_size,
+                idle_timeout=self.config.connection_pool_idle_timeout,
+                ping_interval=self.config.connection_pool_ping_interval,
+                audio_format=self.config.audio_codec
+            )
     
     def on_eva_event(self, event_type: str, handler: Callable):
         """Register Eva event handler"""
@@ -74,19 +144,42 @@ class EvaRealtimeManager:
     async def request_realtime_session(self, user_id: str = "default") -> Dict[str, Any]:
         """Request a new realtime session with cost validation"""
         
-        # Check daily limits
+        # Warm upstream sockets while the user confirms
+        if self.connection_pool:
+            self.connection_pool.start()
+        
+        # Per-user quotas first, so one user cannot take the whole day's budget
+        session_id = f"eva_realtime_{user_id}_{uuid.uuid4().hex[:8]}"
+        quota = self.user_quotas.acquire(user_id, session_id, self.config.max_cost_per_session)
+        if not quota["allowed"]:
+            return {
+                "approved": False,
+                "reason": quota["reason"],
+                "retry_after": quota.get("retry_after"),
+                "daily_summary": self.cost_tracker.get_daily_summary()
+            }
+        
+        # Reserve the session's worst-case cost, waiting in line if none is free
+        try:
+            admission = await self.admission.admit(session_id)
+        except asyncio.CancelledError:
+            self.user_quotas.release(session_id)
+            raise
         daily_summary = self.cost_tracker.get_daily_summary()
-        permission = self.cost_tracker.can_start_session()
         
-        if not permission["allowed"]:
+        if not admission["reserved"]:
+            self.user_quotas.release(session_id)
             return {
                 "approved": False,
-                "reason": permission["reason"],
+                "reason": admission["reason"],
                 "daily_summary": daily_summary
             }
         
-        # Generate session info
-        session_id = f"eva_realtime_{user_id}_{uuid.uuid4().hex[:8]}"
+        # Approved sessions that are never started give their reservation back
+        if self.config.reservation_ttl > 0:
+            self._reservation_expiry[session_id] = asyncio.get_running_loop().call_later(
+                self.config.reservation_ttl, self._expire_reservation, session_id)
+        permission = self.cost_tracker.can_start_session(session_id)
         
         session_info = {
             "session_id": session_id,
@@ -98,6 +191,8 @@ class EvaRealtimeManager:
                 "estimated_cost_per_minute": 0.30  # Rough estimate
             },
             "warnings": permission.get("warnings", []),
+            "reserved_cost": admission["amount"],
+            "queued_seconds": admission["queued_seconds"],
             "daily_summary": daily_summary
         }
         
@@ -112,6 +207,19 @@ class EvaRealtimeManager:
         
         return session_info
     
+    def _expire_reservation(self, session_id: str):
+        """Release the reservation of an approved session that was never started"""
+        self._reservation_expiry.pop(session_id, None)
+        if session_id not in self.active_clients and self.cost_tracker.release_reservation(session_id):
+            self.logger.info(f"Released reservation of unstarted session {session_id}")
+    
+    def _cancel_reservation(self, session_id: str):
+        """Drop an approved session that will not start"""
+        expiry = self._reservation_expiry.pop(session_id, None)
+        if expiry:
+            expiry.cancel()
+        self.cost_tracker.release_reservation(session_id)
+    
     async def start_realtime_session(self, session_id: str, user_confirmed: bool = False) -> Dict[str, Any]:
         """Start a realtime session after confirmation"""
         
@@ -128,6 +236,15 @@ class EvaRealtimeManager:
                 "error": "Session already active"
             }
         
+        # Only sessions still holding the budget reserved at approval may start
+        if session_id not in self.cost_tracker.reservations:
+            return {
+                "started": False,
+                "error": "Session approval expired, please request a new session"
+            }
+        
+        pooled = None
+        client = None
         try:
             # Create realtime client
             client = GPT4oRealtimeClient(self.api_key, session_id)
@@ -135,11 +252,53 @@ class EvaRealtimeManager:
             # Register event handlers
             self._setup_client_handlers(client, session_id)
             
+            # Without local playback, audio is only relayed and never decoded server-side
+            client.audio_passthrough = not self.config.enable_audio_output
+            client.set_audio_codec(self.config.audio_codec)
+            client.barge_in_enabled = self.config.barge_in_enabled
+            client.remote_playback_latency_ms = self.config.remote_playback_latency_ms
+            client.ingest_frame_ms = self.config.browser_audio_frame_ms
+            client.ingest_max_queue_ms = self.config.browser_audio_max_queue_ms
+            if self.config.client_vad_enabled:
+                client.vad_gate = EnergyVADGate(
+                    sample_rate=client.audio_config.sample_rate,
+                    bytes_per_frame=client.audio_config.bytes_per_frame,
+                    threshold_dbfs=self.config.client_vad_threshold_dbfs,
+                    hangover_ms=self.config.client_vad_hangover_ms,
+                    prefix_padding_ms=self.config.client_vad_prefix_padding_ms
+                )
+            
+            # Record from the start: connect() begins relaying audio, and a pooled socket may deliver it at once
+            if self.config.recording_dir:
+                try:
+                    client.recorder = SessionRecorder(self.config.recording_dir, session_id,
+                                                      sample_rate=client.audio_config.sample_rate)
+                except OSError as e:
+                    self.logger.error(f"Recording disabled for {session_id}: {e}")
+            
+            # Use a pre-warmed connection when one is ready
+            if self.connection_pool:
+                self.connection_pool.start()
+                pooled = await self.connection_pool.acquire()
+            
             # Connect to API
-            connect_result = await client.connect()
+            connect_result = await client.connect(pooled)
+            
+            if not connect_result.get("connected") and pooled is not None and client.websocket is None:
+                # Denied before adopting the socket; keep it warm for the next session
+                await self.connection_pool.release(pooled)
             
             if connect_result.get("connected"):
                 self.active_clients[session_id] = client
+                expiry = self._reservation_expiry.pop(session_id, None)
+                if expiry:
+                    expiry.cancel()
+                
+                # Start local playback if enabled and available
+                if self.config.enable_audio_output:
+                    output_result = client.start_audio_output()
+                    if "error" in output_result:
+                        self.logger.warning(f"Audio output not available: {output_result['error']}")
                 
                 # Start audio input if enabled and available
                 if self.config.enable_audio_input:
@@ -160,6 +319,8 @@ class EvaRealtimeManager:
                     "audio_output_enabled": self.config.enable_audio_output
                 }
             else:
+                self._discard_recording(client)
+                self._cancel_reservation(session_id)
                 return {
                     "started": False,
                     "error": connect_result.get("error", "Failed to connect")
@@ -167,11 +328,21 @@ class EvaRealtimeManager:
                 
         except Exception as e:
             self.logger.error(f"Failed to start realtime session {session_id}: {e}")
+            if session_id not in self.active_clients:
+                self._discard_recording(client)
+                self.cost_tracker.discard_session(session_id)
+            self._cancel_reservation(session_id)
             return {
                 "started": False,
                 "error": str(e)
             }
     
+    def _discard_recording(self, client: Optional[GPT4oRealtimeClient]):
+        """Delete the archive of a session that failed to start"""
+        if client is not None and client.recorder:
+            recorder, client.recorder = client.recorder, None
+            recorder.discard()
+    
     def _setup_client_handlers(self, client: GPT4oRealtimeClient, session_id: str):
         """Setup event handlers for realtime client"""
         
@@ -190,7 +361,9 @@ class EvaRealtimeManager:
         client.on("audio_delta", lambda data: self.emit_eva_event("eva_response_audio", {
             "session_id": session_id,
             "audio_data": data.get("audio", ""),
-            "duration": data.get("duration", 0)
+            "duration": data.get("duration", 0),
+            "samples": data.get("samples", 0),
+            "pcm": data.get("pcm")
         }))
         
         client.on("cost_warning", lambda data: self.emit_eva_event("cost_warning", {
@@ -205,6 +378,11 @@ class EvaRealtimeManager:
             "level": "critical"
         }))
         
+        client.on("interrupted", lambda data: self.emit_eva_event("eva_interrupted", {
+            "session_id": session_id,
+            **data
+        }))
+        
         client.on("session_ended", lambda data: self._handle_session_end(session_id, data))
         
         client.on("error", lambda data: self.emit_eva_event("realtime_error", {
@@ -232,9 +410,32 @@ class EvaRealtimeManager:
         
         return result
     
+    def push_audio_to_session(self, session_id: str, pcm: bytes, seq: Optional[int] = None,
+                              sample_rate: Optional[int] = None, sample_format: str = "pcm16",
+                              channels: int = 1) -> Dict[str, Any]:
+        """Queue browser microphone audio for an active session"""
+        if session_id not in self.active_clients:
+            return {"queued": False, "error": "Session not found"}
+        
+        client = self.active_clients[session_id]
+        return client.ingest_audio(
+            pcm, seq,
+            on_backpressure=lambda paused: self.emit_eva_event("audio_input_backpressure", {
+                "session_id": session_id,
+                "paused": paused
+            }),
+            sample_rate=sample_rate,
+            sample_format=sample_format,
+            channels=channels
+        )
+    
     async def end_session(self, session_id: str) -> Dict[str, Any]:
         """End a realtime session"""
         if session_id not in self.active_clients:
+            if session_id in self._reservation_expiry:
+                # Approved but never started
+                self._cancel_reservation(session_id)
+                return {"ended": True, "summary": {"started": False}}
             return {"ended": False, "error": "Session not found"}
         
         try:
@@ -276,6 +477,31 @@ class EvaRealtimeManager:
             "daily_summary": self.cost_tracker.get_daily_summary()
         }
     
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Get upstream connection pool statistics"""
+        if not self.connection_pool:
+            return {"enabled": False}
+        return {"enabled": True, **self.connection_pool.get_stats()}
+    
+    def get_admission_stats(self) -> Dict[str, Any]:
+        """Get session admission queue statistics"""
+        return self.admission.get_stats()
+    
+    def get_user_quota_usage(self, user_id: Optional[str] = None) -> Dict[str, Any]:
+        """Get per-user quota usage (one user, or the heaviest users today)"""
+        if user_id is not None:
+            return self.user_quotas.user_usage(user_id) or {"user_id": user_id, "tracked": False}
+        return self.user_quotas.get_usage()
+    
+    def _user_quota_limits(self) -> UserQuotaLimits:
+        return UserQuotaLimits(
+            sessions_per_minute=self.config.user_sessions_per_minute,
+            session_burst=self.config.user_session_burst,
+            max_concurrent_sessions=self.config.user_max_concurrent_sessions,
+            max_cost_per_day=self.config.user_max_cost_per_day,
+            max_users=self.config.user_quota_max_users
+        )
+    
     def get_cost_summary(self) -> Dict[str, Any]:
         """Get comprehensive cost summary"""
         return self.cost_tracker.get_daily_summary()
@@ -305,6 +531,13 @@ class EvaRealtimeManager:
             if cost_updates:
                 self.cost_tracker.update_limits(cost_updates)
             
+            # Admission settings apply to requests still waiting
+            self.admission.max_concurrent = self.config.max_concurrent_sessions
+            self.admission.max_queue = self.config.admission_queue_size
+            self.admission.timeout = self.config.admission_timeout
+            self.admission.notify()
+            self.user_quotas.limits = self._user_quota_limits()
+            
             return {"updated": True, "config": new_config}
             
         except Exception as e:
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+G.711 - Table-driven μ-law and A-law codecs for the Realtime API's g711 audio formats
+"""
+import sys
+import array
+from functools import lru_cache
+from typing import Dict, Any
+from .audio_convert import AudioConverter
+
+# Optional vectorized table lookups
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# Realtime API audio format names
+AUDIO_CODECS = ("pcm16", "g711_ulaw", "g711_alaw")
+
+# Bytes per sample each format puts on the wire
+CODEC_SAMPLE_BYTES = {"pcm16": 2, "g711_ulaw": 1, "g711_alaw": 1}
+
+# G.711 is narrowband: the API exchanges it at 8 kHz
+G711_SAMPLE_RATE = 8000
+
+ULAW_BIAS = 0x84
+ULAW_CLIP = 8159
+ULAW_SEGMENT_ENDS = (0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF)
+ALAW_SEGMENT_ENDS = (0x1F, 0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF)
+
+def _linear_to_ulaw(sample: int) -> int:
+    sample >>= 2
+    if sample < 0:
+        mask = 0x7F
+        sample = -sample
+    else:
+        mask = 0xFF
+    sample = min(sample, ULAW_CLIP) + (ULAW_BIAS >> 2)
+
+    for segment, end in enumerate(ULAW_SEGMENT_ENDS):
+        if sample <= end:
+            break
+    else:
+        return 0x7F ^ mask
+
+    return ((segment << 4) | ((sample >> (segment + 1)) & 0x0F)) ^ mask
+
+def _ulaw_to_linear(code: int) -> int:
+    code = ~code & 0xFF
+    exponent = (code >> 4) & 0x07
+    magnitude = ((((code & 0x0F) << 3) + ULAW_BIAS) << exponent) - ULAW_BIAS
+    return -magnitude if code & 0x80 else magnitude
+
+def _linear_to_alaw(sample: int) -> int:
+    sample >>= 3
+    if sample >= 0:
+        mask = 0xD5
+    else:
+        mask = 0x55
+        sample = -sample - 1
+
+    for segment, end in enumerate(ALAW_SEGMENT_ENDS):
+        if sample <= end:
+            break
+    else:
+        return 0x7F ^ mask
+
+    code = segment << 4
+    code |= (sample >> 1) & 0x0F if segment < 2 else (sample >> segment) & 0x0F
+    return code ^ mask
+
+def _alaw_to_linear(code: int) -> int:
+    code ^= 0x55
+    magnitude = (code & 0x0F) << 4
+    segment = (code & 0x70) >> 4
+    if segment == 0:
+        magnitude += 8
+    else:
+        magnitude = (magnitude + 0x108) << (segment - 1)
+    return magnitude if code & 0x80 else -magnitude
+
+@lru_cache(maxsize=None)
+def _tables(codec: str) -> Dict[str, Any]:
+    """Lookup tables for a codec, built on first use (~80 ms each)
+
+    The encode table is indexed by the uint16 view of a PCM16 sample and the
+    decode table by the G.711 code.
+    """
+    encode_one, decode_one = {
+        "g711_ulaw": (_linear_to_ulaw, _ulaw_to_linear),
+        "g711_alaw": (_linear_to_alaw, _alaw_to_linear),
+    }[codec]
+
+    encode_table = bytes(encode_one(i - 65536 if i >= 32768 else i) for i in range(65536))
+    decode_table = array.array("h", (decode_one(c) for c in range(256)))
+    if sys.byteorder != "little":
+        decode_table.byteswap()
+    decode_bytes = decode_table.tobytes()
+
+    tables = {
+        "encode": encode_table,
+        "decode_pairs": [decode_bytes[2 * c:2 * c + 2] for c in range(256)]
+    }
+    if NUMPY_AVAILABLE:
+        tables["np_encode"] = np.frombuffer(encode_table, dtype=np.uint8)
+        tables["np_decode"] = np.frombuffer(decode_bytes, dtype="<i2")
+    return tables
+
+def encode(pcm: bytes, codec: str) -> bytes:
+    """PCM16 little-endian -> G.711 bytes"""
+    if codec == "pcm16":
+        return pcm
+    tables = _tables(codec)
+    if NUMPY_AVAILABLE:
+        samples = np.frombuffer(pcm, dtype="<u2", count=len(pcm) // 2)
+        return tables["np_encode"][samples].tobytes()
+
+    samples = array.array("H", pcm[:len(pcm) - len(pcm) % 2])
+    if sys.byteorder != "little":
+        samples.byteswap()
+    return bytes(map(tables["encode"].__getitem__, samples))
+
+def decode(data: bytes, codec: str) -> bytes:
+    """G.711 bytes -> PCM16 little-endian"""
+    if codec == "pcm16":
+        return data
+    tables = _tables(codec)
+    if NUMPY_AVAILABLE:
+        return tables["np_decode"][np.frombuffer(data, dtype=np.uint8)].tobytes()
+
+    return b"".join(map(tables["decode_pairs"].__getitem__, data))
+
+class G711Transcoder:
+    """Converts between local 24 kHz PCM16 and 8 kHz G.711 on the API socket.
+
+    Capture, VAD, recording and playback all stay PCM16 at the local rate;
+    only the wire format changes. Each direction keeps its own resampler
+    state, so it must see that direction's audio in order.
+    """
+
+    def __init__(self, codec: str, local_rate: int = 24000):
+        if codec not in ("g711_ulaw", "g711_alaw"):
+            raise ValueError(f"Not a G.711 format: {codec}")
+        self.codec = codec
+        self._downsample = AudioConverter(local_rate, "pcm16", 1, G711_SAMPLE_RATE)
+        self._upsample = AudioConverter(G711_SAMPLE_RATE, "pcm16", 1, local_rate)
+
+    def encode(self, pcm: bytes) -> bytes:
+        """Local PCM16 -> wire G.711"""
+        return encode(self._downsample.convert(pcm), self.codec)
+
+    def decode(self, data: bytes) -> bytes:
+        """Wire G.711 -> local PCM16"""
+        return self._upsample.convert(decode(data, self.codec))
@@ -19,6 +19,30 @@ from dataclasses import dataclass
 import logging
 from .realtime_cost_tracker import get_realtime_tracker
 from .openai_logger import get_openai_logger
+from .realtime_event_decoder import RealtimeEventDecoder
+from .audio_ingest import AudioIngestBuffer
+from .audio_capture import AudioRingBuffer, AdaptiveFrameSizer
+from .voice_activity import EnergyVADGate
+from .audio_convert import AudioConverter, SAMPLE_FORMATS
+from .audio_playback import AudioPlayer, get_pyaudio
+from .audio_recorder import SessionRecorder
+from . import g711
+
+REALTIME_API_URL = "wss://api.openai.com/v1/realtime?model=gpt-4o-realtime-preview-2024-10-01"
+
+# Server events _process_message acts on; anything else is skipped without decoding
+HANDLED_EVENT_TYPES = {
+    "session.created",
+    "input_audio_buffer.speech_started",
+    "input_audio_buffer.speech_stopped",
+    "response.created",
+    "conversation.item.input_audio_transcription.completed",
+    "response.audio.delta",
+    "response.audio.done",
+    "response.text.delta",
+    "response.done",
+    "error",
+}
 
 @dataclass
 class AudioConfig:
@@ -27,6 +51,67 @@ class AudioConfig:
     channels: int = 1
     chunk_size: int = 1024
     format: int = 16 if not PYAUDIO_AVAILABLE else pyaudio.paInt16
+    codec: str = "pcm16"  # Format on the API socket: pcm16, g711_ulaw or g711_alaw
+    
+    @property
+    def bytes_per_frame(self) -> int:
+        """Bytes per sample frame across all channels (PCM16)"""
+        return 2 * self.channels
+    
+    @property
+    def wire_bytes_per_frame(self) -> int:
+        """Bytes per sample frame across all channels as sent to the API"""
+        return g711.CODEC_SAMPLE_BYTES[self.codec] * self.channels
+    
+    @property
+    def wire_sample_rate(self) -> int:
+        """Sample rate of audio on the API socket"""
+        return self.sample_rate if self.codec == "pcm16" else g711.G711_SAMPLE_RATE
+
+def base64_decoded_length(encoded: str) -> int:
+    """Byte length of a base64 payload, computed without decoding it"""
+    length = len(encoded)
+    padding = 0
+    if length >= 2 and encoded[-1] == "=":
+        padding = 2 if encoded[-2] == "=" else 1
+    return length * 3 // 4 - padding
+
+# Turn detection modes in which the server cancels the in-flight response itself when speech starts
+AUTO_INTERRUPT_TURN_DETECTION = {"server_vad", "semantic_vad"}
+
+def build_session_update(audio_format: str = "pcm16") -> Dict[str, Any]:
+    """Session configuration sent to the API right after connecting"""
+    return {
+        "type": "session.update",
+        "session": {
+            "modalities": ["text", "audio"],
+            "instructions": "You are Eva, a helpful AI assistant. Respond naturally and concisely.",
+            "voice": "alloy",
+            "input_audio_format": audio_format,
+            "output_audio_format": audio_format,
+            "input_audio_transcription": {
+                "model": "whisper-1"
+            },
+            "turn_detection": {
+                "type": "server_vad",
+                "threshold": 0.5,
+                "prefix_padding_ms": 300,
+                "silence_duration_ms": 500
+            },
+            "tools": [],
+            "tool_choice": "none",
+            "temperature": 0.8,
+            "max_response_output_tokens": "inf"
+        }
+    }
+
+async def open_realtime_websocket(api_key: str):
+    """Open an authenticated WebSocket to the GPT-4o Realtime API"""
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "OpenAI-Beta": "realtime=v1"
+    }
+    return await websockets.connect(REALTIME_API_URL, additional_headers=headers)
 
 class GPT4oRealtimeClient:
     """GPT-4o Realtime API client with cost controls and session management"""
@@ -47,11 +132,45 @@ class GPT4oRealtimeClient:
         self.audio_config = AudioConfig()
         self.audio = None
         self.input_stream = None
-        self.output_stream = None
+        self.audio_player: Optional[AudioPlayer] = None
+        self.playback_jitter_ms = 80
+        
+        # Callback-mode microphone capture (PortAudio thread -> ring -> async sender)
+        self.capture_buffer_seconds = 2.0
+        self.capture_ring = None
+        self.capture_framer = None
+        self._capture_wake = None
+        self._capture_loop = None
+        self.capture_stats = {
+            "frames_sent": 0,
+            "bytes_sent": 0,
+            "input_overflows": 0
+        }
+        
+        # Wire codec conversion when the API socket does not carry PCM16
+        self.transcoder: Optional[g711.G711Transcoder] = None
+        
+        # Forward audio deltas as received, without decoding (web sessions)
+        self.audio_passthrough = False
+        
+        # Optional WAV archive of the session's input and output audio
+        self.recorder: Optional[SessionRecorder] = None
+        
+        # Optional local voice activity gate for outgoing mic audio
+        self.vad_gate: Optional[EnergyVADGate] = None
+        
+        # Microphone audio pushed by a browser (created on first chunk)
+        self.audio_ingest = None
+        self.ingest_converter = None
+        self.ingest_frame_ms = 100
+        self.ingest_max_queue_ms = 2000
         
         # Event handlers
         self.event_handlers = {}
         
+        # Upstream frame decoding
+        self.decoder = RealtimeEventDecoder(handled_types=HANDLED_EVENT_TYPES)
+        
         # Session state
         self.session_active = False
         self.audio_input_enabled = False
@@ -65,13 +184,43 @@ class GPT4oRealtimeClient:
         self.audio_start_time = None
         self.current_audio_duration = 0.0
         
+        # Barge-in: cancel and truncate the assistant's reply when the user starts speaking
+        self.barge_in_enabled = False
+        self.remote_playback_latency_ms = 100.0  # Estimated delay before a browser plays received audio
+        self.current_response_id = None
+        self.current_audio_item = None
+        self.cancelled_response_ids = set()
+        self.unanswered_cancels = 0  # response.cancel sent, neither confirmed nor refused yet
+        # Same configuration pooled sockets are warmed with
+        self.turn_detection = build_session_update()["session"]["turn_detection"]["type"]
+        self.barge_in_stats = {
+            "interruptions": 0,
+            "output_ms_truncated": 0.0,
+            "last_speech_to_silence_ms": None
+        }
+        
+        # Background tasks (kept referenced so the shared loop cannot drop them)
+        self._tasks = set()
+        
         self.api_logger = self.logger.api_logger
         self.api_logger.info(f"GPT-4o Realtime client initialized for session: {self.session_id}")
     
+    def set_audio_codec(self, codec: str):
+        """Choose the API audio format (before connect)"""
+        self.audio_config.codec = codec
+        self.transcoder = None if codec == "pcm16" else g711.G711Transcoder(codec, self.audio_config.sample_rate)
+    
     def on(self, event_type: str, handler: Callable):
         """Register an event handler"""
         self.event_handlers[event_type] = handler
     
+    def _spawn(self, coro) -> asyncio.Task:
+        """Start a background task on the running loop and keep a reference to it"""
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+    
     def emit(self, event_type: str, data: Any = None):
         """Emit an event to registered handlers"""
         if event_type in self.event_handlers:
@@ -80,10 +229,10 @@ class GPT4oRealtimeClient:
             except Exception as e:
                 self.api_logger.error(f"Error in event handler for {event_type}: {e}")
     
-    async def connect(self) -> Dict[str, Any]:
-        """Connect to GPT-4o Realtime API"""
-        # Check if session can start
-        permission = self.cost_tracker.can_start_session()
+    async def connect(self, pooled_connection=None) -> Dict[str, Any]:
+        """Connect to GPT-4o Realtime API, optionally adopting a pre-warmed pooled connection"""
+        # Check if session can start (always true once admitted with a reservation)
+        permission = self.cost_tracker.can_start_session(self.session_id)
         if not permission["allowed"]:
             self.emit("error", {"type": "cost_limit", "message": permission["reason"]})
             return permission
@@ -95,30 +244,28 @@ class GPT4oRealtimeClient:
             return session_result
         
         try:
-            # Connect to OpenAI Realtime API
-            url = "wss://api.openai.com/v1/realtime?model=gpt-4o-realtime-preview-2024-10-01"
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "OpenAI-Beta": "realtime=v1"
-            }
-            
-            self.websocket = await websockets.connect(url, additional_headers=headers)
+            if pooled_connection is not None:
+                # Already connected and configured; session.created was consumed while warming
+                self.websocket = pooled_connection.websocket
+                self.conversation_id = pooled_connection.conversation_id
+                self.session_active = True
+            else:
+                # Connect to OpenAI Realtime API
+                self.websocket = await open_realtime_websocket(self.api_key)
             self.connected = True
             
-            # Initialize audio (if available)
-            if PYAUDIO_AVAILABLE:
-                self.audio = pyaudio.PyAudio()
-            else:
-                self.audio = None
+            # Shared PortAudio instance (None without PyAudio)
+            self.audio = get_pyaudio()
             
             # Send session configuration
-            await self._send_session_update()
+            if pooled_connection is None:
+                await self._send_session_update()
             
             # Start message handling
-            asyncio.create_task(self._handle_messages())
+            self._spawn(self._handle_messages())
             
             # Start cost monitoring
-            asyncio.create_task(self._monitor_costs())
+            self._spawn(self._monitor_costs())
             
             self.emit("connected", {"session_id": self.session_id, "warnings": session_result.get("warnings", [])})
             
@@ -126,42 +273,24 @@ class GPT4oRealtimeClient:
             
         except Exception as e:
             self.api_logger.error(f"Failed to connect to GPT-4o Realtime API: {e}")
+            # Never connected: don't leave the session holding budget for the rest of the day
+            self.cost_tracker.discard_session(self.session_id)
             self.emit("error", {"type": "connection_failed", "message": str(e)})
             return {"connected": False, "error": str(e)}
     
     async def _send_session_update(self):
         """Send session configuration to API"""
-        session_config = {
-            "type": "session.update",
-            "session": {
-                "modalities": ["text", "audio"],
-                "instructions": "You are Eva, a helpful AI assistant. Respond naturally and concisely.",
-                "voice": "alloy",
-                "input_audio_format": "pcm16",
-                "output_audio_format": "pcm16",
-                "input_audio_transcription": {
-                    "model": "whisper-1"
-                },
-                "turn_detection": {
-                    "type": "server_vad",
-                    "threshold": 0.5,
-                    "prefix_padding_ms": 300,
-                    "silence_duration_ms": 500
-                },
-                "tools": [],
-                "tool_choice": "none",
-                "temperature": 0.8,
-                "max_response_output_tokens": "inf"
-            }
-        }
-        
-        await self.websocket.send(json.dumps(session_config))
+        await self.websocket.send(json.dumps(build_session_update(self.audio_config.codec)))
     
     async def _handle_messages(self):
         """Handle incoming WebSocket messages"""
         try:
             async for message in self.websocket:
-                data = json.loads(message)
+                msg_type, data = self.decoder.decode(message)
+                if data is None:
+                    # Log unknown message types for debugging
+                    self.api_logger.debug(f"Unhandled message type: {msg_type}")
+                    continue
                 await self._process_message(data)
         except websockets.exceptions.ConnectionClosed:
             self.connected = False
@@ -181,8 +310,13 @@ class GPT4oRealtimeClient:
             
         elif msg_type == "input_audio_buffer.speech_started":
             self.audio_start_time = time.time()
+            if self.barge_in_enabled and self._assistant_audible():
+                await self._interrupt_response()
             self.emit("speech_started", data)
             
+        elif msg_type == "response.created":
+            self.current_response_id = data.get("response", {}).get("id")
+            
         elif msg_type == "input_audio_buffer.speech_stopped":
             if self.audio_start_time:
                 duration = time.time() - self.audio_start_time
@@ -200,56 +334,180 @@ class GPT4oRealtimeClient:
             # Track output audio
             audio_data = data.get("delta", "")
             if audio_data:
-                # Estimate duration from audio data size
-                audio_bytes = base64.b64decode(audio_data)
-                duration = len(audio_bytes) / (self.audio_config.sample_rate * 2)  # 16-bit PCM
+                # Duration from the encoded length and codec; the payload itself is never touched here
+                samples = base64_decoded_length(audio_data) // self.audio_config.wire_bytes_per_frame
+                duration = samples / self.audio_config.wire_sample_rate
                 self._track_audio_usage("output", duration)
                 
-                # Play audio if output stream is available
-                if self.output_stream:
-                    self.output_stream.write(audio_bytes)
-                    
-                self.emit("audio_delta", {"audio": audio_data, "duration": duration})
+                # Billed, but not played: the user already interrupted this response
+                if data.get("response_id") in self.cancelled_response_ids:
+                    return
+                self._note_audio_item(data, duration)
+                
+                audio_event = {"audio": audio_data, "duration": duration, "samples": samples}
+                
+                # Decode only for local playback or recording, and share the decoded buffer downstream.
+                # G.711 is always decoded: nothing downstream can use it as-is.
+                playback = self.audio_player and not self.audio_passthrough
+                if playback or self.recorder or self.transcoder:
+                    audio_bytes = base64.b64decode(audio_data)
+                    if self.transcoder:
+                        audio_bytes = self.transcoder.decode(audio_bytes)
+                    if playback:
+                        self.audio_player.enqueue(audio_bytes)
+                    if self.recorder:
+                        self.recorder.record_output(audio_bytes)
+                    audio_event["pcm"] = memoryview(audio_bytes)
+                
+                self.emit("audio_delta", audio_event)
+            
+        elif msg_type == "response.audio.done":
+            if self.audio_player and data.get("response_id") not in self.cancelled_response_ids:
+                self.audio_player.end_of_response()
             
         elif msg_type == "response.text.delta":
+            if data.get("response_id") in self.cancelled_response_ids:
+                return
             self.emit("text_delta", {"text": data.get("delta", "")})
             
         elif msg_type == "response.done":
+            # Account for the whole response before reporting it done
+            self._flush_audio_usage()
+            response = data.get("response", {})
+            response_id = response.get("id")
+            if response_id in self.cancelled_response_ids:
+                self.cancelled_response_ids.discard(response_id)
+                if response.get("status") == "cancelled" and self.unanswered_cancels:
+                    self.unanswered_cancels -= 1
+            if response_id == self.current_response_id:
+                self.current_response_id = None
             self.emit("response_done", data)
             
         elif msg_type == "error":
-            self.emit("error", {"type": "api_error", "message": data})
+            if data.get("error", {}).get("code") == "response_cancel_not_active" and self.unanswered_cancels:
+                # Our barge-in cancel raced the response finishing; nothing for the user to see
+                self.unanswered_cancels -= 1
+                self.api_logger.debug(f"Ignoring late response.cancel on {self.session_id}")
+            else:
+                self.emit("error", {"type": "api_error", "message": data})
             
         else:
             # Log unknown message types for debugging
             self.api_logger.debug(f"Unknown message type: {msg_type}")
     
+    def _note_audio_item(self, data: Dict[str, Any], duration: float):
+        """Follow which output item is playing and how much of it was received"""
+        item_id = data.get("item_id")
+        item = self.current_audio_item
+        if item is None or item["item_id"] != item_id:
+            item = self.current_audio_item = {
+                "item_id": item_id,
+                "content_index": data.get("content_index", 0),
+                "received_ms": 0.0,
+                "first_delta_at": time.perf_counter()
+            }
+            if self.audio_player:
+                self.audio_player.start_item()
+        item["received_ms"] += duration * 1000
+    
+    def _played_ms(self, item: Dict[str, Any]) -> float:
+        """How much of an output item the user has heard"""
+        if self.audio_player and not self.audio_passthrough:
+            played = self.audio_player.item_played_ms
+        else:
+            # Audio relayed to a browser: estimate from when it started arriving
+            elapsed_ms = (time.perf_counter() - item["first_delta_at"]) * 1000
+            played = elapsed_ms - self.remote_playback_latency_ms
+        return max(0.0, min(played, item["received_ms"]))
+    
+    def _assistant_audible(self) -> bool:
+        """Whether a reply is still being generated or played back"""
+        if self.current_response_id:
+            return True
+        item = self.current_audio_item
+        return bool(item) and self._played_ms(item) < item["received_ms"]
+    
+    async def _interrupt_response(self):
+        """Stop the assistant mid-reply: cancel generation, truncate what wasn't heard, flush playback"""
+        started = time.perf_counter()
+        item, response_id = self.current_audio_item, self.current_response_id
+        self.current_audio_item = None
+        self.current_response_id = None
+        
+        # Silence local playback first; the API calls below can wait
+        flushed = self.flush_audio_output()
+        played_ms = self._played_ms(item) if item else 0.0
+        
+        try:
+            if response_id:
+                self.cancelled_response_ids.add(response_id)
+                # Server VAD already cancelled it; a second cancel only earns an error event
+                if self.turn_detection not in AUTO_INTERRUPT_TURN_DETECTION:
+                    self.unanswered_cancels += 1
+                    await self.websocket.send(self.decoder.encode({"type": "response.cancel"}))
+            if item and item["item_id"]:
+                await self.websocket.send(self.decoder.encode({
+                    "type": "conversation.item.truncate",
+                    "item_id": item["item_id"],
+                    "content_index": item["content_index"],
+                    "audio_end_ms": int(played_ms)
+                }))
+        except Exception as e:
+            self.api_logger.error(f"Error interrupting response: {e}")
+        
+        silenced_ms = (time.perf_counter() - started) * 1000
+        self.barge_in_stats["interruptions"] += 1
+        self.barge_in_stats["output_ms_truncated"] += round(item["received_ms"] - played_ms, 1) if item else 0.0
+        self.barge_in_stats["last_speech_to_silence_ms"] = round(silenced_ms, 2)
+        self.api_logger.info(f"Barge-in on {self.session_id}: truncated at {played_ms:.0f}ms, flushed {flushed} bytes")
+        
+        self.emit("interrupted", {
+            "response_id": response_id,
+            "item_id": item["item_id"] if item else None,
+            "audio_end_ms": int(played_ms),
+            "local_silence_ms": round(silenced_ms, 2)
+        })
+    
     def _track_audio_usage(self, audio_type: str, duration: float):
-        """Track audio usage and check cost limits"""
+        """Record audio usage; limits are checked whenever the tracker flushes it"""
         try:
-            result = self.cost_tracker.track_audio_usage(self.session_id, audio_type, duration)
-            
-            # Check for warnings or termination
-            if result.get("warnings"):
-                for warning in result["warnings"]:
-                    self.emit("cost_warning", {"message": warning})
-            
-            if result.get("should_terminate"):
-                self.emit("cost_limit_reached", {"reason": "Cost or time limit exceeded"})
-                asyncio.create_task(self.disconnect())
-                
+            result = self.cost_tracker.record_audio_usage(self.session_id, audio_type, duration)
+            if result is not None:
+                self._handle_usage_result(result)
         except Exception as e:
             self.api_logger.error(f"Error tracking audio usage: {e}")
     
+    def _flush_audio_usage(self):
+        """Flush accumulated audio usage and check cost limits now"""
+        try:
+            self._handle_usage_result(self.cost_tracker.flush_usage(self.session_id))
+        except Exception as e:
+            self.api_logger.error(f"Error flushing audio usage: {e}")
+    
+    def _handle_usage_result(self, result: Dict[str, Any]):
+        """Act on a cost tracker limit check"""
+        # Check for warnings or termination
+        if result.get("warnings"):
+            for warning in result["warnings"]:
+                self.emit("cost_warning", {"message": warning})
+        
+        if result.get("should_terminate") and self.connected:
+            self.connected = False
+            self.emit("cost_limit_reached", {"reason": "Cost or time limit exceeded"})
+            self._spawn(self.disconnect())
+    
     async def _monitor_costs(self):
         """Periodically monitor costs and limits"""
-        while self.connected and self.session_active:
+        while self.connected:
             try:
                 await asyncio.sleep(self.cost_check_interval)
                 
+                # Enforce limits even when no audio is flowing
+                self._flush_audio_usage()
+                
                 # Get session status from cost tracker
-                if self.session_id in self.cost_tracker.session_data:
-                    session = self.cost_tracker.session_data[self.session_id]
+                session = self.cost_tracker.session_data.get(self.session_id)
+                if session:
                     duration = time.time() - session["start_time"]
                     
                     # Check if we're approaching limits
@@ -270,18 +528,26 @@ class GPT4oRealtimeClient:
             return {"error": "Audio not available"}
         
         try:
+            config = self.audio_config
+            bytes_per_second = config.sample_rate * config.bytes_per_frame
+            self.capture_ring = AudioRingBuffer(int(bytes_per_second * self.capture_buffer_seconds))
+            self.capture_framer = AdaptiveFrameSizer(config.chunk_size * config.bytes_per_frame, bytes_per_second)
+            self._capture_wake = asyncio.Event()
+            self._capture_loop = asyncio.get_running_loop()
+            self.audio_input_enabled = True
+            
+            # PortAudio delivers audio on its own thread; nothing blocks the event loop
             self.input_stream = self.audio.open(
-                format=self.audio_config.format,
-                channels=self.audio_config.channels,
-                rate=self.audio_config.sample_rate,
+                format=config.format,
+                channels=config.channels,
+                rate=config.sample_rate,
                 input=True,
-                frames_per_buffer=self.audio_config.chunk_size
+                frames_per_buffer=config.chunk_size,
+                stream_callback=self._on_audio_input
             )
             
-            self.audio_input_enabled = True
-            
             # Start audio capture task
-            asyncio.create_task(self._capture_audio())
+            self._spawn(self._capture_audio())
             
             return {"audio_input_started": True}
             
@@ -289,31 +555,134 @@ class GPT4oRealtimeClient:
             self.api_logger.error(f"Failed to start audio input: {e}")
             return {"error": str(e)}
     
+    def _on_audio_input(self, in_data, frame_count, time_info, status):
+        """PortAudio callback: copy captured audio into the ring (audio thread)"""
+        if status & pyaudio.paInputOverflow:
+            self.capture_stats["input_overflows"] += 1
+        
+        self.capture_ring.write(in_data)
+        self._capture_loop.call_soon_threadsafe(self._capture_wake.set)
+        return (None, pyaudio.paContinue)
+    
     async def _capture_audio(self):
-        """Capture and send audio to API"""
+        """Drain captured audio from the ring and send it to the API"""
+        ring, framer = self.capture_ring, self.capture_framer
         try:
-            while self.audio_input_enabled and self.input_stream:
-                audio_data = self.input_stream.read(self.audio_config.chunk_size)
-                encoded_audio = base64.b64encode(audio_data).decode('utf-8')
+            while self.audio_input_enabled:
+                if ring.available < framer.frame_bytes:
+                    self._capture_wake.clear()
+                    await self._capture_wake.wait()
+                    continue
                 
-                # Send audio to API
-                audio_message = {
-                    "type": "input_audio_buffer.append",
-                    "audio": encoded_audio
-                }
+                # Catch up on any backlog in one larger frame
+                size = max(framer.frame_bytes, min(ring.available, framer.max_bytes))
+                frame = ring.read(size - size % framer.base_bytes)
                 
-                await self.websocket.send(json.dumps(audio_message))
+                start = time.perf_counter()
+                await self.send_audio(frame)
+                framer.observe(time.perf_counter() - start)
                 
-                # Small delay to prevent overwhelming the API
-                await asyncio.sleep(0.01)
+                self.capture_stats["frames_sent"] += 1
+                self.capture_stats["bytes_sent"] += len(frame)
                 
         except Exception as e:
             self.api_logger.error(f"Error capturing audio: {e}")
             self.emit("error", {"type": "audio_capture", "message": str(e)})
     
+    async def send_audio(self, pcm: bytes):
+        """Append PCM16 audio to the API's input buffer"""
+        if self.recorder:
+            self.recorder.record_input(pcm)
+        
+        if self.vad_gate:
+            pcm = self.vad_gate.process(pcm)
+            if not pcm:
+                return
+        
+        await self.websocket.send(self.decoder.encode({
+            "type": "input_audio_buffer.append",
+            "audio": base64.b64encode(self.transcoder.encode(pcm) if self.transcoder else pcm).decode('ascii')
+        }))
+    
+    def ingest_audio(self, pcm: bytes, seq: Optional[int] = None,
+                     on_backpressure: Optional[Callable[[bool], None]] = None,
+                     sample_rate: Optional[int] = None, sample_format: str = "pcm16",
+                     channels: int = 1) -> Dict[str, Any]:
+        """Queue a browser mic chunk for coalesced upstream delivery.
+        
+        Audio in another rate or format (e.g. 48 kHz float32, 8 kHz
+        telephony) is converted to 24 kHz PCM16 before it is queued.
+        """
+        if not self.connected:
+            return {"error": "Not connected"}
+        
+        sample_rate = sample_rate or self.audio_config.sample_rate
+        if sample_format not in SAMPLE_FORMATS or not 8000 <= sample_rate <= 192000 or channels not in (1, 2):
+            return {"error": "Unsupported audio format"}
+        
+        if len(pcm) % (SAMPLE_FORMATS[sample_format] * channels):
+            return {"error": "Audio must be whole sample frames"}
+        
+        converter = self.ingest_converter
+        if (converter is None or converter.input_rate != sample_rate or
+                converter.input_format != sample_format or converter.input_channels != channels):
+            try:
+                converter = AudioConverter(sample_rate, sample_format, channels, self.audio_config.sample_rate)
+            except RuntimeError as e:
+                return {"error": str(e)}
+            self.ingest_converter = converter
+            if self.audio_ingest:
+                self.audio_ingest.transform = None if converter.passthrough else converter.convert
+        
+        if self.audio_ingest is None:
+            bytes_per_ms = self.audio_config.sample_rate * self.audio_config.bytes_per_frame // 1000
+            self.audio_ingest = AudioIngestBuffer(
+                self.send_audio,
+                frame_bytes=self.ingest_frame_ms * bytes_per_ms,
+                max_frame_bytes=5 * self.ingest_frame_ms * bytes_per_ms,
+                max_queued_bytes=self.ingest_max_queue_ms * bytes_per_ms,
+                on_backpressure=on_backpressure,
+                transform=None if converter.passthrough else converter.convert
+            )
+        
+        self.audio_ingest.push(pcm, seq)
+        return {"queued": True, "paused": self.audio_ingest.paused}
+    
+    def start_audio_output(self) -> Dict[str, Any]:
+        """Start local speaker playback on its own thread"""
+        if not PYAUDIO_AVAILABLE or not self.audio:
+            return {"error": "Audio not available"}
+        
+        if self.audio_player:
+            return {"audio_output_started": True}
+        
+        try:
+            player = AudioPlayer(
+                self.audio,
+                sample_rate=self.audio_config.sample_rate,
+                channels=self.audio_config.channels,
+                chunk_size=self.audio_config.chunk_size,
+                jitter_ms=self.playback_jitter_ms
+            )
+            player.start()
+            self.audio_player = player
+            return {"audio_output_started": True}
+        except Exception as e:
+            self.api_logger.error(f"Failed to start audio output: {e}")
+            return {"error": str(e)}
+    
+    def flush_audio_output(self) -> int:
+        """Drop queued playback audio (interruptions); returns bytes discarded"""
+        return self.audio_player.flush() if self.audio_player else 0
+    
     async def stop_audio_input(self):
         """Stop capturing audio input"""
         self.audio_input_enabled = False
+        if self._capture_wake:
+            self._capture_wake.set()
+        if self.audio_ingest:
+            self.audio_ingest.close()
+            self.audio_ingest = None
         if self.input_stream:
             self.input_stream.stop_stream()
             self.input_stream.close()
@@ -352,24 +721,33 @@ class GPT4oRealtimeClient:
             # Stop audio
             await self.stop_audio_input()
             
+            # Stop background tasks (except the one running this disconnect)
+            current = asyncio.current_task()
+            for task in list(self._tasks):
+                if task is not current:
+                    task.cancel()
+            
             # Close WebSocket
             if self.websocket:
                 await self.websocket.close()
                 self.websocket = None
             
-            # Cleanup audio
-            if self.output_stream:
-                self.output_stream.stop_stream()
-                self.output_stream.close()
-                self.output_stream = None
-                
-            if self.audio:
-                self.audio.terminate()
-                self.audio = None
+            # Finalize the recording headers
+            if self.recorder:
+                archive = self.recorder.close()
+                if archive:
+                    self.api_logger.info(f"Session {self.session_id} recorded to {archive['input_file']} and {archive['output_file']}")
+            
+            # Cleanup audio (the PyAudio instance is shared and stays open)
+            if self.audio_player:
+                player, self.audio_player = self.audio_player, None
+                await asyncio.get_running_loop().run_in_executor(None, player.close)
+            self.audio = None
             
             # End session tracking
-            if self.session_id in self.cost_tracker.session_data:
-                summary = self.cost_tracker.end_session(self.session_id)
+            # Ends at most once, even if a limit handler on another thread gets there too
+            summary = self.cost_tracker.end_session(self.session_id)
+            if summary.get("session_ended"):
                 self.emit("session_ended", summary)
             
             self.emit("disconnected", {"reason": "Manual disconnect"})
@@ -380,10 +758,21 @@ class GPT4oRealtimeClient:
             self.api_logger.error(f"Error during disconnect: {e}")
             return {"error": str(e)}
     
+    def get_capture_stats(self) -> Optional[Dict[str, Any]]:
+        """Microphone capture metrics, if capture was started"""
+        if not self.capture_ring:
+            return None
+        return {
+            **self.capture_stats,
+            "overrun_bytes": self.capture_ring.overrun_bytes,
+            "buffered_bytes": self.capture_ring.available,
+            **self.capture_framer.get_stats()
+        }
+    
     def get_session_stats(self) -> Dict[str, Any]:
         """Get current session statistics"""
-        if self.session_id in self.cost_tracker.session_data:
-            session = self.cost_tracker.session_data[self.session_id]
+        session = self.cost_tracker.session_data.get(self.session_id)
+        if session:
             duration = time.time() - session["start_time"]
             
             return {
@@ -393,7 +782,13 @@ class GPT4oRealtimeClient:
                 "audio_input_seconds": round(session["audio_input_seconds"], 2),
                 "audio_output_seconds": round(session["audio_output_seconds"], 2),
                 "remaining_cost": max(0, self.cost_tracker.limits.max_cost_per_session - session["cost"]),
-                "remaining_time": max(0, self.cost_tracker.limits.max_session_duration - duration)
+                "remaining_time": max(0, self.cost_tracker.limits.max_session_duration - duration),
+                "audio_ingest": self.audio_ingest.get_stats() if self.audio_ingest else None,
+                "audio_conversion": self.ingest_converter.get_stats() if self.ingest_converter else None,
+                "audio_capture": self.get_capture_stats(),
+                "vad": self.vad_gate.get_stats() if self.vad_gate else None,
+                "audio_playback": self.audio_player.get_stats() if self.audio_player else None,
+                "barge_in": self.barge_in_stats if self.barge_in_enabled else None
             }
         
         return {"error": "Session not found"}
\ No newline at end of file
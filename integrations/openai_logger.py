@@ -3,36 +3,143 @@
 OpenAI API Logger - Comprehensive logging and tracing for OpenAI API calls
 """
 import logging
+import logging.handlers
+import queue
+import atexit
 import json
 import time
-import uuid
+import random
+import os
 from datetime import datetime
 from typing import Dict, Any, Optional
 from pathlib import Path
 import asyncio
 import httpx
 from functools import wraps
+from .sharded_counter import ShardedCounter
+
+class LazyJson:
+    """Log argument that serializes to JSON only when a handler formats the record"""
+    __slots__ = ("obj", "indent")
+    
+    def __init__(self, obj: Any, indent: Optional[int] = None):
+        self.obj = obj
+        self.indent = indent
+    
+    def __str__(self) -> str:
+        return json.dumps(self.obj, indent=self.indent, default=str)
+    
+    def snapshot(self) -> "LazyJson":
+        """Copy of the top-level container, so later changes by the caller don't reach the log"""
+        obj = self.obj
+        if isinstance(obj, dict):
+            obj = dict(obj)
+        elif isinstance(obj, list):
+            obj = list(obj)
+        return LazyJson(obj, self.indent)
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that never blocks the caller on a full queue.
+    
+    Records below drop_below_level are dropped (and counted) when the writer
+    thread falls behind; more severe records wait up to block_timeout for room.
+    
+    Plain messages are formatted before queueing, since their arguments may
+    change once the call returns. LazyJson arguments are only snapshotted
+    (shallow copy) and serialized by the writer thread.
+    """
+    
+    def __init__(self, log_queue: queue.Queue, drop_below_level: int = logging.ERROR, block_timeout: float = 0.5):
+        super().__init__(log_queue)
+        self.drop_below_level = drop_below_level
+        self.block_timeout = block_timeout
+        self.dropped = 0
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Same process, so the record itself can cross threads
+        args = record.args
+        if args:
+            if isinstance(args, tuple) and any(isinstance(arg, LazyJson) for arg in args):
+                record.args = tuple(arg.snapshot() if isinstance(arg, LazyJson) else arg for arg in args)
+            else:
+                record.msg = record.getMessage()
+                record.args = None
+        return record
+    
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+            return
+        except queue.Full:
+            pass
+        
+        if record.levelno >= self.drop_below_level:
+            try:
+                self.queue.put(record, timeout=self.block_timeout)
+                return
+            except queue.Full:
+                pass
+        self.dropped += 1
+
+class FlushingQueueListener(logging.handlers.QueueListener):
+    """Queue listener whose stop() waits for room instead of failing on a full queue"""
+    
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)
 
 class OpenAILogger:
     """Comprehensive OpenAI API logging and tracing"""
     
-    def __init__(self, log_dir: str = "logs/openai", log_level: str = "INFO"):
+    def __init__(self, log_dir: str = "logs/openai", log_level: str = "INFO",
+                 trace_level: str = "DEBUG", async_logging: bool = True, queue_size: int = 10000):
         self.log_dir = Path(log_dir)
         self.log_dir.mkdir(parents=True, exist_ok=True)
         
+        # Queue-backed mode: callers only enqueue records; background threads write them
+        self.async_logging = async_logging
+        self.queue_size = queue_size
+        self._queue_handlers = []
+        self._queue_listeners = []
+        
         # Create separate loggers for different purposes
         self.api_logger = self._setup_logger("openai_api", "openai_api.log", log_level)
         self.error_logger = self._setup_logger("openai_errors", "openai_errors.log", "ERROR")
-        self.trace_logger = self._setup_logger("openai_trace", "openai_trace.log", "DEBUG")
+        self.trace_logger = self._setup_logger("openai_trace", "openai_trace.log", trace_level)
+        
+        if self._queue_listeners:
+            atexit.register(self.close)
         
-        # Track request metrics
-        self.request_count = 0
-        self.total_tokens = 0
-        self.total_cost = 0.0
+        # Track request metrics (updated from many handler threads and event loops)
+        self._request_count = ShardedCounter()
+        self._total_tokens = ShardedCounter()
+        self._total_cost = ShardedCounter(initial=0.0)
         
-        # Track realtime sessions
+        # Track realtime sessions; each entry is only updated by its own session
         self.realtime_sessions = {}
-        self.total_audio_seconds = 0.0
+        self._total_audio_seconds = ShardedCounter(initial=0.0)
+    
+    @property
+    def request_count(self) -> int:
+        return self._request_count.value
+    
+    @property
+    def total_tokens(self) -> int:
+        return self._total_tokens.value
+    
+    @property
+    def total_cost(self) -> float:
+        return self._total_cost.value
+    
+    @property
+    def total_audio_seconds(self) -> float:
+        return self._total_audio_seconds.value
+    
+    def add_usage(self, tokens: int = 0, cost: float = 0.0) -> None:
+        """Add token usage to the running totals (thread-safe)"""
+        if tokens:
+            self._total_tokens.add(tokens)
+        if cost:
+            self._total_cost.add(cost)
         
     def _setup_logger(self, name: str, filename: str, level: str) -> logging.Logger:
         """Setup a logger with file and console handlers"""
@@ -41,6 +148,7 @@ class OpenAILogger:
         
         # Clear existing handlers
         logger.handlers.clear()
+        handlers = []
         
         # File handler
         file_handler = logging.FileHandler(self.log_dir / filename)
@@ -49,7 +157,7 @@ class OpenAILogger:
             datefmt='%Y-%m-%d %H:%M:%S'
         )
         file_handler.setFormatter(file_formatter)
-        logger.addHandler(file_handler)
+        handlers.append(file_handler)
         
         # Console handler for errors
         if level == "ERROR":
@@ -59,10 +167,32 @@ class OpenAILogger:
                 datefmt='%H:%M:%S'
             )
             console_handler.setFormatter(console_formatter)
-            logger.addHandler(console_handler)
+            handlers.append(console_handler)
+        
+        if self.async_logging:
+            log_queue = queue.Queue(maxsize=self.queue_size)
+            queue_handler = DroppingQueueHandler(log_queue)
+            listener = FlushingQueueListener(log_queue, *handlers, respect_handler_level=True)
+            listener.start()
+            logger.addHandler(queue_handler)
+            self._queue_handlers.append(queue_handler)
+            self._queue_listeners.append(listener)
+        else:
+            for handler in handlers:
+                logger.addHandler(handler)
         
         return logger
     
+    @property
+    def dropped_log_records(self) -> int:
+        """Records dropped because a log writer thread fell behind"""
+        return sum(handler.dropped for handler in self._queue_handlers)
+    
+    def close(self):
+        """Flush queued records and stop the writer threads"""
+        while self._queue_listeners:
+            self._queue_listeners.pop().stop()
+    
     def estimate_tokens(self, text: str) -> int:
         """Rough token estimation (4 chars = 1 token)"""
         return len(text) // 4
@@ -103,8 +233,9 @@ class OpenAILogger:
     
     def log_request_start(self, method: str, url: str, payload: Dict[str, Any]) -> str:
         """Log the start of an API request"""
-        request_id = str(uuid.uuid4())[:8]
-        self.request_count += 1
+        # Log correlation only: getrandbits avoids an os.urandom syscall per request
+        request_id = f"{random.getrandbits(32):08x}"
+        self._request_count.add(1)
         
         # Extract key information
         model = payload.get("model", "unknown")
@@ -139,7 +270,8 @@ class OpenAILogger:
         }
         
         self.api_logger.info(f"📤 REQUEST START: {json.dumps(log_data)}")
-        self.trace_logger.debug(f"Full payload: {json.dumps(payload, indent=2)}")
+        # No indent: only compact dumps use the C encoder, and the writer thread holds the GIL while encoding
+        self.trace_logger.debug("Full payload: %s", LazyJson(payload))
         
         return request_id
     
@@ -154,12 +286,12 @@ class OpenAILogger:
         total_tokens = usage.get("total_tokens", input_tokens + output_tokens)
         
         # Update totals
-        self.total_tokens += total_tokens
+        self._total_tokens.add(total_tokens)
         
         # Calculate actual cost
         model = response_data.get("model", "unknown")
         actual_cost = self.estimate_cost(model, input_tokens, output_tokens)
-        self.total_cost += actual_cost
+        self._total_cost.add(actual_cost)
         
         # Log response details
         log_data = {
@@ -180,7 +312,7 @@ class OpenAILogger:
         else:
             self.api_logger.error(f"❌ REQUEST FAILED: {json.dumps(log_data)}")
             
-        self.trace_logger.debug(f"Full response: {json.dumps(response_data, indent=2)}")
+        self.trace_logger.debug("Full response: %s", LazyJson(response_data))
     
     def log_error(self, request_id: str, error: Exception, context: Dict[str, Any] = None):
         """Log an API error"""
@@ -229,8 +361,8 @@ class OpenAILogger:
         # Calculate incremental cost
         incremental_cost = self.estimate_cost("gpt-4o-realtime", 0, 0, duration_seconds)
         session["cost"] += incremental_cost
-        self.total_cost += incremental_cost
-        self.total_audio_seconds += duration_seconds
+        self._total_cost.add(incremental_cost)
+        self._total_audio_seconds.add(duration_seconds)
         
         log_data = {
             "session_id": session_id,
@@ -266,7 +398,7 @@ class OpenAILogger:
         self.api_logger.info(f"🏁 REALTIME SESSION END: {json.dumps(summary)}")
         
         # Remove session from active sessions
-        del self.realtime_sessions[session_id]
+        self.realtime_sessions.pop(session_id, None)
         
         return summary
     
@@ -278,7 +410,8 @@ class OpenAILogger:
             "total_cost_usd": round(self.total_cost, 4),
             "avg_tokens_per_request": round(self.total_tokens / max(1, self.request_count), 2),
             "total_audio_seconds": round(self.total_audio_seconds, 2),
-            "active_realtime_sessions": len(self.realtime_sessions)
+            "active_realtime_sessions": len(self.realtime_sessions),
+            "dropped_log_records": self.dropped_log_records
         }
     
     def log_stats(self):
@@ -293,7 +426,10 @@ def get_openai_logger() -> OpenAILogger:
     """Get the global OpenAI logger instance"""
     global _openai_logger
     if _openai_logger is None:
-        _openai_logger = OpenAILogger()
+        _openai_logger = OpenAILogger(
+            trace_level=os.getenv("OPENAI_TRACE_LOG_LEVEL", "DEBUG"),
+            async_logging=os.getenv("OPENAI_ASYNC_LOGGING", "1") != "0"
+        )
     return _openai_logger
 
 def log_openai_request(func):
@@ -344,8 +480,7 @@ def log_token_usage(model: str, input_tokens: int, output_tokens: int = 0):
     """Quick function to log token usage"""
     logger = get_openai_logger()
     cost = logger.estimate_cost(model, input_tokens, output_tokens)
-    logger.total_tokens += input_tokens + output_tokens
-    logger.total_cost += cost
+    logger.add_usage(input_tokens + output_tokens, cost)
     
     log_data = {
         "model": model,
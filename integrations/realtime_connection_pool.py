@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Realtime Connection Pool - Pre-warmed GPT-4o Realtime API WebSocket connections
+"""
+import asyncio
+import json
+import time
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional
+from websockets.protocol import State
+from .gpt4o_realtime_client import open_realtime_websocket, build_session_update
+from .realtime_cost_tracker import get_realtime_tracker
+
+@dataclass
+class PooledConnection:
+    """An upstream socket that is connected and configured but not yet owned by a session"""
+    websocket: Any
+    conversation_id: Optional[str] = None
+    opened_at: float = field(default_factory=time.time)
+    idle_since: float = field(default_factory=time.time)
+    last_ping: float = field(default_factory=time.time)
+
+    @property
+    def is_open(self) -> bool:
+        return self.websocket.state is State.OPEN
+
+class RealtimeConnectionPool:
+    """Keeps a few upstream Realtime API sockets connected and configured.
+
+    Checking out a pooled connection skips the TLS handshake, session.created
+    and session.update round trips at session start. Pooled sockets are not
+    cost-tracked: the cost tracker session only starts when a client adopts
+    one. The number of warm sockets never exceeds the sessions the remaining
+    daily budget can still pay for.
+    """
+
+    def __init__(self, api_key: str, size: int = 2, idle_timeout: float = 240.0,
+                 ping_interval: float = 20.0, ping_timeout: float = 5.0,
+                 warm_timeout: float = 10.0, audio_format: str = "pcm16"):
+        self.api_key = api_key
+        self.audio_format = audio_format
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        self.warm_timeout = warm_timeout
+
+        self.cost_tracker = get_realtime_tracker()
+        self.logger = logging.getLogger(__name__)
+
+        self._idle = deque()
+        self._opening = 0
+        self._task = None
+        self._wake = None
+
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "opened": 0,
+            "expired": 0,
+            "failed": 0
+        }
+
+    def target_size(self) -> int:
+        """Warm sockets to keep, capped by what today's remaining budget allows"""
+        limits = self.cost_tracker.limits
+        daily = self.cost_tracker.daily_data
+        # Approved and running sessions, including other workers' when the ledger is shared
+        active = self.cost_tracker.open_session_count()
+
+        remaining_cost = limits.max_cost_per_day - daily["total_cost"]
+        affordable_sessions = int(remaining_cost // limits.max_cost_per_session) if limits.max_cost_per_session > 0 else 0
+        remaining_sessions = limits.max_daily_sessions - daily["total_sessions"]
+
+        return max(0, min(self.size, affordable_sessions - active, remaining_sessions - active))
+
+    def start(self) -> None:
+        """Start the maintenance task on the running loop (idempotent)"""
+        if self.size <= 0:
+            return
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._maintain())
+            self.logger.info(f"Realtime connection pool started (size {self.size})")
+
+    async def acquire(self) -> Optional[PooledConnection]:
+        """Check out a warm connection, or None if none is ready"""
+        now = time.time()
+        while self._idle:
+            conn = self._idle.popleft()
+            if conn.is_open and now - conn.idle_since < self.idle_timeout:
+                self.stats["hits"] += 1
+                self._request_refill()
+                return conn
+            await self._close(conn)
+
+        self.stats["misses"] += 1
+        self._request_refill()
+        return None
+
+    async def release(self, conn: PooledConnection) -> None:
+        """Return an unused connection, e.g. when a session was denied after checkout"""
+        if conn.is_open and len(self._idle) < self.target_size():
+            conn.idle_since = time.time()
+            self._idle.append(conn)
+        else:
+            await self._close(conn)
+
+    def _request_refill(self):
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _open(self) -> Optional[PooledConnection]:
+        """Open and configure one upstream socket"""
+        websocket = None
+        try:
+            websocket = await asyncio.wait_for(open_realtime_websocket(self.api_key), self.warm_timeout)
+            await websocket.send(json.dumps(build_session_update(self.audio_format)))
+
+            conn = PooledConnection(websocket=websocket)
+            await asyncio.wait_for(self._await_configured(conn), self.warm_timeout)
+
+            self.stats["opened"] += 1
+            return conn
+
+        except Exception as e:
+            self.stats["failed"] += 1
+            self.logger.warning(f"Failed to warm realtime connection: {e}")
+            if websocket is not None:
+                await websocket.close()
+            return None
+
+    async def _await_configured(self, conn: PooledConnection):
+        """Consume the handshake events so the socket is idle once pooled"""
+        async for message in conn.websocket:
+            data = json.loads(message)
+            msg_type = data.get("type")
+            if msg_type == "session.created":
+                conn.conversation_id = data.get("session", {}).get("id")
+            elif msg_type == "session.updated":
+                return
+            elif msg_type == "error":
+                raise RuntimeError(f"API rejected session.update: {data.get('error')}")
+
+    async def _ping(self, conn: PooledConnection) -> bool:
+        """Health check an idle socket"""
+        try:
+            pong_waiter = await conn.websocket.ping()
+            await asyncio.wait_for(pong_waiter, self.ping_timeout)
+            return True
+        except Exception:
+            return False
+
+    async def _close(self, conn: PooledConnection):
+        try:
+            await conn.websocket.close()
+        except Exception:
+            pass
+
+    async def _maintain(self):
+        """Expire, health check and top up idle connections"""
+        while True:
+            try:
+                # Clear first, so a refill requested while we await below wakes the next wait
+                self._wake.clear()
+                now = time.time()
+                target = self.target_size()
+
+                # Drop expired and dead connections (acquire() may run while we await pings)
+                for conn in list(self._idle):
+                    expired = now - conn.idle_since >= self.idle_timeout
+                    if not expired and now - conn.last_ping >= self.ping_interval:
+                        healthy = await self._ping(conn)
+                        conn.last_ping = time.time()
+                    else:
+                        healthy = not expired and conn.is_open
+
+                    if not healthy and conn in self._idle:
+                        if expired:
+                            self.stats["expired"] += 1
+                        self._idle.remove(conn)
+                        await self._close(conn)
+
+                # Shrink when the remaining budget no longer covers every warm socket
+                while len(self._idle) > target:
+                    await self._close(self._idle.pop())
+
+                # Top up to the budget-capped target
+                missing = target - len(self._idle) - self._opening
+                if missing > 0:
+                    self._opening += missing
+                    try:
+                        results = await asyncio.gather(*(self._open() for _ in range(missing)))
+                    finally:
+                        self._opening -= missing
+                    for conn in results:
+                        if conn is not None:
+                            await self.release(conn)
+
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.ping_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                self.logger.error(f"Error maintaining connection pool: {e}")
+                await asyncio.sleep(self.ping_interval)
+
+    async def close(self):
+        """Stop maintenance and close every idle connection"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        while self._idle:
+            await self._close(self._idle.popleft())
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Pool usage statistics"""
+        return {
+            **self.stats,
+            "idle": len(self._idle),
+            "opening": self._opening,
+            "target_size": self.target_size()
+        }
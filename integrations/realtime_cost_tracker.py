@@ -2,13 +2,21 @@
 """
 GPT-4o Realtime API Cost Tracker - Budget management and cost controls
 """
-import json
+import os
 import time
+import fcntl
+import atexit
+import logging
+import threading
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Callable, List, Optional, Tuple
 from pathlib import Path
 from dataclasses import dataclass
-from .openai_logger import get_openai_logger
+from .openai_logger import OpenAILogger, get_openai_logger
+from .cost_journal import CostJournal
+from .usage_store import UsageStore
+from .shared_ledger import SharedLedger
 
 @dataclass
 class CostLimits:
@@ -19,66 +27,140 @@ class CostLimits:
     max_daily_sessions: int = 50       # 50 sessions per day
     warning_threshold: float = 0.8     # Warn at 80% of limits
 
+def user_id_from_session(session_id: str) -> str:
+    """User id embedded in a manager session id (eva_realtime_<user_id>_<suffix>)"""
+    prefix = "eva_realtime_"
+    if session_id.startswith(prefix) and session_id.count("_") >= 3:
+        return session_id[len(prefix):].rsplit("_", 1)[0]
+    return "default"
+
+# Bucket widths for usage trends
+TREND_GRANULARITY = {"minute": 60, "hour": 3600}
+
 class RealtimeCostTracker:
     """Track and manage costs for GPT-4o Realtime API usage"""
     
-    def __init__(self, data_dir: str = "data/cost_tracking"):
+    def __init__(self, data_dir: str = "data/cost_tracking", usage_flush_interval: float = 1.0,
+                 journal_fsync: str = "interval", usage_db: Optional[str] = None,
+                 logger: Optional[OpenAILogger] = None):
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(parents=True, exist_ok=True)
         
         self.limits = CostLimits()
-        self.logger = get_openai_logger()
+        self.logger = logger or get_openai_logger()
+        
+        # Audio usage is accumulated per session and flushed (logged and checked
+        # against limits) at most this often, or sooner when a cost threshold is crossed
+        self.usage_flush_interval = usage_flush_interval
+        self._audio_cost_per_second = self.logger.estimate_cost("gpt-4o-realtime", 0, 0, 1.0)
         
-        # Load existing data
-        self.daily_data = self._load_daily_data()
+        # Shared mode: several worker processes append to the same daily journal
+        # and hold their open sessions' reservations in one shared ledger
+        self.shared = False
+        self.shared_ledger = None
+        
+        # Concurrency: each session's usage is guarded by its own lock, so concurrent
+        # sessions never contend in the hot path. The daily ledger changes once per
+        # ended session (and at rollover) under this lock.
+        self._ledger_lock = threading.RLock()
+        
+        # Ended sessions go to an append-only journal; replay it to recover the day
+        self.journal = CostJournal(self.data_dir, datetime.now().strftime("%Y-%m-%d"), fsync=journal_fsync)
+        self.daily_data = self.journal.load()
         self.session_data = {}
-    
-    def _load_daily_data(self) -> Dict[str, Any]:
-        """Load daily usage data"""
-        today = datetime.now().strftime("%Y-%m-%d")
-        data_file = self.data_dir / f"realtime_costs_{today}.json"
         
-        if data_file.exists():
-            with open(data_file, 'r') as f:
-                return json.load(f)
+        # Worst-case cost held for each admitted session until it ends (under _ledger_lock)
+        self.reservations = {}
+        self._release_listeners = []
         
-        return {
-            "date": today,
-            "total_cost": 0.0,
-            "total_sessions": 0,
-            "total_audio_seconds": 0.0,
-            "sessions": []
-        }
+        # Yesterday's time buckets, so trends can look back 24 hours after midnight
+        yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+        self.previous_day = self._load_usage_buckets(yesterday)
+        
+        # Optional indexed history of sessions and usage (SQLite, written off-thread)
+        self.usage_store = UsageStore(usage_db) if usage_db else None
+        atexit.register(self.close)
     
-    def _save_daily_data(self):
-        """Save daily usage data"""
-        today = datetime.now().strftime("%Y-%m-%d")
-        data_file = self.data_dir / f"realtime_costs_{today}.json"
+    def enable_shared_budget(self) -> None:
+        """Keep daily totals and reservations consistent with other worker processes using this data_dir"""
+        self.shared = True
+        with self._ledger_lock, self._budget_lock():
+            self.daily_data = self.journal.load()
+            if self.shared_ledger is None:
+                self.shared_ledger = SharedLedger(self.data_dir / "realtime_ledger.db",
+                                                  flush_interval=self.usage_flush_interval)
+    
+    @contextmanager
+    def _budget_lock(self):
+        """Exclusive cross-process lock around daily total updates (no-op unless shared)"""
+        if not self.shared:
+            yield
+            return
         
-        with open(data_file, 'w') as f:
-            json.dump(self.daily_data, f, indent=2)
+        with open(self.data_dir / "realtime_costs.lock", 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
     
-    def can_start_session(self) -> Dict[str, Any]:
-        """Check if a new session can be started based on limits"""
+    def _refresh_daily_data(self) -> None:
+        """Roll over at midnight and apply sessions other workers have journaled since our last read"""
         today = datetime.now().strftime("%Y-%m-%d")
+        with self._ledger_lock:
+            if today != self.journal.date:
+                self._roll_over(today)
+            elif self.shared:
+                self.daily_data = self.journal.catch_up(self.daily_data)
+    
+    def _roll_over(self, today: str) -> None:
+        """Start a new day's ledger; sessions still running are billed to the day they end"""
+        self.journal.close()
+        yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+        if self.journal.date == yesterday:
+            self.previous_day = {key: self.daily_data[key] for key in ("usage_minutes", "usage_hours")}
+        else:
+            self.previous_day = self._load_usage_buckets(yesterday)
         
-        # Check daily session limit
-        if self.daily_data["total_sessions"] >= self.limits.max_daily_sessions:
-            return {
-                "allowed": False,
-                "reason": "Daily session limit reached",
-                "current_sessions": self.daily_data["total_sessions"],
-                "limit": self.limits.max_daily_sessions
-            }
+        self.journal = CostJournal(self.data_dir, today, fsync=self.journal.fsync)
+        self.daily_data = self.journal.load()
+        logging.getLogger(__name__).info(f"Realtime cost tracking rolled over to {today}")
+    
+    def _load_usage_buckets(self, date: str) -> Dict[str, Any]:
+        """Time buckets of a past day (empty when it has no ledger)"""
+        day = CostJournal(self.data_dir, date).read()
+        return {key: day[key] for key in ("usage_minutes", "usage_hours")}
+    
+    def can_start_session(self, session_id: Optional[str] = None) -> Dict[str, Any]:
+        """Check if a new session can be started based on limits.
         
-        # Check daily cost limit
-        if self.daily_data["total_cost"] >= self.limits.max_cost_per_day:
-            return {
-                "allowed": False,
-                "reason": "Daily cost limit reached",
-                "current_cost": self.daily_data["total_cost"],
-                "limit": self.limits.max_cost_per_day
-            }
+        Reserved sessions count as already started. A session that holds a
+        reservation (pass its session_id) was admitted and is always allowed.
+        """
+        self._refresh_daily_data()
+        open_sessions, open_cost = self._open_totals()
+        reserved = session_id is not None and session_id in self.reservations
+        committed_sessions = self.daily_data["total_sessions"] + open_sessions
+        committed_cost = self.daily_data["total_cost"] + open_cost
+        
+        if not reserved:
+            # Check daily session limit
+            if committed_sessions >= self.limits.max_daily_sessions:
+                return {
+                    "allowed": False,
+                    "reason": "Daily session limit reached",
+                    "current_sessions": committed_sessions,
+                    "limit": self.limits.max_daily_sessions
+                }
+            
+            # Check daily cost limit
+            if committed_cost >= self.limits.max_cost_per_day:
+                return {
+                    "allowed": False,
+                    "reason": "Daily cost limit reached",
+                    "current_cost": committed_cost,
+                    "limit": self.limits.max_cost_per_day
+                }
         
         # Check if approaching limits (warning)
         warnings = []
@@ -91,27 +173,133 @@ class RealtimeCostTracker:
         return {
             "allowed": True,
             "warnings": warnings,
-            "remaining_cost": self.limits.max_cost_per_day - self.daily_data["total_cost"],
-            "remaining_sessions": self.limits.max_daily_sessions - self.daily_data["total_sessions"]
+            "remaining_cost": self.limits.max_cost_per_day - committed_cost,
+            "remaining_sessions": self.limits.max_daily_sessions - committed_sessions
         }
     
-    def start_session(self, session_id: str) -> Dict[str, Any]:
+    def reserve_session(self, session_id: str, max_concurrent: int = 0) -> Dict[str, Any]:
+        """Hold a session's worst-case cost (max_cost_per_session) against the daily budget.
+        
+        The reservation counts as a started session until end_session() or
+        release_reservation(). With max_concurrent > 0, at most that many
+        reservations are held at once. When refused, "retry" tells whether a
+        release could make room or the day's ended sessions already rule it out.
+        """
+        with self._ledger_lock, self._budget_lock():
+            # Ended sessions cannot change while we hold the budget lock
+            self._refresh_daily_data()
+            if session_id in self.reservations:
+                return {"reserved": True, "amount": self.reservations[session_id]}
+            
+            amount = self.limits.max_cost_per_session
+            
+            def decide(open_sessions: int, open_cost: float) -> Dict[str, Any]:
+                return self._reservation_decision(amount, open_sessions, open_cost, max_concurrent)
+            
+            if self.shared_ledger:
+                result = self.shared_ledger.reserve(session_id, amount, decide)
+            else:
+                result = decide(len(self.reservations), sum(self.reservations.values()))
+            
+            if result["reserved"]:
+                self.reservations[session_id] = amount
+            return result
+    
+    def _reservation_decision(self, amount: float, open_sessions: int, open_cost: float,
+                              max_concurrent: int) -> Dict[str, Any]:
+        """Whether another reservation fits beside the ended and open sessions"""
+        total_cost = self.daily_data["total_cost"]
+        total_sessions = self.daily_data["total_sessions"]
+        
+        if total_sessions + open_sessions >= self.limits.max_daily_sessions:
+            return {
+                "reserved": False,
+                "retry": total_sessions < self.limits.max_daily_sessions,
+                "reason": "Daily session limit reached"
+            }
+        
+        if total_cost + open_cost + amount > self.limits.max_cost_per_day:
+            return {
+                "reserved": False,
+                "retry": total_cost + amount <= self.limits.max_cost_per_day,
+                "reason": "Daily cost limit reached" if total_cost >= self.limits.max_cost_per_day
+                          else "Not enough daily budget left for another session"
+            }
+        
+        if 0 < max_concurrent <= open_sessions:
+            return {
+                "reserved": False,
+                "retry": True,
+                "reason": "Too many concurrent sessions"
+            }
+        
+        return {"reserved": True, "amount": amount}
+    
+    def _open_totals(self) -> Tuple[int, float]:
+        """(sessions, budget) held by open reservations, of every worker when the ledger is shared"""
+        if self.shared_ledger:
+            return self.shared_ledger.open_totals()
+        with self._ledger_lock:
+            return len(self.reservations), sum(self.reservations.values())
+    
+    def open_session_count(self) -> int:
+        """Sessions holding budget: reservations (of every worker when shared) plus unreserved local sessions"""
+        reserved, _ = self._open_totals()
+        reservations = self.reservations
+        return reserved + sum(1 for session_id in list(self.session_data) if session_id not in reservations)
+    
+    def release_reservation(self, session_id: str) -> bool:
+        """Give back a session's reservation (safe to call more than once)"""
+        with self._ledger_lock:
+            released = self.reservations.pop(session_id, None) is not None
+        if released:
+            if self.shared_ledger:
+                self.shared_ledger.remove(session_id)
+            self._notify_release(session_id)
+        return released
+    
+    def add_release_listener(self, callback: Callable[[Optional[str], Optional[float]], None]) -> None:
+        """Call callback(session_id, cost) from any thread whenever reserved budget may have been freed.
+        
+        cost is what an ended session was billed, or None when its reservation
+        was given back unused. Both are None when limits change.
+        """
+        self._release_listeners.append(callback)
+    
+    def _notify_release(self, session_id: Optional[str] = None, cost: Optional[float] = None):
+        for callback in self._release_listeners:
+            try:
+                callback(session_id, cost)
+            except Exception as e:
+                logging.getLogger(__name__).error(f"Error in reservation release listener: {e}")
+    
+    def start_session(self, session_id: str, user_id: Optional[str] = None) -> Dict[str, Any]:
         """Start tracking a new session"""
-        permission = self.can_start_session()
+        permission = self.can_start_session(session_id)
         if not permission["allowed"]:
             return permission
         
+        # Log session start
+        self.logger.log_realtime_session_start(session_id)
+        
         self.session_data[session_id] = {
+            "lock": threading.Lock(),
+            "ended": False,
+            "user_id": user_id or user_id_from_session(session_id),
             "start_time": time.time(),
             "cost": 0.0,
             "audio_input_seconds": 0.0,
             "audio_output_seconds": 0.0,
-            "warnings_sent": []
+            "warnings_sent": [],
+            # Usage recorded since the last flush
+            "pending_input_seconds": 0.0,
+            "pending_output_seconds": 0.0,
+            "pending_cost": 0.0,
+            "last_flush": time.time(),
+            # [cost, audio seconds] by epoch minute, folded into the day's buckets when the session ends
+            "usage_minutes": {}
         }
         
-        # Log session start
-        self.logger.log_realtime_session_start(session_id)
-        
         return {
             "session_started": True,
             "session_id": session_id,
@@ -121,21 +309,105 @@ class RealtimeCostTracker:
         }
     
     def track_audio_usage(self, session_id: str, audio_type: str, duration_seconds: float) -> Dict[str, Any]:
-        """Track audio usage and check limits"""
-        if session_id not in self.session_data:
+        """Track audio usage and check limits immediately"""
+        session = self.session_data.get(session_id)
+        if session is None:
             return {"error": "Session not found"}
         
-        session = self.session_data[session_id]
+        with session["lock"]:
+            if session["ended"]:
+                return {"error": "Session not found"}
+            self._accumulate(session, audio_type, duration_seconds)
+            return self._flush(session_id, session)
+    
+    def record_audio_usage(self, session_id: str, audio_type: str, duration_seconds: float) -> Optional[Dict[str, Any]]:
+        """Hot-path usage update: O(1) and no I/O unless a flush is due.
         
-        # Calculate cost
-        cost = self.logger.log_realtime_audio(session_id, audio_type, duration_seconds)
-        session["cost"] += cost
+        Returns the limit check result when usage was flushed, otherwise None.
+        Flushes happen every usage_flush_interval seconds and as soon as the
+        pending cost would cross the session warning or limit threshold, so
+        cost enforcement is exact and time enforcement lags by at most one
+        interval.
+        """
+        session = self.session_data.get(session_id)
+        if session is None:
+            return {"error": "Session not found"}
+        
+        with session["lock"]:
+            if session["ended"]:
+                return {"error": "Session not found"}
+            self._accumulate(session, audio_type, duration_seconds)
+            
+            max_cost = self.limits.max_cost_per_session
+            warning_cost = max_cost * self.limits.warning_threshold
+            threshold = warning_cost if session["cost"] < warning_cost else max_cost
+            
+            if (session["cost"] + session["pending_cost"] >= threshold
+                    or time.time() - session["last_flush"] >= self.usage_flush_interval):
+                return self._flush(session_id, session)
         
+        return None
+    
+    def _accumulate(self, session: Dict[str, Any], audio_type: str, duration_seconds: float):
+        """Add audio to a session's pending usage"""
         if audio_type == "input":
-            session["audio_input_seconds"] += duration_seconds
+            session["pending_input_seconds"] += duration_seconds
         else:
-            session["audio_output_seconds"] += duration_seconds
+            session["pending_output_seconds"] += duration_seconds
+        session["pending_cost"] += duration_seconds * self._audio_cost_per_second
+    
+    def flush_usage(self, session_id: str) -> Dict[str, Any]:
+        """Log pending usage for a session, add it to its totals and check limits"""
+        session = self.session_data.get(session_id)
+        if session is None:
+            return {"error": "Session not found"}
         
+        with session["lock"]:
+            if session["ended"]:
+                return {"error": "Session not found"}
+            return self._flush(session_id, session)
+    
+    def _flush(self, session_id: str, session: Dict[str, Any]) -> Dict[str, Any]:
+        """Flush a session's pending usage (caller holds the session lock)"""
+        pending_input = session["pending_input_seconds"]
+        pending_output = session["pending_output_seconds"]
+        session["pending_input_seconds"] = 0.0
+        session["pending_output_seconds"] = 0.0
+        session["pending_cost"] = 0.0
+        session["last_flush"] = time.time()
+        
+        # Calculate cost (one log record per audio type per flush)
+        cost = 0.0
+        if pending_input:
+            input_cost = self.logger.log_realtime_audio(session_id, "input", pending_input)
+            session["audio_input_seconds"] += pending_input
+            cost += input_cost
+        if pending_output:
+            output_cost = self.logger.log_realtime_audio(session_id, "output", pending_output)
+            session["audio_output_seconds"] += pending_output
+            cost += output_cost
+        session["cost"] += cost
+        if self.shared_ledger and cost and session_id in self.reservations:
+            # Batched; other workers see it within a flush interval
+            self.shared_ledger.add_spend(session_id, cost)
+        
+        if pending_input or pending_output:
+            bucket = session["usage_minutes"].setdefault(int(session["last_flush"] // 60), [0.0, 0.0])
+            bucket[0] += cost
+            bucket[1] += pending_input + pending_output
+        
+        if self.usage_store:
+            if pending_input:
+                self.usage_store.record_usage(session_id, session["user_id"], session["last_flush"],
+                                              "input", pending_input, input_cost)
+            if pending_output:
+                self.usage_store.record_usage(session_id, session["user_id"], session["last_flush"],
+                                              "output", pending_output, output_cost)
+        
+        return self._check_session_limits(session_id, session, cost)
+    
+    def _check_session_limits(self, session_id: str, session: Dict[str, Any], cost: float) -> Dict[str, Any]:
+        """Evaluate a session against its cost and duration limits"""
         # Check session limits
         warnings = []
         should_terminate = False
@@ -174,50 +446,101 @@ class RealtimeCostTracker:
     
     def end_session(self, session_id: str) -> Dict[str, Any]:
         """End a session and update daily totals"""
-        if session_id not in self.session_data:
+        session = self.session_data.get(session_id)
+        if session is None:
             return {"error": "Session not found"}
         
-        session = self.session_data[session_id]
+        with session["lock"]:
+            # Only the first caller ends it; later usage for it is rejected
+            if session["ended"]:
+                return {"error": "Session not found"}
+            session["ended"] = True
+            
+            # Account for usage recorded since the last flush
+            self._flush(session_id, session)
         
         # Get session summary from logger
         summary = self.logger.log_realtime_session_end(session_id)
         
-        # Update daily totals
-        self.daily_data["total_cost"] += session["cost"]
-        self.daily_data["total_sessions"] += 1
-        self.daily_data["total_audio_seconds"] += (session["audio_input_seconds"] + session["audio_output_seconds"])
-        
         # Add session to daily log
+        end_time = time.time()
         session_summary = {
             "session_id": session_id,
+            "user_id": session["user_id"],
             "start_time": datetime.fromtimestamp(session["start_time"]).isoformat(),
-            "end_time": datetime.now().isoformat(),
+            "end_time": datetime.fromtimestamp(end_time).isoformat(),
             "duration_seconds": summary.get("duration_seconds", 0),
             "cost": round(session["cost"], 4),
             "audio_input_seconds": round(session["audio_input_seconds"], 2),
             "audio_output_seconds": round(session["audio_output_seconds"], 2)
         }
         
-        self.daily_data["sessions"].append(session_summary)
+        with self._ledger_lock, self._budget_lock():
+            # Merge in totals written by other workers before adding ours
+            self._refresh_daily_data()
+            
+            # One journal line updates the daily totals (unrounded, so replay matches exactly)
+            self.journal.append(self.daily_data, {
+                "session": session_summary,
+                "cost": session["cost"],
+                "audio_seconds": session["audio_input_seconds"] + session["audio_output_seconds"],
+                "started_at": session["start_time"],
+                "usage": [[minute, cost, audio] for minute, (cost, audio) in session["usage_minutes"].items()]
+            })
+            
+            # The session's actual cost is now in the totals; free the rest of its reservation
+            released = self.reservations.pop(session_id, None) is not None
+            if released and self.shared_ledger:
+                self.shared_ledger.remove(session_id)
+            daily_totals = {
+                "cost": self.daily_data["total_cost"],
+                "sessions": self.daily_data["total_sessions"],
+                "audio_seconds": self.daily_data["total_audio_seconds"]
+            }
         
-        # Save daily data
-        self._save_daily_data()
+        if self.usage_store:
+            self.usage_store.record_session(session_id, session["user_id"], session["start_time"], end_time,
+                                            session["cost"], session["audio_input_seconds"],
+                                            session["audio_output_seconds"])
         
         # Remove from active sessions
-        del self.session_data[session_id]
+        self.session_data.pop(session_id, None)
+        if released:
+            self._notify_release(session_id, session["cost"])
         
         return {
             "session_ended": True,
             "session_summary": session_summary,
-            "daily_totals": {
-                "cost": self.daily_data["total_cost"],
-                "sessions": self.daily_data["total_sessions"],
-                "audio_seconds": self.daily_data["total_audio_seconds"]
-            }
+            "daily_totals": daily_totals
         }
     
+    def discard_session(self, session_id: str) -> bool:
+        """Drop a session that never got connected, without billing it or counting it against the day"""
+        session = self.session_data.get(session_id)
+        if session is None:
+            return False
+        
+        with session["lock"]:
+            if session["ended"]:
+                return False
+            billable = session["cost"] > 0 or session["pending_cost"] > 0
+            if not billable:
+                session["ended"] = True
+        
+        if billable:
+            # Usage was recorded after all; account for it like any ended session
+            self.end_session(session_id)
+            return True
+        
+        self.logger.log_realtime_session_end(session_id)
+        self.session_data.pop(session_id, None)
+        self.release_reservation(session_id)
+        return True
+    
     def get_daily_summary(self) -> Dict[str, Any]:
         """Get daily usage summary"""
+        self._refresh_daily_data()
+        reserved_sessions, reserved_cost = self._open_totals()
         return {
             "date": self.daily_data["date"],
             "totals": {
@@ -231,18 +554,85 @@ class RealtimeCostTracker:
                 "max_cost_per_session": self.limits.max_cost_per_session,
                 "max_session_duration": self.limits.max_session_duration
             },
+            "reserved": {
+                "cost": round(reserved_cost, 4),
+                "sessions": reserved_sessions
+            },
             "remaining": {
-                "cost": max(0, self.limits.max_cost_per_day - self.daily_data["total_cost"]),
-                "sessions": max(0, self.limits.max_daily_sessions - self.daily_data["total_sessions"])
+                "cost": max(0, self.limits.max_cost_per_day - self.daily_data["total_cost"] - reserved_cost),
+                "sessions": max(0, self.limits.max_daily_sessions - self.daily_data["total_sessions"] - reserved_sessions)
             },
             "active_sessions": len(self.session_data)
         }
     
+    def usage_trends(self, granularity: str = "hour", count: int = 24) -> List[Dict[str, Any]]:
+        """Cost, sessions started and audio seconds per minute or hour, oldest first.
+        
+        Reads the precomputed buckets of ended sessions (today and yesterday)
+        plus the per-minute usage of sessions still running.
+        """
+        if granularity not in TREND_GRANULARITY:
+            raise ValueError(f"Unknown granularity {granularity!r}; expected one of {', '.join(TREND_GRANULARITY)}")
+        self._refresh_daily_data()
+        
+        width = TREND_GRANULARITY[granularity]
+        key = f"usage_{granularity}s"
+        last = int(time.time() // width)
+        first = last - count + 1
+        
+        points = {}
+        for index in range(first, last + 1):
+            point = [0.0, 0, 0.0]
+            for source in (self.previous_day, self.daily_data):
+                bucket = source[key].get(index)
+                if bucket:
+                    point[0] += bucket[0]
+                    point[1] += bucket[1]
+                    point[2] += bucket[2]
+            points[index] = point
+        
+        minutes_per_bucket = width // 60
+        for session in list(self.session_data.values()):
+            started = points.get(int(session["start_time"] // width))
+            if started:
+                started[1] += 1
+            for minute, (cost, audio) in list(session["usage_minutes"].items()):
+                point = points.get(minute // minutes_per_bucket)
+                if point:
+                    point[0] += cost
+                    point[2] += audio
+        
+        label = "%H:%M" if granularity == "minute" else "%H:00"
+        return [{
+            "start": datetime.fromtimestamp(index * width).isoformat(),
+            "label": datetime.fromtimestamp(index * width).strftime(label),
+            "cost": round(cost, 6),
+            "sessions": sessions,
+            "audio_seconds": round(audio, 2)
+        } for index, (cost, sessions, audio) in points.items()]
+    
+    def recent_sessions(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """The last ended sessions, oldest first (across days when the usage store is enabled)"""
+        if self.usage_store:
+            return self.usage_store.recent_sessions(limit)
+        return self.daily_data["sessions"][-limit:]
+    
+    def close(self) -> None:
+        """Flush the cost journal and usage store to disk and leave the shared ledger"""
+        self.journal.close()
+        if self.usage_store:
+            self.usage_store.close()
+        if self.shared_ledger:
+            self.shared_ledger.close()
+    
     def update_limits(self, new_limits: Dict[str, Any]) -> None:
         """Update cost limits"""
         for key, value in new_limits.items():
             if hasattr(self.limits, key):
                 setattr(self.limits, key, value)
+        
+        # Raised limits may admit waiting sessions
+        self._notify_release()
 
 # Global tracker instance
 _realtime_tracker = None
@@ -251,5 +641,11 @@ def get_realtime_tracker() -> RealtimeCostTracker:
     """Get the global realtime cost tracker instance"""
     global _realtime_tracker
     if _realtime_tracker is None:
-        _realtime_tracker = RealtimeCostTracker()
+        _realtime_tracker = RealtimeCostTracker(
+            journal_fsync=os.getenv('COST_JOURNAL_FSYNC', 'interval'),
+            usage_db=os.getenv('USAGE_DB_PATH') or None
+        )
+        # Processes started by an outside server (e.g. gunicorn workers) opt in here
+        if os.getenv('REALTIME_SHARED_BUDGET', '0') == '1':
+            _realtime_tracker.enable_shared_budget()
     return _realtime_tracker
\ No newline at end of file
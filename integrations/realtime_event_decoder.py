@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Realtime Event Decoder - Fast-path decoding of GPT-4o Realtime API server events
+"""
+import json
+from typing import Dict, Any, Optional, Tuple, Iterable
+
+# Optional faster JSON backends, preferred in this order
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgspec
+    MSGSPEC_AVAILABLE = True
+except ImportError:
+    MSGSPEC_AVAILABLE = False
+
+def _stdlib_dumps(obj: Any) -> str:
+    return json.dumps(obj, separators=(",", ":"))
+
+JSON_BACKENDS = {"json": (json.loads, _stdlib_dumps)}
+if MSGSPEC_AVAILABLE:
+    _msgspec_decoder = msgspec.json.Decoder()
+    _msgspec_encoder = msgspec.json.Encoder()
+    JSON_BACKENDS["msgspec"] = (_msgspec_decoder.decode, lambda obj: _msgspec_encoder.encode(obj).decode("utf-8"))
+if ORJSON_AVAILABLE:
+    JSON_BACKENDS["orjson"] = (orjson.loads, lambda obj: orjson.dumps(obj).decode("utf-8"))
+
+def default_json_backend() -> str:
+    """Fastest JSON backend installed"""
+    for name in ("orjson", "msgspec"):
+        if name in JSON_BACKENDS:
+            return name
+    return "json"
+
+# Events whose last field is a large base64 string the JSON parser need not scan
+AUDIO_PAYLOAD_EVENTS = {
+    "response.audio.delta": "delta",
+}
+
+def peek_event_type(message: str, window: int = 128) -> Optional[str]:
+    """Read the top-level "type" of an event without parsing it.
+
+    Returns None when "type" is not a top-level key within the first
+    `window` characters; callers then fall back to a full decode.
+    """
+    idx = message.find('"type"', 0, window)
+    if idx < 0 or message.count("{", 0, idx) != 1 or message.count("[", 0, idx) != 0:
+        return None
+
+    start = message.find('"', idx + 6, window) + 1
+    end = message.find('"', start, window)
+    if start <= 0 or end < 0:
+        return None
+    return message[start:end]
+
+class RealtimeEventDecoder:
+    """Decodes Realtime API frames, doing only the work handlers need.
+
+    - Event types nobody handles are identified by peeking and never parsed.
+    - Audio payload events parse only the small header before the base64
+      field and slice the payload out of the frame as-is.
+    - Everything else is decoded with the fastest available JSON backend.
+    """
+
+    def __init__(self, handled_types: Optional[Iterable[str]] = None, backend: Optional[str] = None):
+        self.handled_types = set(handled_types) if handled_types is not None else None
+        self.backend = backend or default_json_backend()
+        if self.backend not in JSON_BACKENDS:
+            raise ValueError(f"JSON backend not available: {self.backend}")
+        self.loads, self.dumps = JSON_BACKENDS[self.backend]
+
+        self.stats = {
+            "decoded": 0,
+            "fast_path": 0,
+            "skipped": 0
+        }
+
+    def decode(self, message) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """Return (event_type, data); data is None for events nobody handles"""
+        if isinstance(message, str):
+            msg_type = peek_event_type(message)
+
+            if msg_type is not None:
+                if self.handled_types is not None and msg_type not in self.handled_types:
+                    self.stats["skipped"] += 1
+                    return msg_type, None
+
+                payload_field = AUDIO_PAYLOAD_EVENTS.get(msg_type)
+                if payload_field:
+                    data = self._decode_payload_event(message, payload_field)
+                    if data is not None:
+                        self.stats["fast_path"] += 1
+                        return msg_type, data
+
+        data = self.loads(message)
+        self.stats["decoded"] += 1
+        return data.get("type", ""), data
+
+    def _decode_payload_event(self, message: str, payload_field: str) -> Optional[Dict[str, Any]]:
+        """Parse the header and slice out a trailing base64 string field"""
+        key = f'"{payload_field}":"'
+        idx = message.find(key)
+        if idx < 0:
+            return None
+
+        start = idx + len(key)
+        end = len(message) - 2
+
+        # Only when the payload is the final field and has no JSON escapes
+        if not message.endswith('"}') or message.find('"', start, end) >= 0 or message.find("\\", start, end) >= 0:
+            return None
+
+        data = self.loads(f'{message[:idx]}"{payload_field}":null}}')
+        data[payload_field] = message[start:end]
+        return data
+
+    def encode(self, event: Dict[str, Any]) -> str:
+        """Serialize a client event as a text frame"""
+        return self.dumps(event)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Shared Realtime Event Loop - One long-lived asyncio loop for all realtime clients
+"""
+import asyncio
+import threading
+import concurrent.futures
+import logging
+from typing import Any, Awaitable, Callable, Optional
+
+class RealtimeEventLoop:
+    """Runs a single asyncio event loop in a background thread.
+
+    Every GPT4oRealtimeClient lives on this loop, so its message handling and
+    cost monitoring tasks keep running between Socket.IO handler calls.
+    Synchronous code submits coroutines through the thread-safe API below.
+    """
+
+    def __init__(self, name: str = "realtime-event-loop", default_timeout: float = 30.0):
+        self.name = name
+        self.default_timeout = default_timeout
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.logger = logging.getLogger(__name__)
+
+        self._thread: Optional[threading.Thread] = None
+        self._started = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def is_running(self) -> bool:
+        """Whether the background loop is up and accepting work"""
+        return self.loop is not None and self.loop.is_running()
+
+    def start(self) -> "RealtimeEventLoop":
+        """Start the background loop thread (idempotent)"""
+        with self._lock:
+            already_running = self._thread is not None and self._thread.is_alive()
+            if not already_running:
+                self._started.clear()
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+        self._started.wait()
+        if not already_running:
+            self.logger.info(f"Realtime event loop started in thread {self.name}")
+        return self
+
+    def _run(self):
+        """Thread body: own the loop until stop() is called"""
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self.loop = loop
+        loop.call_soon(self._started.set)
+
+        try:
+            loop.run_forever()
+        finally:
+            # Cancel whatever is still pending so client tasks get a chance to clean up
+            pending = asyncio.all_tasks(loop)
+            for task in pending:
+                task.cancel()
+            if pending:
+                loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
+            self.loop = None
+
+    def in_loop_thread(self) -> bool:
+        """Whether the caller is running on the loop thread itself"""
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def submit(self, coro: Awaitable[Any]) -> concurrent.futures.Future:
+        """Schedule a coroutine on the loop and return a concurrent future"""
+        if not self.is_running:
+            self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the loop and block the calling thread for its result"""
+        if self.in_loop_thread():
+            raise RuntimeError("RealtimeEventLoop.run() cannot be called from the loop thread")
+
+        timeout = self.default_timeout if timeout is None else timeout
+        future = self.submit(coro)
+
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise TimeoutError(f"Realtime operation timed out after {timeout:g}s")
+
+    def call_soon(self, callback: Callable, *args) -> None:
+        """Schedule a plain callback on the loop thread"""
+        if not self.is_running:
+            self.start()
+        self.loop.call_soon_threadsafe(callback, *args)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the loop and wait for the thread to exit"""
+        with self._lock:
+            if not self.is_running:
+                return
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            thread = self._thread
+
+        if thread is not None and not self.in_loop_thread():
+            thread.join(timeout)
+        self.logger.info("Realtime event loop stopped")
+
+# Global loop instance
+_realtime_event_loop = None
+_realtime_event_loop_lock = threading.Lock()
+
+def get_realtime_event_loop() -> RealtimeEventLoop:
+    """Get the global realtime event loop, starting it on first use"""
+    global _realtime_event_loop
+    with _realtime_event_loop_lock:
+        if _realtime_event_loop is None:
+            _realtime_event_loop = RealtimeEventLoop()
+    if not _realtime_event_loop.is_running:
+        _realtime_event_loop.start()
+    return _realtime_event_loop
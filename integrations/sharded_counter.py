@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Sharded Counter - Running totals that many threads update without a shared lock
+"""
+import itertools
+import threading
+from typing import Union
+
+Number = Union[int, float]
+
+class ShardedCounter:
+    """A running total split into independently locked partial sums.
+
+    Each thread is pinned to one shard the first time it adds, round-robin,
+    so concurrent writers rarely wait on each other. No update is ever lost.
+    Reading the value sums every shard without locking. It is exact once
+    writers are quiet, and otherwise may miss adds still in progress.
+    """
+
+    def __init__(self, shards: int = 64, initial: Number = 0):
+        self._locks = [threading.Lock() for _ in range(shards)]
+        self._values = [0] * shards
+        self._values[0] = initial
+        self._local = threading.local()
+        self._next_shard = itertools.count()
+
+    def _shard(self) -> int:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = next(self._next_shard) % len(self._locks)
+        return shard
+
+    def add(self, amount: Number) -> None:
+        """Add to the total (any thread)"""
+        shard = self._shard()
+        with self._locks[shard]:
+            self._values[shard] += amount
+
+    @property
+    def value(self) -> Number:
+        """Current total"""
+        return sum(self._values)
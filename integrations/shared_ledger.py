@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Shared Ledger - Open realtime sessions of every worker process in one SQLite (WAL) table
+"""
+import os
+import time
+import sqlite3
+import threading
+import logging
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, Callable, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS open_sessions (
+    session_id TEXT PRIMARY KEY,
+    pid INTEGER NOT NULL,
+    reserved REAL NOT NULL,
+    spent REAL NOT NULL DEFAULT 0,
+    updated REAL NOT NULL
+);
+"""
+
+# What an open session counts against the daily budget: its reservation, or more if it has overrun it
+OPEN_TOTALS = "SELECT COUNT(*), COALESCE(SUM(MAX(reserved, spent)), 0) FROM open_sessions"
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+class SharedLedger:
+    """Budget held by open sessions, shared by the worker processes on one host.
+
+    Ended sessions are already shared through the cost journal. This table adds
+    the sessions still running in any worker, each with its reservation and
+    its spend so far. Reserving runs in a BEGIN IMMEDIATE transaction, so the
+    budget check and the insert are atomic across processes.
+
+    Audio spend stays off the hot path. add_spend() only adds to a local
+    total, and a background thread writes every session's accumulated spend
+    in one transaction every flush_interval. Rows left by a worker that died
+    are dropped the next time anyone reserves.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 1.0):
+        self.path = Path(path)
+        self.flush_interval = flush_interval
+        self.pid = os.getpid()
+        self.logger = logging.getLogger(__name__)
+
+        # One connection per process, used by one thread at a time
+        self._conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+        # A previous process with our pid is gone; its sessions are too
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM open_sessions WHERE pid = ?", (self.pid,))
+
+        self._pending = {}  # session_id -> spend not yet written
+        self._pending_lock = threading.Lock()
+        self._closed = threading.Event()
+
+        self.stats = {
+            "reservations": 0,
+            "refused": 0,
+            "spend_flushes": 0,
+            "dead_worker_sessions_dropped": 0
+        }
+
+        self._flusher = threading.Thread(target=self._run, name="shared-ledger-flush", daemon=True)
+        self._flusher.start()
+
+    @contextmanager
+    def _transaction(self):
+        """Exclusive write transaction across processes (and threads of this one)"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _drop_dead_workers(self, conn: sqlite3.Connection):
+        pids = [row[0] for row in conn.execute("SELECT DISTINCT pid FROM open_sessions WHERE pid != ?", (self.pid,))]
+        for pid in pids:
+            if not _pid_alive(pid):
+                dropped = conn.execute("DELETE FROM open_sessions WHERE pid = ?", (pid,)).rowcount
+                self.stats["dead_worker_sessions_dropped"] += dropped
+                self.logger.warning(f"Dropped {dropped} open session(s) of dead worker {pid} from the shared ledger")
+
+    def reserve(self, session_id: str, amount: float,
+                decide: Callable[[int, float], Dict[str, Any]]) -> Dict[str, Any]:
+        """Add an open session if decide(open_sessions, open_cost) grants it.
+
+        decide sees every worker's open sessions and runs inside the same
+        transaction as the insert.
+        """
+        with self._transaction() as conn:
+            self._drop_dead_workers(conn)
+            open_sessions, open_cost = conn.execute(OPEN_TOTALS).fetchone()
+            result = decide(open_sessions, open_cost)
+            if result["reserved"]:
+                conn.execute("INSERT OR REPLACE INTO open_sessions (session_id, pid, reserved, spent, updated) "
+                             "VALUES (?, ?, ?, 0, ?)", (session_id, self.pid, amount, time.time()))
+                self.stats["reservations"] += 1
+            else:
+                self.stats["refused"] += 1
+            return result
+
+    def add_spend(self, session_id: str, cost: float) -> None:
+        """Count spend of an open session (local; written by the flush thread)"""
+        with self._pending_lock:
+            self._pending[session_id] = self._pending.get(session_id, 0.0) + cost
+
+    def remove(self, session_id: str) -> None:
+        """Close a session, whether it ended or never started"""
+        with self._pending_lock:
+            self._pending.pop(session_id, None)
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM open_sessions WHERE session_id = ?", (session_id,))
+
+    def open_totals(self) -> Tuple[int, float]:
+        """(open sessions, budget they hold) across all workers"""
+        with self._lock:
+            return tuple(self._conn.execute(OPEN_TOTALS).fetchone())
+
+    def flush(self) -> None:
+        """Write accumulated spend now"""
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        now = time.time()
+        with self._transaction() as conn:
+            conn.executemany("UPDATE open_sessions SET spent = spent + ?, updated = ? WHERE session_id = ?",
+                             [(cost, now, session_id) for session_id, cost in pending.items()])
+        self.stats["spend_flushes"] += 1
+
+    def _run(self):
+        while not self._closed.wait(self.flush_interval):
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                self.logger.error(f"Shared ledger flush failed: {e}")
+
+    def close(self) -> None:
+        """Drop this worker's open sessions and close"""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._flusher.join(timeout=5.0)
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM open_sessions WHERE pid = ?", (self.pid,))
+        self._conn.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Ledger statistics"""
+        open_sessions, open_cost = self.open_totals()
+        return {
+            **self.stats,
+            "open_sessions": open_sessions,
+            "open_cost": round(open_cost, 4),
+            "pending_sessions": len(self._pending),
+            "path": str(self.path)
+        }
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Usage Store - SQLite (WAL) history of realtime sessions and audio usage
+"""
+import queue
+import sqlite3
+import threading
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    start_time REAL NOT NULL,
+    end_time REAL NOT NULL,
+    duration_seconds REAL NOT NULL,
+    cost REAL NOT NULL,
+    audio_input_seconds REAL NOT NULL,
+    audio_output_seconds REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_by_day ON sessions (day, end_time);
+CREATE INDEX IF NOT EXISTS sessions_by_user ON sessions (user_id, day);
+CREATE INDEX IF NOT EXISTS sessions_by_end ON sessions (end_time);
+
+CREATE TABLE IF NOT EXISTS usage_events (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    ts REAL NOT NULL,
+    audio_type TEXT NOT NULL,
+    seconds REAL NOT NULL,
+    cost REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS usage_events_by_session ON usage_events (session_id, ts);
+CREATE INDEX IF NOT EXISTS usage_events_by_day ON usage_events (day, ts);
+CREATE INDEX IF NOT EXISTS usage_events_by_user ON usage_events (user_id, day);
+"""
+
+INSERT_SESSION = """
+INSERT OR REPLACE INTO sessions (session_id, user_id, day, start_time, end_time, duration_seconds,
+                                 cost, audio_input_seconds, audio_output_seconds)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+INSERT_USAGE = """
+INSERT INTO usage_events (session_id, user_id, day, ts, audio_type, seconds, cost)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Columns a top-N query may rank users by
+RANKINGS = {
+    "cost": "SUM(cost)",
+    "sessions": "COUNT(*)",
+    "audio_seconds": "SUM(audio_input_seconds + audio_output_seconds)"
+}
+
+def _day(ts: float) -> str:
+    return datetime.fromtimestamp(ts).strftime("%Y-%m-%d")
+
+def _session_row(row: sqlite3.Row) -> Dict[str, Any]:
+    """A sessions row in the same shape as the daily session summaries"""
+    return {
+        "session_id": row["session_id"],
+        "user_id": row["user_id"],
+        "start_time": datetime.fromtimestamp(row["start_time"]).isoformat(),
+        "end_time": datetime.fromtimestamp(row["end_time"]).isoformat(),
+        "duration_seconds": row["duration_seconds"],
+        "cost": round(row["cost"], 4),
+        "audio_input_seconds": round(row["audio_input_seconds"], 2),
+        "audio_output_seconds": round(row["audio_output_seconds"], 2)
+    }
+
+class UsageStore:
+    """Indexed session and usage history in SQLite, written from a batching thread.
+
+    Callers only enqueue rows, so nothing on the event loop waits on disk.
+    The writer thread inserts everything that queued up while it was busy
+    (at most batch_size rows) in one transaction, so batches grow with load.
+    The database runs in WAL mode, so queries from request threads read a
+    consistent snapshot without blocking the writer. Queries may not yet see
+    rows still in the queue; call flush() to wait for them.
+    """
+
+    def __init__(self, path: str, batch_size: int = 500):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        self.logger = logging.getLogger(__name__)
+
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        conn.close()
+
+        self._queue = queue.Queue()
+        self._local = threading.local()
+        self._closed = False
+        self.stats = {
+            "sessions_written": 0,
+            "usage_events_written": 0,
+            "batches": 0,
+            "write_errors": 0
+        }
+
+        self._writer = threading.Thread(target=self._run, name="usage-store-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30.0, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")  # Durable at checkpoints; WAL keeps it consistent
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    # Writes (any thread, non-blocking)
+
+    def record_session(self, session_id: str, user_id: str, start_time: float, end_time: float,
+                       cost: float, audio_input_seconds: float, audio_output_seconds: float) -> None:
+        """Queue an ended session"""
+        self._queue.put(("session", (
+            session_id, user_id, _day(end_time), start_time, end_time, round(end_time - start_time, 1),
+            cost, audio_input_seconds, audio_output_seconds
+        )))
+
+    def record_usage(self, session_id: str, user_id: str, ts: float, audio_type: str,
+                     seconds: float, cost: float) -> None:
+        """Queue one flushed block of audio usage"""
+        self._queue.put(("usage", (session_id, user_id, _day(ts), ts, audio_type, seconds, cost)))
+
+    def _run(self):
+        conn = self._connect()
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            self._write_batch(conn, batch)
+            for _ in batch:
+                self._queue.task_done()
+            if None in batch:
+                break
+        conn.close()
+
+    def _write_batch(self, conn: sqlite3.Connection, batch: List[Optional[tuple]]):
+        sessions = [item[1] for item in batch if item and item[0] == "session"]
+        usage = [item[1] for item in batch if item and item[0] == "usage"]
+        if not sessions and not usage:
+            return
+        try:
+            with conn:
+                if usage:
+                    conn.executemany(INSERT_USAGE, usage)
+                if sessions:
+                    conn.executemany(INSERT_SESSION, sessions)
+            self.stats["sessions_written"] += len(sessions)
+            self.stats["usage_events_written"] += len(usage)
+            self.stats["batches"] += 1
+        except sqlite3.Error as e:
+            self.stats["write_errors"] += 1
+            self.logger.error(f"Usage store write failed ({len(sessions)} sessions, {len(usage)} usage events): {e}")
+
+    def flush(self) -> None:
+        """Wait until every queued row is written"""
+        self._queue.join()
+
+    def close(self) -> None:
+        """Write what is queued and stop the writer thread"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join(timeout=10.0)
+
+    # Queries (any thread; one read connection per thread)
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def recent_sessions(self, limit: int = 20, user_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """The most recently ended sessions, oldest first"""
+        if user_id is None:
+            rows = self._reader().execute(
+                "SELECT * FROM sessions ORDER BY end_time DESC LIMIT ?", (limit,)).fetchall()
+        else:
+            rows = self._reader().execute(
+                "SELECT * FROM sessions WHERE user_id = ? ORDER BY day DESC, end_time DESC LIMIT ?",
+                (user_id, limit)).fetchall()
+        return [_session_row(row) for row in reversed(rows)]
+
+    def sessions_between(self, start: float, end: float, user_id: Optional[str] = None,
+                         limit: int = 1000) -> List[Dict[str, Any]]:
+        """Sessions that ended in [start, end), oldest first"""
+        if user_id is None:
+            rows = self._reader().execute(
+                "SELECT * FROM sessions WHERE end_time >= ? AND end_time < ? ORDER BY end_time LIMIT ?",
+                (start, end, limit)).fetchall()
+        else:
+            rows = self._reader().execute(
+                "SELECT * FROM sessions WHERE user_id = ? AND day BETWEEN ? AND ? "
+                "AND end_time >= ? AND end_time < ? ORDER BY end_time LIMIT ?",
+                (user_id, _day(start), _day(end), start, end, limit)).fetchall()
+        return [_session_row(row) for row in rows]
+
+    def top_users(self, day_from: str, day_to: str, limit: int = 10, by: str = "cost") -> List[Dict[str, Any]]:
+        """Heaviest users over an inclusive range of days"""
+        if by not in RANKINGS:
+            raise ValueError(f"Cannot rank users by {by!r}; expected one of {', '.join(RANKINGS)}")
+        rows = self._reader().execute(
+            "SELECT user_id, COUNT(*) AS sessions, SUM(cost) AS cost, "
+            "SUM(audio_input_seconds + audio_output_seconds) AS audio_seconds "
+            f"FROM sessions WHERE day BETWEEN ? AND ? GROUP BY user_id ORDER BY {RANKINGS[by]} DESC LIMIT ?",
+            (day_from, day_to, limit)).fetchall()
+        return [{
+            "user_id": row["user_id"],
+            "sessions": row["sessions"],
+            "cost": round(row["cost"], 4),
+            "audio_seconds": round(row["audio_seconds"], 2)
+        } for row in rows]
+
+    def daily_totals(self, day_from: str, day_to: str, user_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Per-day session count, cost and audio over an inclusive range of days"""
+        where, params = "day BETWEEN ? AND ?", [day_from, day_to]
+        if user_id is not None:
+            where, params = "user_id = ? AND " + where, [user_id] + params
+        rows = self._reader().execute(
+            "SELECT day, COUNT(*) AS sessions, SUM(cost) AS cost, "
+            "SUM(audio_input_seconds + audio_output_seconds) AS audio_seconds "
+            f"FROM sessions WHERE {where} GROUP BY day ORDER BY day", params).fetchall()
+        return [{
+            "date": row["day"],
+            "sessions": row["sessions"],
+            "cost": round(row["cost"], 4),
+            "audio_seconds": round(row["audio_seconds"], 2)
+        } for row in rows]
+
+    def session_usage(self, session_id: str) -> List[Dict[str, Any]]:
+        """Audio usage events of one session in order"""
+        rows = self._reader().execute(
+            "SELECT ts, audio_type, seconds, cost FROM usage_events WHERE session_id = ? ORDER BY ts",
+            (session_id,)).fetchall()
+        return [{
+            "timestamp": datetime.fromtimestamp(row["ts"]).isoformat(),
+            "audio_type": row["audio_type"],
+            "seconds": round(row["seconds"], 3),
+            "cost": round(row["cost"], 6)
+        } for row in rows]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Writer statistics"""
+        return {
+            **self.stats,
+            "queued": self._queue.qsize(),
+            "path": str(self.path)
+        }
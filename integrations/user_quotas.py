@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+User Quotas - Per-user session rate, concurrency and daily spend limits
+"""
+import heapq
+import time
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+@dataclass
+class UserQuotaLimits:
+    """Per-user limits (0 disables a limit)"""
+    sessions_per_minute: float = 2.0    # Sustained rate of new sessions
+    session_burst: int = 3              # Sessions that may be requested back to back
+    max_concurrent_sessions: int = 1    # Approved or running at once
+    max_cost_per_day: float = 2.0       # Spent today plus the worst case of open sessions
+    max_users: int = 10000              # Users remembered; the least recently seen are forgotten first
+
+class TokenBucket:
+    """Allows `capacity` events at once, refilling at `rate` per second"""
+
+    __slots__ = ("capacity", "rate", "tokens", "updated")
+
+    def __init__(self, capacity: float, rate: float, now: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """Take one token; returns 0 on success, else seconds until one is available"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else float("inf")
+
+    def give_back(self) -> None:
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+class UserState:
+    """Quota state of one user"""
+
+    __slots__ = ("bucket", "day", "spent", "sessions", "active", "reserved", "denied")
+
+    def __init__(self, bucket: TokenBucket, day: str):
+        self.bucket = bucket
+        self.day = day
+        self.spent = 0.0      # Billed for sessions that ended today
+        self.sessions = 0     # Sessions approved today
+        self.active = 0       # Sessions approved and not yet ended
+        self.reserved = 0.0   # Worst-case cost of the active sessions
+        self.denied = 0
+
+class UserQuotas:
+    """Per-user quotas checked in O(1) when a session is requested.
+
+    Each user has a token bucket for session starts, a count of open sessions,
+    and today's spend plus the worst case of those open sessions. Users are
+    kept in an LRU table of at most max_users entries, so a stream of one-off
+    anonymous IDs keeps memory flat. Users with open sessions are never
+    evicted. An evicted user comes back with a full bucket and no spend.
+    """
+
+    def __init__(self, limits: Optional[UserQuotaLimits] = None):
+        self.limits = limits or UserQuotaLimits()
+        self._users = OrderedDict()  # user_id -> UserState, least recently seen first
+        self._sessions = {}          # session_id -> (user_id, reserved amount)
+        self._lock = threading.Lock()
+
+        self.stats = {
+            "allowed": 0,
+            "denied_rate": 0,
+            "denied_concurrency": 0,
+            "denied_spend": 0,
+            "evicted": 0
+        }
+
+    def _user(self, user_id: str, now: float, today: str) -> UserState:
+        state = self._users.get(user_id)
+        if state is None:
+            state = UserState(TokenBucket(self.limits.session_burst, self.limits.sessions_per_minute / 60, now), today)
+            self._users[user_id] = state
+            self._evict()
+        else:
+            self._users.move_to_end(user_id)
+            # Limit changes apply to existing buckets too
+            state.bucket.capacity = self.limits.session_burst
+            state.bucket.rate = self.limits.sessions_per_minute / 60
+
+        if state.day != today:
+            state.day = today
+            state.spent = 0.0
+            state.sessions = 0
+        return state
+
+    def _evict(self):
+        # Skip (and re-queue) users with open sessions; each is looked at no more than once
+        for _ in range(len(self._users)):
+            if len(self._users) <= self.limits.max_users:
+                return
+            user_id, state = self._users.popitem(last=False)
+            if state.active:
+                self._users[user_id] = state
+            else:
+                self.stats["evicted"] += 1
+
+    def acquire(self, user_id: str, session_id: str, amount: float) -> Dict[str, Any]:
+        """Count a requested session against its user's quotas, or say why it is refused"""
+        limits = self.limits
+        with self._lock:
+            now = time.monotonic()
+            state = self._user(user_id, now, datetime.now().strftime("%Y-%m-%d"))
+
+            if 0 < limits.max_concurrent_sessions <= state.active:
+                return self._deny(state, "denied_concurrency",
+                                  f"You already have {state.active} realtime session(s) open")
+
+            if limits.max_cost_per_day > 0 and state.spent + state.reserved + amount > limits.max_cost_per_day:
+                return self._deny(state, "denied_spend", "Your daily realtime budget is used up")
+
+            if limits.sessions_per_minute > 0:
+                wait = state.bucket.take(now)
+                if wait:
+                    result = self._deny(state, "denied_rate", "Too many sessions requested, please wait")
+                    result["retry_after"] = round(wait, 1)
+                    return result
+
+            state.active += 1
+            state.reserved += amount
+            state.sessions += 1
+            self._sessions[session_id] = (user_id, amount)
+            self.stats["allowed"] += 1
+            return {"allowed": True}
+
+    def _deny(self, state: UserState, stat: str, reason: str) -> Dict[str, Any]:
+        state.denied += 1
+        self.stats[stat] += 1
+        return {"allowed": False, "reason": reason}
+
+    def release(self, session_id: Optional[str], cost: Optional[float] = None) -> None:
+        """Close a session: bill its cost, or with cost None give its session start back"""
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+            if entry is None:
+                return
+            user_id, amount = entry
+            state = self._users.get(user_id)
+            if state is None:
+                return
+
+            state.active -= 1
+            state.reserved = max(0.0, state.reserved - amount)
+            if cost is None:
+                state.sessions = max(0, state.sessions - 1)
+                state.bucket.give_back()
+            elif state.day == datetime.now().strftime("%Y-%m-%d"):
+                state.spent += cost
+
+    def _usage(self, user_id: str, state: UserState) -> Dict[str, Any]:
+        return {
+            "user_id": user_id,
+            "sessions_today": state.sessions,
+            "active_sessions": state.active,
+            "spent_today": round(state.spent, 4),
+            "reserved": round(state.reserved, 4),
+            "remaining_today": round(max(0.0, self.limits.max_cost_per_day - state.spent - state.reserved), 4)
+                               if self.limits.max_cost_per_day > 0 else None,
+            "session_tokens": round(min(state.bucket.capacity, state.bucket.tokens), 2),
+            "denied": state.denied
+        }
+
+    def user_usage(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """One user's quota usage, or None if the user is not tracked"""
+        with self._lock:
+            state = self._users.get(user_id)
+            return self._usage(user_id, state) if state else None
+
+    def get_usage(self, top: int = 20) -> Dict[str, Any]:
+        """Quota limits, statistics and the heaviest users today"""
+        today = datetime.now().strftime("%Y-%m-%d")
+        with self._lock:
+            users = [(user_id, state) for user_id, state in self._users.items() if state.day == today or state.active]
+            heaviest = heapq.nlargest(top, users, key=lambda item: (item[1].spent + item[1].reserved, item[1].sessions))
+            return {
+                "limits": asdict(self.limits),
+                "tracked_users": len(self._users),
+                "open_sessions": len(self._sessions),
+                "stats": dict(self.stats),
+                "top_users": [self._usage(user_id, state) for user_id, state in heaviest]
+            }
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Voice Activity - Energy-based gate that keeps silent microphone audio off the upstream socket
+"""
+import math
+import array
+from collections import deque
+from typing import Dict, Any
+
+# Optional vectorized energy computation
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+def frame_energy_dbfs(pcm: bytes) -> float:
+    """RMS level of a PCM16 frame in dBFS (-inf for digital silence)"""
+    if len(pcm) < 2:
+        return float("-inf")
+
+    if NUMPY_AVAILABLE:
+        samples = np.frombuffer(pcm, dtype=np.int16, count=len(pcm) // 2).astype(np.float32)
+        mean_square = float(np.dot(samples, samples)) / samples.size
+    else:
+        samples = array.array("h", pcm[:len(pcm) - len(pcm) % 2])
+        mean_square = sum(s * s for s in samples) / len(samples)
+
+    if mean_square <= 0:
+        return float("-inf")
+    return 10 * math.log10(mean_square) - 20 * math.log10(32768)
+
+class EnergyVADGate:
+    """Suppresses silent frames before they are encoded and sent.
+
+    A frame above threshold_dbfs opens the gate. The gate stays open for
+    hangover_ms after the last loud frame. Keep that longer than the server
+    VAD's silence_duration_ms so the server still hears the pause that ends
+    the turn. Up to prefix_padding_ms of the silence before speech is held
+    back and sent with the first loud frame, so word onsets are not clipped.
+    """
+
+    def __init__(self, sample_rate: int = 24000, bytes_per_frame: int = 2,
+                 threshold_dbfs: float = -45.0, hangover_ms: int = 700,
+                 prefix_padding_ms: int = 300):
+        self.bytes_per_ms = sample_rate * bytes_per_frame / 1000
+        self.threshold_dbfs = threshold_dbfs
+        self.hangover_bytes = int(hangover_ms * self.bytes_per_ms)
+        self.prefix_bytes = int(prefix_padding_ms * self.bytes_per_ms)
+
+        self.open = False
+        self._silence_run = 0
+        self._prefix = deque()
+        self._prefix_size = 0
+
+        self.stats = {
+            "bytes_in": 0,
+            "bytes_sent": 0,
+            "bytes_saved": 0,
+            "speech_segments": 0
+        }
+
+    def process(self, pcm: bytes) -> bytes:
+        """Return the audio to send for this frame (empty while silent)"""
+        self.stats["bytes_in"] += len(pcm)
+        loud = frame_energy_dbfs(pcm) >= self.threshold_dbfs
+
+        if loud:
+            self._silence_run = 0
+            if not self.open:
+                self.open = True
+                self.stats["speech_segments"] += 1
+                if self._prefix:
+                    pcm = b"".join(self._prefix) + pcm
+                    self._release_prefix()
+        elif self.open:
+            self._silence_run += len(pcm)
+            if self._silence_run > self.hangover_bytes:
+                self.open = False
+
+        if self.open:
+            self.stats["bytes_sent"] += len(pcm)
+            return pcm
+
+        self._hold_prefix(pcm)
+        return b""
+
+    def _hold_prefix(self, pcm: bytes):
+        """Keep the most recent silence for prefix padding; older audio is saved"""
+        self._prefix.append(pcm)
+        self._prefix_size += len(pcm)
+        while self._prefix and self._prefix_size - len(self._prefix[0]) >= self.prefix_bytes:
+            dropped = self._prefix.popleft()
+            self._prefix_size -= len(dropped)
+            self.stats["bytes_saved"] += len(dropped)
+
+    def _release_prefix(self):
+        self._prefix.clear()
+        self._prefix_size = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Gate counters; bytes_saved excludes silence still held as prefix"""
+        bytes_in = self.stats["bytes_in"]
+        return {
+            **self.stats,
+            "open": self.open,
+            "saved_ratio": round(self.stats["bytes_saved"] / bytes_in, 3) if bytes_in else 0.0
+        }
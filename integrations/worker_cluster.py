@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Worker Cluster - Session-affine multi-process support for the async server
+"""
+import os
+import asyncio
+import atexit
+import glob
+import json
+import base64
+import hashlib
+import socket
+import stat
+import tempfile
+import logging
+from pathlib import Path
+from typing import Dict, Any, Optional, Callable, Awaitable
+from socketio.asyncio_pubsub_manager import AsyncPubSubManager
+
+# Per user, so another local account cannot own the directory workers trust
+DEFAULT_BUS_DIR = os.path.join(tempfile.gettempdir(), f"eva_realtime_bus_{os.getuid()}")
+
+# Largest message a worker can send or receive over the bus
+MAX_DATAGRAM_SIZE = 1024 * 1024
+
+def _to_json(value):
+    """Tag the values JSON has no type for: bytes (binary emits) and tuples (multi-argument emits)"""
+    if isinstance(value, dict):
+        return {key: _to_json(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_to_json(item) for item in value]
+    if isinstance(value, tuple):
+        return {"__tuple__": [_to_json(item) for item in value]}
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return {"__bytes__": base64.b64encode(value).decode("ascii")}
+    return value
+
+def _from_json(obj):
+    if len(obj) == 1:
+        if "__bytes__" in obj:
+            return base64.b64decode(obj["__bytes__"])
+        if "__tuple__" in obj:
+            return tuple(obj["__tuple__"])
+    return obj
+
+def encode_message(data: Dict[str, Any]) -> bytes:
+    """Serialize a bus message as JSON; unlike pickle, decoding a datagram cannot run code"""
+    return json.dumps(_to_json(data), separators=(",", ":")).encode("utf-8")
+
+def decode_message(payload: bytes) -> Dict[str, Any]:
+    data = json.loads(payload, object_hook=_from_json)
+    if not isinstance(data, dict):
+        raise ValueError("bus message is not an object")
+    return data
+
+def ensure_private_dir(path: Path) -> None:
+    """Create path for this user only, and refuse one anybody else could write to"""
+    path.mkdir(mode=0o700, parents=True, exist_ok=True)
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode):
+        raise RuntimeError(f"Worker bus directory {path} is not a directory")
+    if st.st_uid != os.getuid() or stat.S_IMODE(st.st_mode) != 0o700:
+        raise RuntimeError(f"Worker bus directory {path} must be owned by uid {os.getuid()} with mode 0700 "
+                           f"(found uid {st.st_uid}, mode {stat.S_IMODE(st.st_mode):o})")
+
+class LocalBusManager(AsyncPubSubManager):
+    """Socket.IO message queue over Unix datagram sockets in a shared directory.
+
+    Every worker binds one socket in bus_dir. Publishing sends the message to
+    all of them, including the sender, which is how pub/sub managers deliver
+    emits. Workers on one host can share Socket.IO rooms with no external
+    service. The same sockets carry session commands addressed to a single
+    worker (see send_command).
+    """
+    name = 'localbus'
+
+    def __init__(self, bus_dir: str = DEFAULT_BUS_DIR, channel: str = 'socketio',
+                 write_only: bool = False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.bus_dir = Path(bus_dir)
+        ensure_private_dir(self.bus_dir)
+
+        self.worker_id = str(os.getpid())
+        self.address = self.address_of(self.worker_id)
+
+        # Handler for session commands forwarded by other workers
+        self.command_handler: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None
+
+        self._send_sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._send_sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, MAX_DATAGRAM_SIZE)
+        self._send_sock.setblocking(False)
+        self._recv_sock = None
+        self._command_tasks = set()
+
+        self.bus_logger = logging.getLogger(__name__)
+        self.dropped_messages = 0
+
+    def address_of(self, worker_id: str) -> str:
+        """Socket path of a worker"""
+        return str(self.bus_dir / f"{worker_id}.sock")
+
+    def _peers(self):
+        """Socket paths of every live worker"""
+        return glob.glob(str(self.bus_dir / "*.sock"))
+
+    def _send(self, address: str, payload: bytes) -> bool:
+        """Send one datagram without blocking the event loop"""
+        try:
+            self._send_sock.sendto(payload, address)
+            return True
+        except (ConnectionRefusedError, FileNotFoundError):
+            # Socket left behind by a worker that exited without cleanup
+            if address != self.address:
+                try:
+                    os.unlink(address)
+                except OSError:
+                    pass
+        except BlockingIOError:
+            self.dropped_messages += 1
+            self.bus_logger.warning(f"Worker bus full, dropped message for {address}")
+        except OSError as e:
+            self.dropped_messages += 1
+            self.bus_logger.error(f"Worker bus send failed ({len(payload)} bytes): {e}")
+        return False
+
+    async def _publish(self, data):
+        payload = encode_message(data)
+        for peer in self._peers():
+            self._send(peer, payload)
+
+    def send_command(self, worker_id: str, command: Dict[str, Any]) -> bool:
+        """Deliver a session command to one worker"""
+        payload = encode_message({"method": "session_command", **command})
+        return self._send(self.address_of(worker_id), payload)
+
+    def broadcast_command(self, command: Dict[str, Any]) -> None:
+        """Deliver a session command to every other worker"""
+        payload = encode_message({"method": "session_command", **command})
+        for peer in self._peers():
+            if peer != self.address:
+                self._send(peer, payload)
+
+    def _bind(self):
+        """Bind this worker's receive socket"""
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, MAX_DATAGRAM_SIZE)
+        sock.setblocking(False)
+        sock.bind(self.address)
+        self._recv_sock = sock
+        atexit.register(self.close)
+
+    async def _listen(self):
+        if self._recv_sock is None:
+            self._bind()
+
+        loop = asyncio.get_running_loop()
+        while True:
+            message = await loop.sock_recv(self._recv_sock, MAX_DATAGRAM_SIZE)
+            try:
+                data = decode_message(message)
+            except Exception as e:
+                self.bus_logger.error(f"Discarding malformed bus message: {e}")
+                continue
+
+            if data.get("method") == "session_command":
+                if self.command_handler:
+                    task = loop.create_task(self.command_handler(data))
+                    self._command_tasks.add(task)
+                    task.add_done_callback(self._command_tasks.discard)
+                continue
+
+            yield data
+
+    def close(self):
+        """Remove this worker from the bus"""
+        if self._recv_sock is not None:
+            self._recv_sock.close()
+            self._recv_sock = None
+            try:
+                os.unlink(self.address)
+            except OSError:
+                pass
+
+class SessionRegistry:
+    """Records which worker owns each session's upstream socket.
+
+    Entries are small files in a shared directory so any worker can look up
+    the owner of a session it does not hold and forward work to it.
+    """
+
+    def __init__(self, bus_dir: str, worker_id: str):
+        self.sessions_dir = Path(bus_dir) / "sessions"
+        self.sessions_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+        self.worker_id = worker_id
+
+    def _path(self, session_id: str) -> Path:
+        # Session ids embed client-supplied user ids, so never use them as file names
+        digest = hashlib.sha1(session_id.encode("utf-8")).hexdigest()
+        return self.sessions_dir / digest
+
+    def claim(self, session_id: str) -> None:
+        """Pin a session to this worker"""
+        path = self._path(session_id)
+        tmp_path = path.with_suffix(f".{self.worker_id}.tmp")
+        tmp_path.write_text(self.worker_id)
+        os.replace(tmp_path, path)
+
+    def owner(self, session_id: str) -> Optional[str]:
+        """Worker id that owns a session, if any"""
+        try:
+            return self._path(session_id).read_text() or None
+        except FileNotFoundError:
+            return None
+
+    def release(self, session_id: str) -> None:
+        """Forget a session owned by this worker"""
+        if self.owner(session_id) == self.worker_id:
+            try:
+                self._path(session_id).unlink()
+            except FileNotFoundError:
+                pass